@@ -0,0 +1,53 @@
+"""import foxar 的冷启动时间，基于 python -X importtime
+
+用法: python benchmarks/bench_import.py [--runs N] [--top K] [--stmt "import foxar"]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def importtime(stmt):
+    """在新的解释器中执行语句，返回 {模块: (自身微秒, 累计微秒)}"""
+    env = dict(os.environ, PYTHONPATH=ROOT, PYTHONDONTWRITEBYTECODE='')
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', stmt],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative, name = line[len('import time:'):].split('|')
+        modules[name.strip()] = (int(self_us), int(cumulative))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='运行次数，报告中位数')
+    parser.add_argument('--top', type=int, default=15, help='列出自身耗时最多的模块数')
+    parser.add_argument('--stmt', default='import foxar', help='要测量的导入语句')
+    args = parser.parse_args()
+
+    # 第一次运行生成字节码缓存，不计入结果
+    importtime(args.stmt)
+    runs = [importtime(args.stmt) for _ in range(args.runs)]
+    totals = [sum(self_us for self_us, _ in modules.values()) for modules in runs]
+    print(f'{args.stmt}: {statistics.median(totals) / 1000:.1f} ms (median of {args.runs})')
+
+    last = runs[-1]
+    print(f'\n{"module":<50} {"self ms":>8} {"cumulative ms":>14}')
+    for name, (self_us, cumulative) in sorted(last.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f'{name:<50} {self_us / 1000:8.1f} {cumulative / 1000:14.1f}')
+
+    heavy = [name for name in ('httpx', 'jinja2', 'uvicorn', 'foxar.test_client', 'foxar.csrf') if name in last]
+    print('\nlazily imported modules loaded: ' + (', '.join(heavy) if heavy else 'none'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,463 @@
+"""相同应用在 Starlette、FastAPI、Foxar 和 Flask 上的每请求耗时、内存分配及 Foxar 各层开销
+
+用法: python benchmarks/bench_overhead.py [--requests N] [--repeat R] [--json PATH]
+                                          [--baseline PATH] [--threshold 0.2] [--min-delta 1.0]
+
+应用均在进程内通过 ASGI/WSGI 直接调用，不经过网络。Starlette、FastAPI 使用异步视图，
+Foxar 和 Flask 使用同步视图（与各自文档中的写法一致）。Starlette 和 FastAPI 没有内置
+会话，会话场景以普通cookie读写计数。没有安装 Flask 时跳过。
+
+--json 保存本次结果；--baseline 与之前保存的结果比较，任一指标比基线增加超过
+threshold（比例）且超过 min-delta（µs 或 KiB）时以状态码1退出。
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from urllib.parse import urlencode
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TEMPLATE = '<html><body>{% for i in range(5) %}<p>Hello, {{ name }} {{ i }}</p>{% endfor %}</body></html>'
+
+# (场景, 方法, 路径, 请求体, 请求头)
+SCENARIOS = [
+    ('hello', 'GET', '/hello', b'', []),
+    ('json_echo', 'POST', '/echo', json.dumps({'name': 'foxar', 'tags': ['a', 'b'], 'n': 1}).encode(),
+     [('content-type', 'application/json')]),
+    ('form_post', 'POST', '/form', urlencode({'name': 'foxar', 'value': '42'}).encode(),
+     [('content-type', 'application/x-www-form-urlencoded')]),
+    ('session', 'GET', '/session', b'', []),
+    ('template', 'GET', '/template/foxar', b'', []),
+    ('blueprint', 'GET', '/api/v1/items/7', b'', []),
+]
+
+
+def build_starlette(template_dir):
+    from jinja2 import Environment, FileSystemLoader
+    from starlette.applications import Starlette
+    from starlette.responses import HTMLResponse, JSONResponse
+    from starlette.routing import Mount, Route
+
+    env = Environment(loader=FileSystemLoader(template_dir), autoescape=True)
+
+    async def hello(req):
+        return JSONResponse({'message': 'Hello, World!'})
+
+    async def echo(req):
+        return JSONResponse(await req.json())
+
+    async def form(req):
+        data = await req.form()
+        return JSONResponse(dict(data))
+
+    async def session_view(req):
+        count = int(req.cookies.get('count', '0')) + 1
+        response = JSONResponse({'count': count})
+        response.set_cookie('count', str(count), httponly=True, samesite='lax')
+        return response
+
+    async def template(req):
+        return HTMLResponse(env.get_template('hello.html').render(name=req.path_params['name']))
+
+    async def item(req):
+        return JSONResponse({'id': req.path_params['item_id']})
+
+    return Starlette(routes=[
+        Route('/hello', hello),
+        Route('/echo', echo, methods=['POST']),
+        Route('/form', form, methods=['POST']),
+        Route('/session', session_view),
+        Route('/template/{name}', template),
+        Mount('/api', routes=[Mount('/v1', routes=[Route('/items/{item_id:int}', item)])]),
+    ])
+
+
+def build_fastapi(template_dir):
+    from typing import Any, Dict
+    from fastapi import APIRouter, FastAPI, Form, Request
+    from jinja2 import Environment, FileSystemLoader
+    from starlette.responses import HTMLResponse, JSONResponse
+
+    env = Environment(loader=FileSystemLoader(template_dir), autoescape=True)
+    app = FastAPI()
+
+    @app.get('/hello')
+    async def hello():
+        return {'message': 'Hello, World!'}
+
+    @app.post('/echo')
+    async def echo(payload: Dict[str, Any]):
+        return payload
+
+    @app.post('/form')
+    async def form(name: str = Form(), value: str = Form()):
+        return {'name': name, 'value': value}
+
+    @app.get('/session')
+    async def session_view(req: Request):
+        count = int(req.cookies.get('count', '0')) + 1
+        response = JSONResponse({'count': count})
+        response.set_cookie('count', str(count), httponly=True, samesite='lax')
+        return response
+
+    @app.get('/template/{name}', response_class=HTMLResponse)
+    async def template(name: str):
+        return HTMLResponse(env.get_template('hello.html').render(name=name))
+
+    v1 = APIRouter(prefix='/v1')
+
+    @v1.get('/items/{item_id}')
+    async def item(item_id: int):
+        return {'id': item_id}
+
+    api = APIRouter(prefix='/api')
+    api.include_router(v1)
+    app.include_router(api)
+    return app
+
+
+def build_foxar(template_dir):
+    from foxar import Blueprint, Foxar, current_app, request, session
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        app = Foxar(__name__, template_folder=template_dir)
+
+    @app.route('/hello')
+    def hello():
+        return {'message': 'Hello, World!'}
+
+    @app.route('/echo', methods=['POST'])
+    def echo():
+        return request.get_json()
+
+    @app.route('/form', methods=['POST'])
+    def form():
+        return request.form().to_dict()
+
+    @app.route('/session')
+    def session_view():
+        session['count'] = session.get('count', 0) + 1
+        return {'count': session['count']}
+
+    @app.route('/template/{name}')
+    def template(name: str):
+        return current_app.render_template('hello.html', name=name)
+
+    v1 = Blueprint('v1', __name__)
+
+    @v1.route('/v1/items/{item_id}')
+    def item(item_id: int):
+        return {'id': item_id}
+
+    api = Blueprint('api', __name__)
+    api.register_blueprint(v1)
+    app.register_blueprint(api, url_prefix='/api')
+    return app
+
+
+def build_flask(template_dir):
+    try:
+        from flask import Blueprint, Flask, render_template, request, session
+    except ImportError:
+        return None
+
+    app = Flask(__name__, template_folder=template_dir)
+    app.secret_key = 'bench'
+
+    @app.route('/hello')
+    def hello():
+        return {'message': 'Hello, World!'}
+
+    @app.route('/echo', methods=['POST'])
+    def echo():
+        return request.get_json()
+
+    @app.route('/form', methods=['POST'])
+    def form():
+        return request.form.to_dict()
+
+    @app.route('/session')
+    def session_view():
+        session['count'] = session.get('count', 0) + 1
+        return {'count': session['count']}
+
+    @app.route('/template/<name>')
+    def template(name):
+        return render_template('hello.html', name=name)
+
+    v1 = Blueprint('v1', __name__, url_prefix='/v1')
+
+    @v1.route('/items/<int:item_id>')
+    def item(item_id):
+        return {'id': item_id}
+
+    api = Blueprint('api', __name__, url_prefix='/api')
+    api.register_blueprint(v1)
+    app.register_blueprint(api)
+    return app
+
+
+def asgi_caller(app):
+    """返回在进程内调用ASGI应用的协程函数，结果为状态码"""
+    async def call(method, path, body, headers):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method,
+            'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '', 'query_string': b'',
+            'headers': [(b'host', b'bench'), (b'content-length', str(len(body)).encode())]
+                       + [(name.encode(), value.encode()) for name, value in headers],
+            'client': ('127.0.0.1', 1), 'server': ('bench', 80),
+        }
+        status = None
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if sent:
+                return {'type': 'http.disconnect'}
+            sent = True
+            return {'type': 'http.request', 'body': body, 'more_body': False}
+
+        async def send(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+
+        await app(scope, receive, send)
+        return status
+    return call
+
+
+def wsgi_caller(app):
+    """返回在进程内调用WSGI应用的协程函数，结果为状态码"""
+    async def call(method, path, body, headers):
+        environ = {
+            'REQUEST_METHOD': method, 'SCRIPT_NAME': '', 'PATH_INFO': path, 'QUERY_STRING': '',
+            'SERVER_NAME': 'bench', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1', 'HTTP_HOST': 'bench', 'CONTENT_LENGTH': str(len(body)),
+            'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(body),
+            'wsgi.errors': sys.stderr, 'wsgi.multithread': False, 'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers:
+            key = name.upper().replace('-', '_')
+            environ[key if key == 'CONTENT_TYPE' else f'HTTP_{key}'] = value
+        status = []
+
+        def start_response(line, response_headers, exc_info=None):
+            status.append(int(line.split(' ', 1)[0]))
+
+        result = app(environ, start_response)
+        try:
+            for _ in result:
+                pass
+        finally:
+            close = getattr(result, 'close', None)
+            if close is not None:
+                close()
+        return status[0]
+    return call
+
+
+async def time_requests(call, scenario, count, repeat):
+    """每个请求的平均耗时（µs），取最快的一轮"""
+    _, method, path, body, headers = scenario
+    status = await call(method, path, body, headers)
+    assert status == 200, (path, status)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(count):
+            await call(method, path, body, headers)
+        best = min(best, time.perf_counter() - start)
+    return best / count * 1e6
+
+
+async def request_allocations(call, scenario, count):
+    """每个请求期间 tracemalloc 记录的内存分配峰值（KiB），取中位数"""
+    _, method, path, body, headers = scenario
+    tracemalloc.start()
+    try:
+        samples = []
+        for _ in range(count):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            await call(method, path, body, headers)
+            samples.append(tracemalloc.get_traced_memory()[1] - before)
+    finally:
+        tracemalloc.stop()
+    return statistics.median(samples) / 1024
+
+
+async def time_async(func, count, repeat):
+    await func()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(count):
+            await func()
+        best = min(best, time.perf_counter() - start)
+    return best / count * 1e6
+
+
+async def layer_costs(count, repeat):
+    """Foxar 每个请求经过的各层开销（µs）
+
+    HookMiddleware 为包裹一个最简ASGI应用前后的耗时差，其余各层单独计时，
+    是 HookMiddleware 开销的组成部分。
+    """
+    from starlette.concurrency import run_in_threadpool
+    from starlette.requests import Request
+    from foxar import Foxar
+    from foxar.app import HookMiddleware, _HookResponse, _current_app
+    from foxar.request import _request_ctx_var, request_context
+    from foxar.signals import request_finished, request_started, teardown_request
+    from foxar.utils import generate_session_id, get_session_id, set_session_cookie
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        app = Foxar(__name__)
+
+    async def inner(scope, receive, send):
+        await send({'type': 'http.response.start', 'status': 200, 'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'ok'})
+
+    scenario = SCENARIOS[0]
+    bare = await time_requests(asgi_caller(inner), scenario, count, repeat)
+    hooked = await time_requests(asgi_caller(HookMiddleware(inner, app_instance=app)), scenario, count, repeat)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/', 'query_string': b'', 'headers': [(b'cookie', b'a=b')]}
+
+    async def context():
+        async with request_context(Request(scope)):
+            pass
+
+    async def signals():
+        request_started.send(app, request=None)
+        request_finished.send(app, response=None)
+        teardown_request.send(app, exception=None)
+
+    async def session_cookie():
+        req = Request(scope)
+        async with request_context(req):
+            session_id = get_session_id(req) or generate_session_id()
+            _request_ctx_var.get().session_id = session_id
+            set_session_cookie(_HookResponse({'status': 200, 'headers': []}), session_id, {})
+
+    async def threadpool():
+        await run_in_threadpool(int)
+
+    token = _current_app.set(app)
+    try:
+        request_context_us = await time_async(context, count, repeat)
+        costs = {
+            'HookMiddleware': hooked - bare,
+            'request_context': request_context_us,
+            'signals': await time_async(signals, count, repeat),
+            # 会话cookie的开销不含请求上下文本身
+            'session cookie': await time_async(session_cookie, count, repeat) - request_context_us,
+            'threadpool hop': await time_async(threadpool, count, repeat),
+        }
+    finally:
+        _current_app.reset(token)
+    return costs
+
+
+def run(count, repeat):
+    template_dir = tempfile.mkdtemp()
+    with open(os.path.join(template_dir, 'hello.html'), 'w') as f:
+        f.write(TEMPLATE)
+
+    targets = [
+        ('starlette', asgi_caller, build_starlette),
+        ('fastapi', asgi_caller, build_fastapi),
+        ('foxar', asgi_caller, build_foxar),
+        ('flask', wsgi_caller, build_flask),
+    ]
+    results = {'requests': {}, 'allocations': {}, 'layers': {}}
+    frameworks = []
+    for name, caller, build in targets:
+        app = build(template_dir)
+        if app is None:
+            print(f'{name} is not installed, skipped', file=sys.stderr)
+            continue
+        frameworks.append(name)
+        call = caller(app)
+
+        async def measure():
+            for scenario in SCENARIOS:
+                key = f'{name}/{scenario[0]}'
+                results['requests'][key] = await time_requests(call, scenario, count, repeat)
+                results['allocations'][key] = await request_allocations(call, scenario, min(count, 200))
+
+        # 每个框架在独立的事件循环中运行，线程池不会互相影响
+        asyncio.run(measure())
+
+    results['layers'] = asyncio.run(layer_costs(count, repeat))
+    return frameworks, results
+
+
+def report(frameworks, results):
+    for title, metric, unit in (('µs/request', 'requests', 'µs'), ('peak KiB/request', 'allocations', 'KiB')):
+        print(f'\n{title}')
+        print(f'{"scenario":<12}' + ''.join(f'{name:>12}' for name in frameworks))
+        for scenario in SCENARIOS:
+            values = [results[metric][f'{name}/{scenario[0]}'] for name in frameworks]
+            print(f'{scenario[0]:<12}' + ''.join(f'{value:12.1f}' for value in values))
+
+    print('\nfoxar layer overhead (µs/request)')
+    for name, us in results['layers'].items():
+        print(f'{name:<16} {us:8.2f}')
+
+
+def regressions(results, baseline, threshold, min_delta):
+    """与基线比较，返回超过阈值的 (指标, 基线值, 当前值) 列表"""
+    found = []
+    for metric in ('requests', 'allocations', 'layers'):
+        for key, old in baseline.get(metric, {}).items():
+            new = results[metric].get(key)
+            if new is None:
+                continue
+            if new > old * (1 + threshold) and new - old > min_delta:
+                found.append((f'{metric}:{key}', old, new))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000, help='每个场景每轮的请求次数')
+    parser.add_argument('--repeat', type=int, default=3, help='轮数，取最快的一轮')
+    parser.add_argument('--json', help='将结果写入JSON文件，可作为之后的基线')
+    parser.add_argument('--baseline', help='基线JSON文件，出现回归时以状态码1退出')
+    parser.add_argument('--threshold', type=float, default=0.2, help='允许的相对增加，默认0.2（20%%）')
+    parser.add_argument('--min-delta', type=float, default=1.0, help='忽略小于该值的增加（µs 或 KiB）')
+    args = parser.parse_args()
+
+    frameworks, results = run(args.requests, args.repeat)
+    report(frameworks, results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.threshold, args.min_delta)
+        if found:
+            print('\nregressions:', file=sys.stderr)
+            for key, old, new in found:
+                print(f'  {key}: {old:.2f} -> {new:.2f} (+{(new / old - 1) * 100:.0f}%)', file=sys.stderr)
+            sys.exit(1)
+        print('\nno regressions against baseline')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""request、g、session、current_app 代理的属性访问开销（纳秒/次）
+
+用法: python benchmarks/bench_proxies.py [--number N] [--repeat R] [--json PATH]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from starlette.requests import Request
+
+from foxar import Foxar, current_app, g, request, session
+from foxar.request import request_context
+
+
+def make_cases():
+    """返回 (名称, 语句) 列表，语句在请求上下文中执行"""
+    bound = request._get_current_object()
+    globals_obj = g._get_current_object()
+    session_obj = session._get_current_object()
+    app = current_app._get_current_object()
+    return [
+        ('request.method', lambda: request.method),
+        ('request.args', lambda: request.args),
+        ('bound request.method', lambda: bound.method),
+        ('bound request.args', lambda: bound.args),
+        ('g.user', lambda: g.user),
+        ("g.get('user')", lambda: g.get('user')),
+        ('bound g.user', lambda: globals_obj.user),
+        ("session['user']", lambda: session['user']),
+        ("bound session['user']", lambda: session_obj['user']),
+        ('current_app.config', lambda: current_app.config),
+        ('bound current_app.config', lambda: app.config),
+    ]
+
+
+def run(number, repeat):
+    app = Foxar(__name__)
+    scope = {'type': 'http', 'method': 'GET', 'path': '/', 'query_string': b'page=1', 'headers': []}
+
+    async def measure():
+        async with request_context(Request(scope)):
+            g.user = 'foxar'
+            session['user'] = 'foxar'
+            with app.app_context():
+                results = {}
+                for name, func in make_cases():
+                    best = min(timeit.repeat(func, number=number, repeat=repeat))
+                    results[name] = best / number * 1e9
+                return results
+
+    return asyncio.run(measure())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=200000, help='每轮访问次数')
+    parser.add_argument('--repeat', type=int, default=5, help='轮数，取最快的一轮')
+    parser.add_argument('--json', help='将结果写入JSON文件，便于跟踪变化')
+    args = parser.parse_args()
+
+    results = run(args.number, args.repeat)
+    width = max(len(name) for name in results)
+    for name, ns in results.items():
+        print(f'{name:<{width}}  {ns:8.1f} ns')
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
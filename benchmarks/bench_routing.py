@@ -0,0 +1,82 @@
+"""FlaskRoute 与默认 FastAPI 路由的注册耗时和每个请求的开销
+
+用法: python benchmarks/bench_routing.py [--routes N] [--requests N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from foxar import Foxar
+from foxar.routing import FlaskRoute
+
+
+def build_app(route_class, count):
+    """注册 count 个带整数路径参数的视图，返回 (应用, 注册耗时秒)"""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        app = Foxar(__name__)
+    start = time.perf_counter()
+
+    async def async_view(item_id: int):
+        return {'item': item_id}
+    app.route('/async/{item_id}', route_class=route_class)(async_view)
+
+    for i in range(count):
+        def view(item_id: int):
+            return {'item': item_id}
+        view.__name__ = f'view_{i}'
+        app.route(f'/items{i}/{{item_id}}', route_class=route_class)(view)
+    return app, time.perf_counter() - start
+
+
+async def call(app, path):
+    """在进程内直接调用ASGI应用，返回状态码"""
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'root_path': '',
+        'query_string': b'', 'headers': [(b'host', b'bench')], 'client': ('127.0.0.1', 1), 'server': ('bench', 80),
+    }
+    status = None
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
+
+
+async def measure(app, path, count):
+    assert await call(app, path) == 200, path
+    start = time.perf_counter()
+    for _ in range(count):
+        await call(app, path)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--routes', type=int, default=1000, help='注册的路由数量')
+    parser.add_argument('--requests', type=int, default=2000, help='每种视图的请求次数')
+    args = parser.parse_args()
+
+    print(f'{"route class":<12} {"register ms":>12} {"sync µs/req":>12} {"async µs/req":>13}')
+    for label, route_class in (('APIRoute', None), ('FlaskRoute', FlaskRoute)):
+        app, elapsed = build_app(route_class, args.routes)
+        # 请求靠前的路由，避免路由表长度影响比较
+        sync_us = asyncio.run(measure(app, '/items0/1', args.requests))
+        async_us = asyncio.run(measure(app, '/async/1', args.requests))
+        print(f'{label:<12} {elapsed * 1000:12.1f} {sync_us:12.1f} {async_us:13.1f}')
+
+
+if __name__ == '__main__':
+    main()
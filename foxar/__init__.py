@@ -2,8 +2,7 @@ from .app import Foxar
 from .blueprints import Blueprint
 from .request import request, g
 from .response import Response, JSONResponse, HTMLResponse, PlainTextResponse, make_response, jsonify, redirect, abort, HTTPException
-from .utils import Config, url_for, flash, get_flashed_messages, session, safe_join, send_file, url_quote, url_unquote, escape
-from .test_client import TestClient
+from .utils import Config, url_for, flash, get_flashed_messages, session, safe_join, send_file, url_quote, url_unquote, escape, stream_with_context
 from .signals import (
     request_started,
     request_finished,
@@ -12,16 +11,53 @@ from .signals import (
     appcontext_pushed,
     appcontext_popped,
     message_flashed,
+    request_timed,
     signals_available
 )
 from .app import current_app
-from .csrf import csrf, generate_csrf, validate_csrf
+
+import sys as _sys
+import types as _types
+
+# 不常用的部分在第一次访问时才导入：TestClient 会导入 httpx，CSRF 只在启用时需要
+_LAZY_IMPORTS = {
+    'TestClient': '.test_client',
+    'csrf': '.csrf',
+    'generate_csrf': '.csrf',
+    'validate_csrf': '.csrf',
+    'FlaskRoute': '.routing',
+}
+
+def __getattr__(name):
+    module_name = _LAZY_IMPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    module = importlib.import_module(module_name, __name__)
+    # 同一模块提供的名称一起缓存到包中，之后的访问不再经过 __getattr__
+    for lazy_name, lazy_module in _LAZY_IMPORTS.items():
+        if lazy_module == module_name:
+            globals()[lazy_name] = getattr(module, lazy_name)
+    return globals()[name]
+
+class _FoxarModule(_types.ModuleType):
+    """导入子模块 foxar.csrf 时，导入系统会把包的 csrf 属性设为子模块，这里保留同名的 CSRFProtect 实例"""
+    def __setattr__(self, name, value):
+        if (isinstance(value, _types.ModuleType) and name in _LAZY_IMPORTS
+                and value.__name__ == f'{self.__name__}.{name}'):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+_sys.modules[__name__].__class__ = _FoxarModule
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_IMPORTS))
 
 __all__ = [
     'Foxar', 'Blueprint', 'request', 'g', 'current_app', 'Response',
     'JSONResponse', 'HTMLResponse', 'PlainTextResponse',
     'make_response', 'jsonify', 'redirect', 'abort', 'HTTPException', 'Config', 'url_for',
-    'flash', 'get_flashed_messages', 'session', 'safe_join', 'send_file', 'url_quote', 'url_unquote', 'escape', 'csrf', 'generate_csrf', 'validate_csrf', 'TestClient',
+    'flash', 'get_flashed_messages', 'session', 'safe_join', 'send_file', 'url_quote', 'url_unquote', 'escape', 'stream_with_context', 'csrf', 'generate_csrf', 'validate_csrf', 'TestClient', 'FlaskRoute',
     'request_started',
     'request_finished',
     'request_exception',
@@ -29,6 +65,7 @@ __all__ = [
     'appcontext_pushed',
     'appcontext_popped',
     'message_flashed',
+    'request_timed',
     'signals_available'
 ]
 
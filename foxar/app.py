@@ -1,34 +1,109 @@
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 from starlette.middleware import Middleware
-from starlette.responses import Response as StarletteResponse, HTMLResponse
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response as StarletteResponse, HTMLResponse, StreamingResponse
 from starlette.requests import Request
 from typing import Optional, List, Dict, Any, Callable, Union, Collection, Awaitable
+import threading
+import time
 from .blueprints import Blueprint
-from .request import request_proxy, request_context
+from .request import request_proxy, request_context, LimitedReceive, close_input_stream, end_body_reads, _request_ctx_var
 
-class HookMiddleware(BaseHTTPMiddleware):
-    """处理Flask风格的钩子函数"""
+class _HookResponse(StarletteResponse):
+    """对已开始发送的响应的包装，供after_request钩子修改状态码和头部
+    
+    响应体不经过这里，而是由下游应用直接发送，因此流式响应、
+    pathsend 和 zerocopy 等扩展都不会被缓冲。
+    """
+    def __init__(self, message):
+        self.status_code = message["status"]
+        self.raw_headers = list(message.get("headers", []))
+        self.background = None
+        self.body = None
+
+
+async def _call_hook(func: Callable, *args):
+    """调用钩子函数，同步函数在线程池中运行"""
+    import inspect
+    if inspect.iscoroutinefunction(func):
+        return await func(*args)
+    from starlette.concurrency import run_in_threadpool
+    return await run_in_threadpool(func, *args)
+
+
+class HookMiddleware:
+    """处理Flask风格的钩子函数（纯ASGI中间件）"""
     def __init__(self, app, app_instance):
-        super().__init__(app)
+        self.app = app
         self.app_instance = app_instance
     
-    async def dispatch(self, request: Request, call_next):
-        # 设置请求上下文
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        # 按 MAX_CONTENT_LENGTH 限制请求体，在读取时检查
+        receive = LimitedReceive(receive, scope, self.app_instance.config.get('MAX_CONTENT_LENGTH'))
+        
+        # 设置请求上下文，同时推送应用上下文
+        app_token = _current_app.set(self.app_instance)
+        try:
+            await self._dispatch(scope, receive, send)
+        finally:
+            close_input_stream(scope)
+            _current_app.reset(app_token)
+    
+    def _finalize(self, response, session_id, timings=None):
+        """保存会话并发送请求结束信号"""
+        from .utils import set_session_cookie
+        if timings is not None:
+            start = time.perf_counter()
+        # 本次请求没有访问会话时不加载会话数据
+        ctx = _request_ctx_var.get()
+        session_obj = ctx.session if ctx is not None else None
+        set_session_cookie(response, session_id, session_obj.data if session_obj is not None else None)
+        if timings is not None:
+            timings.record('session', start)
+        
+        # 发送请求结束信号
+        from .signals import request_finished
+        request_finished.send(self.app_instance, response=response)
+        
+        # 发送请求拆卸信号
+        from .signals import teardown_request
+        teardown_request.send(self.app_instance, exception=None)
+    
+    def _emit_timings(self, response, request, timings):
+        """添加 Server-Timing 响应头，并把各阶段耗时发送给 request_timed 的接收器"""
+        timings.record('total', timings.start)
+        if self.app_instance.config.get('SERVER_TIMING'):
+            response.raw_headers.append((b"server-timing", timings.header_value().encode("latin-1")))
+        from .signals import request_timed
+        if request_timed.receivers:
+            request_timed.send(self.app_instance, request=request, timings=dict(timings.stages))
+    
+    async def _dispatch(self, scope, receive, send):
+        request = Request(scope, receive)
         async with request_context(request):
             # 处理会话
-            from .utils import get_session_id, generate_session_id, _session_ctx_var, _session_id_ctx_var
+            from .utils import get_session_id, generate_session_id
+            from .request import _request_ctx_var
             
             # 获取或生成会话ID
             session_id = get_session_id(request)
             if not session_id:
                 session_id = generate_session_id()
             
-            # 设置会话ID上下文
-            _session_id_ctx_var.set(session_id)
-            # 初始化会话数据
-            _session_ctx_var.set({})
+            # 设置会话ID，会话数据在第一次访问时创建
+            ctx = _request_ctx_var.get()
+            ctx.session_id = session_id
+            
+            # 启用 SERVER_TIMING 或有 request_timed 接收器时记录各阶段耗时
+            from .signals import request_timed
+            timings = None
+            if self.app_instance.config.get('SERVER_TIMING') or request_timed.receivers:
+                from .timing import RequestTimings
+                timings = ctx.timings = RequestTimings()
             
             # 发送请求开始信号
             from .signals import request_started
@@ -37,55 +112,59 @@ class HookMiddleware(BaseHTTPMiddleware):
             try:
                 # 执行请求前钩子
                 for func in self.app_instance.before_request_funcs:
-                    import inspect
-                    if inspect.iscoroutinefunction(func):
-                        result = await func()
-                    else:
-                        from starlette.concurrency import run_in_threadpool
-                        result = await run_in_threadpool(func)
+                    result = await _call_hook(func)
                     # 如果钩子返回响应，则直接返回
                     if result is not None:
-                        # 保存会话数据到cookie
-                        from .utils import set_session_cookie, session
-                        session_data = session().data
-                        set_session_cookie(result, session_id, session_data)
-                        
-                        # 发送请求结束信号
-                        from .signals import request_finished
-                        request_finished.send(self.app_instance, response=result)
-                        
-                        # 发送请求拆卸信号
-                        from .signals import teardown_request
-                        teardown_request.send(self.app_instance, exception=None)
-                        
-                        return result
+                        if timings is not None:
+                            timings.record('before_request', timings.start)
+                        self._finalize(result, session_id, timings)
+                        if timings is not None:
+                            self._emit_timings(result, request, timings)
+                        await result(scope, receive, send)
+                        return
+                if timings is not None and self.app_instance.before_request_funcs:
+                    timings.record('before_request', timings.start)
                 
-                # 执行请求处理
-                response = await call_next(request)
+                # 替换后的响应已发送时，丢弃下游应用的后续消息
+                replaced = False
                 
-                # 执行请求后钩子
-                for func in self.app_instance.after_request_funcs:
-                    import inspect
-                    if inspect.iscoroutinefunction(func):
-                        response = await func(response)
+                async def send_wrapper(message):
+                    nonlocal replaced
+                    if replaced:
+                        return
+                    if message["type"] != "http.response.start":
+                        await send(message)
+                        return
+                    receive.started = True
+                    
+                    if timings is not None:
+                        if timings.view_end is not None:
+                            timings.record('serialize', timings.view_end)
+                        start = time.perf_counter()
+                    
+                    # 执行请求后钩子
+                    response = _HookResponse(message)
+                    original = response
+                    for func in self.app_instance.after_request_funcs:
+                        response = await _call_hook(func, response)
+                    if timings is not None and self.app_instance.after_request_funcs:
+                        timings.record('after_request', start)
+                    
+                    self._finalize(response, session_id, timings)
+                    if timings is not None:
+                        self._emit_timings(response, request, timings)
+                    
+                    if response is original:
+                        message["status"] = response.status_code
+                        message["headers"] = response.raw_headers
+                        await send(message)
                     else:
-                        from starlette.concurrency import run_in_threadpool
-                        response = await run_in_threadpool(func, response)
-                
-                # 保存会话数据到cookie
-                from .utils import set_session_cookie, session
-                session_data = session().data
-                set_session_cookie(response, session_id, session_data)
+                        # 钩子返回了新的响应对象
+                        replaced = True
+                        await response(scope, receive, send)
                 
-                # 发送请求结束信号
-                from .signals import request_finished
-                request_finished.send(self.app_instance, response=response)
-                
-                # 发送请求拆卸信号
-                from .signals import teardown_request
-                teardown_request.send(self.app_instance, exception=None)
-                
-                return response
+                # 执行请求处理
+                await self.app(scope, receive, send_wrapper)
             except Exception as e:
                 # 发送请求异常信号
                 from .signals import request_exception
@@ -103,24 +182,32 @@ _current_app: ContextVar[Optional['Foxar']] = ContextVar('current_app', default=
 
 class _AppProxy:
     """应用代理对象"""
-    @property
-    def _get_current_object(self):
+    __slots__ = ()
+    
+    def _get_current_object(self) -> 'Foxar':
+        """返回当前应用，循环中重复访问时省去上下文查找"""
         app = _current_app.get()
         if app is None:
             raise RuntimeError('在应用上下文之外访问 current_app')
         return app
     
-    def __getattr__(self, name):
-        return getattr(self._get_current_object, name)
+    def __getattribute__(self, name):
+        # 所有属性直接转发到当前应用，只查找一次上下文
+        if name == '_get_current_object':
+            return object.__getattribute__(self, name)
+        app = _current_app.get()
+        if app is None:
+            raise RuntimeError('在应用上下文之外访问 current_app')
+        return getattr(app, name)
     
     def __setattr__(self, name, value):
-        setattr(self._get_current_object, name, value)
+        setattr(self._get_current_object(), name, value)
     
     def __delattr__(self, name):
-        delattr(self._get_current_object, name)
+        delattr(self._get_current_object(), name)
     
     def __call__(self, *args, **kwargs):
-        return self._get_current_object(*args, **kwargs)
+        return self._get_current_object()(*args, **kwargs)
 
 # 创建全局应用代理对象
 current_app = _AppProxy()
@@ -162,6 +249,7 @@ class Foxar(FastAPI):
         instance_path: Optional[str] = None,
         instance_relative_config: bool = False,
         root_path: str = "",
+        route_class: Optional[type] = None,
         **kwargs
     ):
         super().__init__(
@@ -176,11 +264,22 @@ class Foxar(FastAPI):
         self.instance_path = instance_path
         self.instance_relative_config = instance_relative_config
         self.blueprints: List[Blueprint] = []
+        # include_router 没有复制路由时记录蓝图路由器及其前缀，路由之前确定请求体上限时使用
+        self._included_routers: List[tuple] = []
+        # route() 和 add_url_rule() 默认使用的路由类，FlaskRoute 跳过 FastAPI 的参数解析
+        self.default_route_class = route_class
+        # OpenAPI 文档在第一次访问时生成，记录生成时的路由表版本
+        self._openapi_lock = threading.Lock()
+        self._openapi_schema_version = None
         
         # 初始化钩子函数列表
         self.before_request_funcs: List[Callable] = []
         self.after_request_funcs: List[Callable] = []
         
+        # 模板上下文处理器
+        self.template_context_processors: List[Callable] = []
+        self.lazy_context_processors: Dict[str, Callable] = {}
+        
         # 初始化配置
         from .utils import Config
         self.config = Config(root_path=root_path)
@@ -190,28 +289,67 @@ class Foxar(FastAPI):
         # 注册钩子中间件
         self.add_middleware(HookMiddleware, app_instance=self)
         
+        # 注册响应压缩中间件（位于钩子外层，压缩 after_request 处理后的响应）
+        from .compress import CompressMiddleware
+        self.add_middleware(CompressMiddleware, app_instance=self)
+        
         # 添加静态文件服务
         if static_folder is not None:
-            from fastapi.staticfiles import StaticFiles
+            from .static import StaticFiles
             static_url = static_url_path or "/static"
             
-            # 创建静态文件服务，支持缓存控制
+            # 创建静态文件服务，支持预压缩文件和内存缓存
             static_files = StaticFiles(
                 directory=static_folder,
-                check_dir=True
+                check_dir=True,
+                app=self
             )
             
             # 挂载静态文件服务
             self.mount(static_url, static_files, name="static")
+            # 启用 STATIC_HASHED_URLS 时在启动阶段计算内容哈希
+            self.router.on_startup.append(static_files.startup)
             
             # 存储静态文件配置
             self.static_files = static_files
         
-        # 初始化模板引擎
-        self.templates = None
-        if template_folder is not None:
+        # 模板引擎在首次使用时按配置创建
+        self._templates = None
+    
+    @property
+    def templates(self):
+        """模板引擎，首次访问时根据 TEMPLATE_CACHE_DIR 等配置创建
+
+        应用和所有蓝图的模板目录共用同一个Jinja环境和编译缓存。
+        """
+        if self._templates is None and self._has_template_folders():
             from fastapi.templating import Jinja2Templates
-            self.templates = Jinja2Templates(directory=template_folder)
+            from .templating import create_jinja_environment
+            self._templates = Jinja2Templates(env=create_jinja_environment(self))
+        return self._templates
+    
+    @templates.setter
+    def templates(self, value):
+        self._templates = value
+    
+    def _has_template_folders(self) -> bool:
+        if self.template_folder is not None:
+            return True
+        from .templating import _iter_blueprints
+        return any(bp.template_folder is not None for bp in _iter_blueprints(self.blueprints))
+    
+    @property
+    def jinja_env(self):
+        """Jinja环境（兼容Flask）"""
+        templates = self.templates
+        if templates is None:
+            raise RuntimeError("Template folder not set")
+        return templates.env
+    
+    @property
+    def fragment_cache(self):
+        """模板片段缓存，可通过 invalidate(prefix) 按键前缀失效"""
+        return self.jinja_env.fragment_cache
     
     def app_context(self):
         """创建应用上下文"""
@@ -227,9 +365,16 @@ class Foxar(FastAPI):
     ):
         if methods is None:
             methods = ["GET"]
+        # 路由级请求体大小上限，覆盖 MAX_CONTENT_LENGTH
+        limit = options.pop('max_content_length', None)
+        route_class = options.pop('route_class', None)
         
         def decorator(f: Callable) -> Callable:
             nonlocal endpoint
+            if isinstance(endpoint, str):
+                # Flask风格的端点名称
+                options.setdefault('name', endpoint)
+                endpoint = None
             if endpoint is None:
                 endpoint = f
             
@@ -246,35 +391,167 @@ class Foxar(FastAPI):
                     endpoint = redirect_handler
             
             # 注册路由
-            self.add_api_route(
-                path=rule,
-                endpoint=self._wrap_endpoint(endpoint),
-                methods=list(methods),
-                **options
-            )
+            self._add_view_route(rule, endpoint, list(methods), limit, route_class, options)
             return endpoint
         
         return decorator
     
-    def _wrap_endpoint(self, endpoint: Callable) -> Callable:
-        async def wrapped_endpoint(request: Request, *args, **kwargs):
+    def _add_view_route(
+        self,
+        rule: str,
+        view_func: Callable,
+        methods: List[str],
+        limit: Optional[int],
+        route_class: Optional[type],
+        options: Dict[str, Any],
+    ) -> None:
+        """注册视图，route_class 为 FlaskRoute 时不经过 FastAPI 的 add_api_route"""
+        from .routing import FlaskRoute, add_flask_route
+        if route_class is None:
+            route_class = self.default_route_class
+        if not self.config.get('OPENAPI_INCLUDE_FLASK_ROUTES', True):
+            options.setdefault('include_in_schema', False)
+        if route_class is not None and issubclass(route_class, FlaskRoute):
+            options = {k: v for k, v in options.items() if k not in ('strict_slashes', 'redirect_to')}
+            add_flask_route(self.router, route_class(rule, view_func, methods=methods, max_content_length=limit, **options))
+            return
+        if route_class is not None:
+            options['route_class_override'] = route_class
+        self.add_api_route(
+            path=rule,
+            endpoint=self._wrap_endpoint(view_func, limit),
+            methods=methods,
+            **options
+        )
+    
+    def _routes_version(self) -> int:
+        get_version = getattr(self.router, '_get_routes_version', None)
+        return get_version() if get_version is not None else len(self.routes)
+    
+    def openapi(self) -> Dict[str, Any]:
+        """OpenAPI 文档，包含 include_in_schema 为 True 的 FlaskRoute
+        
+        第一次访问时才生成，路由变化后重新生成。配置了 OPENAPI_CACHE_DIR 时按路由表
+        哈希缓存到文件，其他worker和重启后的进程直接读取。
+        """
+        version = self._routes_version()
+        if self.openapi_schema is None or self._openapi_schema_version != version:
+            with self._openapi_lock:
+                if self.openapi_schema is None or self._openapi_schema_version != version:
+                    self.openapi_schema = self._build_openapi()
+                    self._openapi_schema_version = version
+        return self.openapi_schema
+    
+    def _build_openapi(self) -> Dict[str, Any]:
+        path = None
+        cache_dir = self.config.get('OPENAPI_CACHE_DIR')
+        if cache_dir:
+            from .openapi import cache_path, load_schema, route_table_key
+            path = cache_path(cache_dir, route_table_key(self))
+            schema = load_schema(path)
+            if schema is not None:
+                return schema
+        
+        # 由 FastAPI 生成，再加入 FlaskRoute
+        self.openapi_schema = None
+        schema = super().openapi()
+        from .routing import add_openapi_operations
+        add_openapi_operations(schema, self.routes)
+        if path is not None:
+            from .openapi import write_schema
+            write_schema(path, schema)
+        return schema
+    
+    def prebuild_openapi(self, cache_dir: Optional[str] = None) -> str:
+        """部署时预先生成 OpenAPI 文档缓存，返回缓存文件路径"""
+        if cache_dir:
+            self.config['OPENAPI_CACHE_DIR'] = cache_dir
+        cache_dir = self.config.get('OPENAPI_CACHE_DIR')
+        if not cache_dir:
+            raise RuntimeError('需要配置 OPENAPI_CACHE_DIR')
+        from .openapi import cache_path, route_table_key
+        self.openapi()
+        return cache_path(cache_dir, route_table_key(self))
+    
+    def setup(self) -> None:
+        super().setup()
+        if not self.openapi_url:
+            return
+        # 替换 FastAPI 的文档路由，生成文档时不阻塞事件循环
+        from starlette.routing import Route
+        for index, route in enumerate(self.router.routes):
+            if isinstance(route, Route) and route.path == self.openapi_url:
+                self.router.routes[index] = Route(self.openapi_url, self._serve_openapi, include_in_schema=False, name=route.name)
+                break
+    
+    async def _serve_openapi(self, req: Request) -> StarletteResponse:
+        if self.openapi_schema is not None and self._openapi_schema_version == self._routes_version():
+            schema = self.openapi()
+        else:
+            # 生成可能需要几秒，在线程池中进行，其他请求照常处理
+            from starlette.concurrency import run_in_threadpool
+            schema = await run_in_threadpool(self.openapi)
+        root_path = req.scope.get("root_path", "").rstrip("/")
+        if root_path and self.root_path_in_servers:
+            server_urls = {s.get("url") for s in schema.get("servers", [])}
+            if root_path not in server_urls:
+                schema = dict(schema)
+                schema["servers"] = [{"url": root_path}] + schema.get("servers", [])
+        from starlette.responses import JSONResponse
+        return JSONResponse(schema)
+    
+    def _wrap_endpoint(self, endpoint: Callable, max_content_length: Optional[int] = None) -> Callable:
+        async def wrapped_endpoint(_foxar_request: Request, **kwargs):
             # 设置请求上下文
-            async with request_context(request):
-                return await self._run_endpoint(endpoint, *args, **kwargs)
+            async with request_context(_foxar_request):
+                return await self._run_endpoint(endpoint, **kwargs)
+        
+        # 对外只暴露视图自身的参数（路径参数等），请求对象单独注入
+        import inspect
+        parameters = [inspect.Parameter('_foxar_request', inspect.Parameter.POSITIONAL_OR_KEYWORD, annotation=Request)]
+        for param in inspect.signature(endpoint).parameters.values():
+            if param.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+                continue
+            parameters.append(param.replace(kind=inspect.Parameter.KEYWORD_ONLY))
+        wrapped_endpoint.__signature__ = inspect.Signature(parameters)
+        wrapped_endpoint.__name__ = getattr(endpoint, '__name__', wrapped_endpoint.__name__)
+        wrapped_endpoint.max_content_length = max_content_length
         return wrapped_endpoint
     
     async def _run_endpoint(self, endpoint: Callable, *args, **kwargs):
         if hasattr(endpoint, "__wrapped__"):
             endpoint = endpoint.__wrapped__
         
-        # 检查是否是异步函数
+        # 启用 SERVER_TIMING 时请求上下文中带有 RequestTimings
+        ctx = _request_ctx_var.get()
+        timings = ctx.timings if ctx is not None else None
+        
+        # 检查是否是异步函数；异步视图通过 await request.form() 等按需读取请求体
         import inspect
-        if inspect.iscoroutinefunction(endpoint):
-            return await endpoint(*args, **kwargs)
-        else:
-            # 同步函数在线程池中运行
-            from starlette.concurrency import run_in_threadpool
-            return await run_in_threadpool(endpoint, *args, **kwargs)
+        try:
+            if inspect.iscoroutinefunction(endpoint):
+                if timings is None:
+                    return await endpoint(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return await endpoint(*args, **kwargs)
+                finally:
+                    timings.view_end = timings.record('view', start)
+            else:
+                # 在事件循环中预读请求体，同步视图可以直接读取 request.json 等数据
+                if timings is not None:
+                    start = time.perf_counter()
+                await request_proxy.load_body(self.config.get('REQUEST_PREFETCH_MAX_SIZE'), parse=False)
+                # 同步函数在线程池中运行
+                from starlette.concurrency import run_in_threadpool
+                if timings is None:
+                    return await run_in_threadpool(endpoint, *args, **kwargs)
+                submitted = timings.record('body', start)
+                return await run_in_threadpool(timings.run_view, submitted, endpoint, *args, **kwargs)
+        finally:
+            # 视图返回后不再读取请求体，之后的 receive 调用来自响应等待断开连接，不检查请求体大小
+            if ctx is not None:
+                end_body_reads(ctx.request)
     
     def register_blueprint(
         self,
@@ -288,10 +565,18 @@ class Foxar(FastAPI):
         # 计算实际的URL前缀
         blueprint_prefix = url_prefix or blueprint.url_prefix or ""
         
+        # 蓝图的路由是否出现在 OpenAPI 中：注册参数、蓝图设置、应用配置依次优先
+        include_in_schema = options.pop('include_in_schema', None)
+        if include_in_schema is None:
+            include_in_schema = blueprint.include_in_schema
+        if include_in_schema is None:
+            include_in_schema = self.config.get('OPENAPI_INCLUDE_FLASK_ROUTES', True)
+        
         # 注册蓝图的路由
-        self.include_router(
-            router=blueprint.router,
+        self._include_blueprint_router(
+            blueprint.router,
             prefix=blueprint_prefix,
+            include_in_schema=include_in_schema,
             **options
         )
         
@@ -304,15 +589,53 @@ class Foxar(FastAPI):
                     full_prefix += "/"
                 full_prefix += nested_prefix.lstrip("/")
             
-            self.include_router(
-                router=nested_blueprint.router,
+            nested_include = nested_blueprint.include_in_schema
+            self._include_blueprint_router(
+                nested_blueprint.router,
                 prefix=full_prefix,
+                include_in_schema=include_in_schema if nested_include is None else nested_include,
                 **options
             )
         
         # 执行蓝图的注册函数
         blueprint.register(self, options)
     
+    def _include_blueprint_router(self, router, **options) -> None:
+        """包含蓝图的路由器
+        
+        较早的 FastAPI 在 include_router 时复制路由，把蓝图记录在路由上的请求体大小上限带到副本上。
+        """
+        start = len(self.router.routes)
+        self.include_router(router=router, **options)
+        copies = self.router.routes[start:]
+        if len(copies) != len(router.routes) or any(
+            getattr(route, 'endpoint', None) is not getattr(original, 'endpoint', None)
+            for original, route in zip(router.routes, copies)
+        ):
+            # 较新的 FastAPI 不复制路由，请求时再进入蓝图路由器匹配
+            self._included_routers.append((options.get('prefix', ''), router))
+            return
+        for original, route in zip(router.routes, copies):
+            limit = getattr(original, 'max_content_length', None)
+            if limit is not None and route is not original:
+                route.max_content_length = limit
+    
+    def _request_max_content_length(self, scope: Dict[str, Any]) -> Optional[int]:
+        """在路由之前确定请求适用的请求体大小上限，供路由前读取请求体的中间件使用"""
+        from starlette.routing import Match
+        from .request import max_content_length
+        default = self.config.get('MAX_CONTENT_LENGTH')
+        candidates = [(scope, self.router.routes)]
+        root_path = scope.get('root_path', '')
+        for prefix, router in self._included_routers:
+            candidates.append(({**scope, 'root_path': root_path + prefix}, router.routes))
+        for route_scope, routes in candidates:
+            for route in routes:
+                match, child_scope = route.matches(route_scope)
+                if match == Match.FULL and 'endpoint' in child_scope:
+                    return max_content_length({**child_scope, 'route': route}, default)
+        return default
+    
     def run(
         self,
         host: str = "127.0.0.1",
@@ -370,13 +693,9 @@ class Foxar(FastAPI):
             methods = ["GET"]
         
         if view_func is not None:
-            self.add_api_route(
-                path=rule,
-                endpoint=self._wrap_endpoint(view_func),
-                methods=methods,
-                name=endpoint,
-                **options
-            )
+            limit = options.pop('max_content_length', None)
+            route_class = options.pop('route_class', None)
+            self._add_view_route(rule, view_func, list(methods), limit, route_class, dict(options, name=endpoint))
     
     def before_request(self, f: Callable) -> Callable:
         """注册请求前钩子"""
@@ -517,34 +836,91 @@ class Foxar(FastAPI):
     
     def url_for(self, endpoint: str, **values) -> str:
         """生成URL"""
+        if endpoint == 'static' and values.get('filename'):
+            return self.static_url_path_for(values.pop('filename'), **values)
         from .utils import url_for
         return url_for(endpoint, **values)
     
-    def render_template(self, template_name: str, **context) -> HTMLResponse:
-        """渲染模板"""
-        if self.templates is None:
-            raise RuntimeError("Template folder not set")
+    def context_processor(self, f: Optional[Callable] = None, *, lazy: bool = False, name: Optional[str] = None):
+        """注册模板上下文处理器
         
-        # 获取当前请求对象
+        普通处理器返回字典，每次渲染时合并到上下文（显式传入的变量优先）。
+        lazy=True 时函数的返回值就是名为 name（默认为函数名）的变量，
+        只有模板实际用到该变量时才会调用，每次渲染最多调用一次。
+        """
+        def decorator(func: Callable) -> Callable:
+            if lazy:
+                self.lazy_context_processors[name or func.__name__] = func
+            else:
+                self.template_context_processors.append(func)
+            return func
+        if f is None:
+            return decorator
+        return decorator(f)
+    
+    def _template_context(self, context: Dict[str, Any]) -> Dict[str, Any]:
+        """在调用方传入的上下文上合并处理器结果以及 request、g"""
+        for processor in self.template_context_processors:
+            for key, value in processor().items():
+                context.setdefault(key, value)
         from .request import request, g
-        req = request.request
+        context["request"] = request
+        context["g"] = g
+        return context
+    
+    def render_template(self, template_name: str, stream: bool = False, **context) -> HTMLResponse:
+        """渲染模板，stream 为 True 时流式发送（见 stream_template）"""
+        if stream:
+            return self.stream_template(template_name, **context)
+        
+        env = self.jinja_env
+        context = self._template_context(context)
+        
+        # 只有存在接收器时才发送信号
+        from .signals import before_render_template, template_rendered
+        if before_render_template.receivers:
+            before_render_template.send(self, template=template_name, context=context)
         
-        # 构建上下文
-        template_context = {**context, "request": request, "g": g}
+        import time
+        template = env.get_template(template_name)
+        start = time.perf_counter()
+        content = template.render(context)
         
-        # 发送模板渲染前信号
-        from .signals import before_render_template
-        before_render_template.send(self, template=template_name, context=template_context)
+        # 渲染完成后发送，渲染耗时（秒）只传给接受 duration 的接收器，旧签名的接收器照常触发
+        if template_rendered.receivers:
+            template_rendered.send_optional(
+                self, template=template_name, context=context,
+                optional={'duration': time.perf_counter() - start}
+            )
+        
+        return HTMLResponse(content)
+    
+    def stream_template(self, template_name: str, **context) -> StreamingResponse:
+        """流式渲染模板
         
-        # 发送模板渲染信号
-        from .signals import template_rendered
-        template_rendered.send(self, template=template_name, context=template_context)
+        模板边生成边发送，每次至少缓冲 TEMPLATE_STREAM_BUFFER_SIZE 个字符。
+        生成过程中请求上下文保持可用，template_rendered 在生成结束后发送。
+        """
+        env = self.jinja_env
+        context = self._template_context(context)
         
-        # 渲染模板
-        return self.templates.TemplateResponse(
-            name=template_name,
-            context=template_context,
-            request=req
+        from .signals import before_render_template, template_rendered
+        if before_render_template.receivers:
+            before_render_template.send(self, template=template_name, context=context)
+        
+        on_finish = None
+        if template_rendered.receivers:
+            def on_finish(duration: float) -> None:
+                template_rendered.send_optional(
+                    self, template=template_name, context=context, optional={'duration': duration}
+                )
+        
+        from .templating import generate_template
+        template = env.get_template(template_name)
+        buffer_size = self.config.get('TEMPLATE_STREAM_BUFFER_SIZE') or 1
+        return StreamingResponse(
+            generate_template(template, context, buffer_size, on_finish),
+            media_type="text/html"
         )
     
     def use(self, middleware) -> None:
@@ -555,35 +931,46 @@ class Foxar(FastAPI):
     
     def send_from_directory(self, directory, path, **options):
         """从目录发送文件"""
-        from starlette.responses import FileResponse
-        from pathlib import Path
+        from .utils import safe_join, send_file
         
-        # 构建文件路径
-        file_path = Path(directory) / path
+        # 构建文件路径，防止目录穿越
+        try:
+            file_path = safe_join(directory, path)
+        except ValueError:
+            from starlette.responses import Response
+            return Response("File not found", status_code=404)
         
         # 检查文件是否存在
-        if not file_path.exists() or not file_path.is_file():
+        import os
+        if not os.path.isfile(file_path):
             from starlette.responses import Response
             return Response("File not found", status_code=404)
         
-        # 获取缓存控制选项
-        mimetype = options.get('mimetype')
-        as_attachment = options.get('as_attachment', False)
-        filename = options.get('filename')
-        
-        # 创建文件响应
-        return FileResponse(
-            path=file_path,
-            media_type=mimetype,
-            filename=filename,
-            stat_result=None,
-            method=None
-        )
+        # 兼容旧参数名 filename
+        if 'filename' in options:
+            options.setdefault('download_name', options.pop('filename'))
+        
+        return send_file(file_path, **options)
+    
+    def get_send_file_max_age(self, filename: Optional[str] = None) -> Optional[int]:
+        """获取send_file使用的缓存时间，可在子类中按文件名覆盖"""
+        value = self.config.get('SEND_FILE_MAX_AGE_DEFAULT')
+        if value is None:
+            return None
+        if hasattr(value, 'total_seconds'):
+            return int(value.total_seconds())
+        return int(value)
     
     def static_url_path_for(self, filename, **values):
-        """生成静态文件URL"""
-        from .utils import url_for
-        return url_for('static', filename=filename, **values)
+        """生成静态文件URL，启用 STATIC_HASHED_URLS 时文件名带内容哈希"""
+        static_files = getattr(self, 'static_files', None)
+        if static_files is not None:
+            filename = static_files.url_path(filename)
+        path = (self.static_url_path or "/static").rstrip('/') + '/' + filename.lstrip('/')
+        if values:
+            from .utils import _static_query
+            path = _static_query(path, values)
+        return path
     
     @property
     def wsgi_app(self):
@@ -12,7 +12,10 @@ class Blueprint:
         url_prefix: Optional[str] = None,
         subdomain: Optional[str] = None,
         url_defaults: Optional[Dict[str, Any]] = None,
-        root_path: str = ""
+        root_path: str = "",
+        max_content_length: Optional[int] = None,
+        route_class: Optional[type] = None,
+        include_in_schema: Optional[bool] = None
     ):
         self.name = name
         self.import_name = import_name
@@ -23,6 +26,12 @@ class Blueprint:
         self.subdomain = subdomain
         self.url_defaults = url_defaults or {}
         self.root_path = root_path
+        # 蓝图内路由的请求体大小上限，None 时使用应用的 MAX_CONTENT_LENGTH
+        self.max_content_length = max_content_length
+        # 蓝图内路由默认使用的路由类，例如 FlaskRoute
+        self.default_route_class = route_class
+        # 蓝图的路由是否出现在 OpenAPI 中，None 时使用应用的 OPENAPI_INCLUDE_FLASK_ROUTES
+        self.include_in_schema = include_in_schema
         
         # 初始化 APIRouter
         self.router = APIRouter(
@@ -43,6 +52,8 @@ class Blueprint:
     ):
         if methods is None:
             methods = ["GET"]
+        limit = options.pop('max_content_length', None)
+        route_class = options.pop('route_class', None)
         
         def decorator(f: Callable) -> Callable:
             nonlocal endpoint
@@ -50,12 +61,7 @@ class Blueprint:
                 endpoint = f
             
             # 注册路由到 APIRouter
-            self.router.add_api_route(
-                path=rule,
-                endpoint=endpoint,
-                methods=list(methods),
-                **options
-            )
+            self._add_view_route(rule, endpoint, list(methods), limit, route_class, options)
             return endpoint
         
         return decorator
@@ -73,13 +79,49 @@ class Blueprint:
             methods = ["GET"]
         
         if view_func is not None:
-            self.router.add_api_route(
-                path=rule,
-                endpoint=view_func,
-                methods=methods,
-                name=endpoint,
-                **options
-            )
+            limit = options.pop('max_content_length', None)
+            route_class = options.pop('route_class', None)
+            self._add_view_route(rule, view_func, list(methods), limit, route_class, dict(options, name=endpoint))
+    
+    def _add_view_route(
+        self,
+        rule: str,
+        view_func: Callable,
+        methods: List[str],
+        limit: Optional[int],
+        route_class: Optional[type],
+        options: Dict[str, Any],
+    ) -> None:
+        """注册视图，route_class 为 FlaskRoute 时不经过 FastAPI 的 add_api_route"""
+        from .routing import FlaskRoute, add_flask_route
+        if route_class is None:
+            route_class = self.default_route_class
+        if route_class is not None and issubclass(route_class, FlaskRoute):
+            if limit is None:
+                limit = self.max_content_length
+            # 与 add_api_route 一样加上路由器的前缀
+            route = route_class(self.router.prefix + rule, view_func, methods=methods, max_content_length=limit, **options)
+            add_flask_route(self.router, route)
+            return
+        if route_class is not None:
+            options['route_class_override'] = route_class
+        self.router.add_api_route(
+            path=rule,
+            endpoint=view_func,
+            methods=methods,
+            **options
+        )
+        self._set_max_content_length(self.router.routes[-1], limit)
+    
+    def _set_max_content_length(self, route: Any, limit: Optional[int]) -> None:
+        """在路由上记录请求体大小上限，路由参数优先于蓝图设置
+        
+        记录在路由而不是视图函数上，同一个函数注册到其他应用或蓝图时不受影响。
+        """
+        if limit is None:
+            limit = self.max_content_length
+        if limit is not None:
+            route.max_content_length = limit
     
     def before_request(self, f: Callable) -> Callable:
         # 实现请求前钩子
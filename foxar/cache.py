@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """按字节预算淘汰的进程内LRU缓存
+
+    每个条目在写入时给出占用的字节数，总量超过 max_bytes 时
+    从最久未使用的条目开始淘汰。单个条目超过预算时不缓存。
+    同步视图在线程池中使用缓存，读写操作由锁保护。
+    """
+    __slots__ = ('max_bytes', 'max_entries', 'current_bytes', 'hits', 'misses', '_data', '_lock')
+
+    def __init__(self, max_bytes: int, max_entries: Optional[int] = None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """获取缓存值，并标记为最近使用"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key: Hashable, value: Any, size: int) -> bool:
+        """写入缓存值，返回是否被缓存"""
+        with self._lock:
+            self._pop(key)
+            if size > self.max_bytes:
+                return False
+            self._data[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes or (
+                self.max_entries is not None and len(self._data) > self.max_entries
+            ):
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self.current_bytes -= evicted_size
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """移除并返回缓存值"""
+        with self._lock:
+            return self._pop(key, default)
+
+    def _pop(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.pop(key, None)
+        if item is None:
+            return default
+        self.current_bytes -= item[1]
+        return item[0]
+
+    def clear(self) -> None:
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+
+    def keys(self):
+        """返回所有键（从最久未使用开始）"""
+        with self._lock:
+            return list(self._data.keys())
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中率等统计信息"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'entries': len(self._data),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+        }
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,133 @@
+import argparse
+import importlib
+import os
+import sys
+from typing import List, Optional
+
+
+def load_app(target: str):
+    """按 'module:attr' 格式加载应用实例，省略 attr 时使用 app"""
+    module_name, _, attr = target.partition(':')
+    sys.path.insert(0, os.getcwd())
+    module = importlib.import_module(module_name)
+    return getattr(module, attr or 'app')
+
+
+def _static_directory(args: argparse.Namespace) -> Optional[str]:
+    """获取命令行指定的静态目录，未指定时使用应用的 static_folder"""
+    if args.directory is not None:
+        return args.directory
+    if args.app is None:
+        print("Error: 需要指定静态目录或 --app", file=sys.stderr)
+        return None
+    app = load_app(args.app)
+    if app.static_folder is None:
+        print("Error: 应用没有配置 static_folder", file=sys.stderr)
+        return None
+    return app.static_folder
+
+
+def _static_compress(args: argparse.Namespace) -> int:
+    from .static import compress_static
+
+    directory = _static_directory(args)
+    if directory is None:
+        return 2
+    stats = compress_static(
+        directory,
+        algorithms=args.algorithms.split(','),
+        level=args.level,
+        min_size=args.min_size,
+    )
+    print(f"compressed: {stats['compressed']}, skipped: {stats['skipped']}, up to date: {stats['up_to_date']}")
+    return 0
+
+
+def _static_manifest(args: argparse.Namespace) -> int:
+    from .static import write_manifest
+
+    directory = _static_directory(args)
+    if directory is None:
+        return 2
+    output = write_manifest(directory, args.output)
+    print(f"manifest written to {output}")
+    return 0
+
+
+def _templates_compile(args: argparse.Namespace) -> int:
+    from .templating import compile_templates
+
+    if args.app is None:
+        print("Error: 需要指定 --app", file=sys.stderr)
+        return 2
+    app = load_app(args.app)
+    if args.cache_dir:
+        app.config['TEMPLATE_CACHE_DIR'] = args.cache_dir
+    if not app.config.get('TEMPLATE_CACHE_DIR'):
+        print("Error: 应用没有配置 TEMPLATE_CACHE_DIR", file=sys.stderr)
+        return 2
+    if app.templates is None:
+        print("Error: 应用没有配置 template_folder", file=sys.stderr)
+        return 2
+    compiled, errors = compile_templates(app.jinja_env)
+    for name, error in errors:
+        print(f"{name}: {error}", file=sys.stderr)
+    print(f"compiled: {compiled}, errors: {len(errors)}")
+    return 1 if errors else 0
+
+
+def _openapi_build(args: argparse.Namespace) -> int:
+    if args.app is None:
+        print("Error: 需要指定 --app", file=sys.stderr)
+        return 2
+    app = load_app(args.app)
+    if not (args.cache_dir or app.config.get('OPENAPI_CACHE_DIR')):
+        print("Error: 应用没有配置 OPENAPI_CACHE_DIR", file=sys.stderr)
+        return 2
+    path = app.prebuild_openapi(args.cache_dir)
+    print(f"openapi schema written to {path}")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='foxar')
+    parser.add_argument('--app', help="应用位置，格式为 'module:attr'")
+    commands = parser.add_subparsers(dest='command')
+
+    static = commands.add_parser('static', help='静态文件工具')
+    static_commands = static.add_subparsers(dest='static_command')
+    compress = static_commands.add_parser('compress', help='为静态文件生成 .br / .gz 预压缩文件')
+    compress.add_argument('directory', nargs='?', help='静态目录，默认使用应用的 static_folder')
+    compress.add_argument('--algorithms', default='gzip,br', help='压缩算法，逗号分隔')
+    compress.add_argument('--level', type=int, default=9, help='压缩级别')
+    compress.add_argument('--min-size', type=int, default=256, help='小于该字节数的文件不压缩')
+    compress.set_defaults(handler=_static_compress)
+
+    manifest = static_commands.add_parser('manifest', help='生成带内容哈希的静态文件清单')
+    manifest.add_argument('directory', nargs='?', help='静态目录，默认使用应用的 static_folder')
+    manifest.add_argument('-o', '--output', help='清单文件路径，默认写入静态目录')
+    manifest.set_defaults(handler=_static_manifest)
+
+    templates = commands.add_parser('templates', help='模板工具')
+    templates_commands = templates.add_subparsers(dest='templates_command')
+    compile_ = templates_commands.add_parser('compile', help='编译所有模板，预热 TEMPLATE_CACHE_DIR 字节码缓存')
+    compile_.add_argument('--cache-dir', help='覆盖 TEMPLATE_CACHE_DIR')
+    compile_.set_defaults(handler=_templates_compile)
+
+    openapi = commands.add_parser('openapi', help='OpenAPI 文档工具')
+    openapi_commands = openapi.add_subparsers(dest='openapi_command')
+    build = openapi_commands.add_parser('build', help='预先生成 OpenAPI 文档缓存，部署时运行')
+    build.add_argument('--cache-dir', help='覆盖 OPENAPI_CACHE_DIR')
+    build.set_defaults(handler=_openapi_build)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """命令行入口"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    handler = getattr(args, 'handler', None)
+    if handler is None:
+        parser.print_help()
+        return 1
+    return handler(args)
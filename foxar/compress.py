@@ -0,0 +1,243 @@
+import os
+import zlib
+from typing import Any, Optional, Sequence
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .cache import LRUCache
+from .http import accepted_encodings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+class _GzipCompressor:
+    __slots__ = ('_obj',)
+
+    def __init__(self, level: int):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        out = self._obj.compress(data)
+        if flush:
+            # 流式响应每块都同步刷新，客户端可以立即解压
+            out += self._obj.flush(zlib.Z_SYNC_FLUSH)
+        return out
+
+    def finish(self) -> bytes:
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class _BrotliCompressor:
+    __slots__ = ('_obj',)
+
+    def __init__(self, level: int):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes, flush: bool = False) -> bytes:
+        out = self._obj.process(data)
+        if flush:
+            out += self._obj.flush()
+        return out
+
+    def finish(self) -> bytes:
+        return self._obj.finish()
+
+
+def choose_encoding(accept_encoding: Optional[str], algorithms: Sequence[str]) -> Optional[str]:
+    """按配置的优先级选择客户端可接受的压缩算法"""
+    accepted = accepted_encodings(accept_encoding)
+    for encoding in algorithms:
+        if encoding == 'br' and brotli is None:
+            continue
+        if encoding in accepted:
+            return encoding
+    return None
+
+
+class CompressMiddleware:
+    """动态响应压缩中间件
+
+    按 COMPRESS_* 配置对响应进行 gzip / br 压缩。流式响应逐块压缩，
+    不缓冲整个响应体；已编码、过小或类型不匹配的响应原样发送。
+    """
+    def __init__(self, app: ASGIApp, app_instance: Any):
+        self.app = app
+        self.app_instance = app_instance
+        self._cache: Optional[LRUCache] = None
+
+    @property
+    def cache(self) -> Optional[LRUCache]:
+        """压缩结果缓存，按 (ETag, 编码, 级别) 索引，COMPRESS_CACHE_MAX_BYTES 为0时禁用"""
+        if self._cache is None:
+            max_bytes = self.app_instance.config.get('COMPRESS_CACHE_MAX_BYTES') or 0
+            if max_bytes <= 0:
+                return None
+            self._cache = LRUCache(max_bytes)
+        return self._cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.app_instance.config.get('COMPRESS_ENABLED'):
+            await self.app(scope, receive, send)
+            return
+
+        config = self.app_instance.config
+        encoding = None
+        if scope.get("method", "GET").upper() != "HEAD":
+            encoding = choose_encoding(
+                Headers(scope=scope).get("accept-encoding"),
+                config.get('COMPRESS_ALGORITHM') or (),
+            )
+        responder = _CompressResponder(self, send, encoding)
+        await self.app(scope, receive, responder)
+
+
+class _CompressResponder:
+    """包装 send，对单个响应进行压缩"""
+    def __init__(self, middleware: CompressMiddleware, send: Send, encoding: Optional[str]):
+        config = middleware.app_instance.config
+        self.send = send
+        self.encoding = encoding
+        self.level = config.get('COMPRESS_BR_LEVEL' if encoding == 'br' else 'COMPRESS_LEVEL')
+        self.min_size = config.get('COMPRESS_MIN_SIZE') or 0
+        self.mimetypes = config.get('COMPRESS_MIMETYPES') or ()
+        self.chunk_size = config.get('SEND_FILE_CHUNK_SIZE') or 64 * 1024
+        self.cache = middleware.cache if encoding is not None else None
+        self.cache_key = None
+        self.start_message: Optional[Message] = None
+        self.compressor = None
+        self.passthrough = False
+        self.finished = False
+
+    def _is_compressible(self, status: int, headers: Headers) -> bool:
+        if status < 200 or status >= 300 or status in (204, 206):
+            return False
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        if "no-transform" in headers.get("cache-control", ""):
+            return False
+        mimetype = headers.get("content-type", "").split(";", 1)[0].strip().lower()
+        return mimetype in self.mimetypes
+
+    def _compressed_headers(self, message: Message, content_length: Optional[int]) -> Message:
+        headers = MutableHeaders(raw=list(message["headers"]))
+        headers["content-encoding"] = self.encoding
+        if content_length is None:
+            del headers["content-length"]
+        else:
+            headers["content-length"] = str(content_length)
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            # 压缩后的表示与原始字节不同，只能作为弱ETag
+            headers["etag"] = "W/" + etag
+        return {**message, "headers": headers.raw}
+
+    async def __call__(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            await self._start(message)
+        elif self.finished:
+            # 已从缓存发送，丢弃原响应的剩余部分
+            return
+        elif self.passthrough:
+            await self.send(message)
+        elif message_type == "http.response.body":
+            await self._body(message.get("body", b""), message.get("more_body", False))
+        elif message_type == "http.response.zerocopy":
+            await self._zerocopy(message)
+        elif message_type == "http.response.pathsend":
+            await self._pathsend(message["path"])
+        else:
+            await self.send(message)
+
+    async def _start(self, message: Message) -> None:
+        headers = Headers(raw=message["headers"])
+        if not self._is_compressible(message["status"], headers):
+            self.passthrough = True
+            await self.send(message)
+            return
+
+        # 内容随 Accept-Encoding 变化，缓存必须区分
+        vary = MutableHeaders(raw=list(message["headers"]))
+        vary.add_vary_header("Accept-Encoding")
+        message = {**message, "headers": vary.raw}
+
+        content_length = headers.get("content-length")
+        if self.encoding is None or (content_length is not None and int(content_length) < self.min_size):
+            self.passthrough = True
+            await self.send(message)
+            return
+
+        etag = headers.get("etag")
+        if self.cache is not None and etag and not etag.startswith("W/"):
+            self.cache_key = (etag, self.encoding, self.level)
+            body = self.cache.get(self.cache_key)
+            if body is not None:
+                self.finished = True
+                await self.send(self._compressed_headers(message, len(body)))
+                await self.send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+
+        # 等到第一个响应体块再决定是否压缩
+        self.start_message = message
+
+    async def _body(self, body: bytes, more_body: bool) -> None:
+        if self.start_message is not None:
+            message, self.start_message = self.start_message, None
+            if not more_body:
+                if len(body) < self.min_size:
+                    self.passthrough = True
+                    await self.send(message)
+                    await self.send({"type": "http.response.body", "body": body, "more_body": False})
+                    return
+                # 单块响应：一次压缩完并设置 Content-Length
+                compressor = self._new_compressor()
+                data = compressor.compress(body) + compressor.finish()
+                if self.cache_key is not None:
+                    self.cache.set(self.cache_key, data, len(data))
+                await self.send(self._compressed_headers(message, len(data)))
+                await self.send({"type": "http.response.body", "body": data, "more_body": False})
+                return
+            self.compressor = self._new_compressor()
+            await self.send(self._compressed_headers(message, None))
+
+        data = self.compressor.compress(body, flush=more_body)
+        if not more_body:
+            data += self.compressor.finish()
+        if data or not more_body:
+            await self.send({"type": "http.response.body", "body": data, "more_body": more_body})
+
+    def _new_compressor(self):
+        if self.encoding == 'br':
+            return _BrotliCompressor(self.level)
+        return _GzipCompressor(self.level)
+
+    async def _zerocopy(self, message: Message) -> None:
+        """服务器零拷贝消息无法压缩，改为读取文件后压缩发送"""
+        file = message["file"]
+        fd = file if isinstance(file, int) else file.fileno()
+        offset = message.get("offset")
+        if offset is None:
+            offset = os.lseek(fd, 0, os.SEEK_CUR)
+        count = message.get("count")
+        if count is None or count < 0:
+            count = os.fstat(fd).st_size - offset
+        while count > 0:
+            chunk = await anyio.to_thread.run_sync(os.pread, fd, min(self.chunk_size, count), offset)
+            if not chunk:
+                break
+            offset += len(chunk)
+            count -= len(chunk)
+            await self._body(chunk, True)
+        await self._body(b"", message.get("more_body", False))
+
+    async def _pathsend(self, path: str) -> None:
+        async with await anyio.open_file(path, mode="rb") as file:
+            while True:
+                chunk = await file.read(self.chunk_size)
+                if not chunk:
+                    break
+                await self._body(chunk, True)
+        await self._body(b"", False)
@@ -32,8 +32,16 @@ class CSRFProtect:
             
             # 检查是否为需要保护的方法
             if request.method in app.config.get('WTF_CSRF_METHODS', {'POST', 'PUT', 'PATCH', 'DELETE'}):
+                # 本中间件位于钩子中间件外层，读取表单或 JSON 之前自行限制请求体大小
+                from .request import LimitedReceive, RequestEntityTooLarge
+                request._receive = LimitedReceive(request.receive, request.scope, app._request_max_content_length(request.scope))
                 # 验证 CSRF 令牌
-                if not await self._validate_csrf(request, app):
+                try:
+                    valid = await self._validate_csrf(request, app)
+                except RequestEntityTooLarge as e:
+                    from starlette.responses import JSONResponse
+                    return JSONResponse({'detail': e.detail}, status_code=e.status_code)
+                if not valid:
                     from .response import abort
                     abort(400, 'CSRF token validation failed')
             
@@ -88,11 +96,15 @@ class CSRFProtect:
         field_name = app.config.get('WTF_CSRF_FIELD_NAME', 'csrf_token')
         headers = app.config.get('WTF_CSRF_HEADERS', ['X-CSRFToken', 'X-CSRF-Token'])
         
+        from .request import RequestEntityTooLarge
+        
         # 从表单中获取
         try:
             form_data = await request.form()
             if field_name in form_data:
                 return form_data[field_name]
+        except RequestEntityTooLarge:
+            raise
         except Exception:
             pass
         
@@ -101,6 +113,8 @@ class CSRFProtect:
             json_data = await request.json()
             if field_name in json_data:
                 return json_data[field_name]
+        except RequestEntityTooLarge:
+            raise
         except Exception:
             pass
         
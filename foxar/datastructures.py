@@ -0,0 +1,323 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from collections.abc import Mapping
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, Tuple, Union
+
+# FileStorage 逐块复制时的缓冲区大小
+COPY_BUFFER_SIZE = 64 * 1024
+
+
+class MultiDictView(Mapping):
+    """只读的多值字典视图
+
+    直接包装 Starlette 的 QueryParams、Headers 或 cookies 字典，不复制数据。
+    重复键时 [] 和 get 返回底层结构选择的值（查询参数为最后一个），getlist 返回全部值。
+    """
+    __slots__ = ('_data',)
+
+    def __init__(self, data: Any = None):
+        self._data = {} if data is None else data
+
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+
+    def get(self, key: str, default: Any = None, type: Optional[Callable[[Any], Any]] = None) -> Any:
+        """获取值，指定 type 时转换类型，转换失败返回默认值"""
+        try:
+            rv = self._data[key]
+        except KeyError:
+            return default
+        if type is not None:
+            try:
+                rv = type(rv)
+            except (ValueError, TypeError):
+                rv = default
+        return rv
+
+    def getlist(self, key: str, type: Optional[Callable[[Any], Any]] = None) -> List[Any]:
+        """获取键的所有值，指定 type 时跳过无法转换的值"""
+        getlist = getattr(self._data, 'getlist', None)
+        if getlist is not None:
+            values = getlist(key)
+        elif key in self._data:
+            values = [self._data[key]]
+        else:
+            values = []
+        if type is None:
+            return list(values)
+        rv = []
+        for value in values:
+            try:
+                rv.append(type(value))
+            except (ValueError, TypeError):
+                pass
+        return rv
+
+    def items(self, multi: bool = False):
+        """返回键值对，multi 为 True 时包含重复键的所有值"""
+        if multi:
+            return self.multi_items()
+        return super().items()
+
+    def multi_items(self) -> List[Tuple[str, Any]]:
+        """返回包含重复键的所有键值对"""
+        multi_items = getattr(self._data, 'multi_items', None)
+        if multi_items is not None:
+            return multi_items()
+        return list(self._data.items())
+
+    def to_dict(self, flat: bool = True) -> dict:
+        """转换为普通字典，flat 为 False 时值为列表"""
+        if flat:
+            return dict(self)
+        rv: dict = {}
+        for key, value in self.multi_items():
+            rv.setdefault(key, []).append(value)
+        return rv
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({self.multi_items()!r})"
+
+
+class FileStorage:
+    """上传的文件
+
+    包装解析表单时写入 SpooledTemporaryFile 的上传数据。size 和 sha256 在接收时
+    已经计算，不需要重新读取文件。
+    """
+    __slots__ = ('stream', 'filename', 'name', 'headers', 'content_length', '_sha256', '_linked')
+
+    def __init__(
+        self,
+        stream: BinaryIO,
+        filename: Optional[str] = None,
+        name: Optional[str] = None,
+        headers: Any = None,
+        content_length: Optional[int] = None,
+        sha256: Optional[str] = None,
+    ):
+        self.stream = stream
+        self.filename = filename
+        self.name = name
+        self.headers = headers if headers is not None else {}
+        self.content_length = content_length
+        self._sha256 = sha256
+        # 匿名临时文件已经链接到某个路径，之后保存时需要复制，否则多个路径共享同一个inode
+        self._linked = False
+
+    @classmethod
+    def from_upload(cls, name: str, upload: Any) -> 'FileStorage':
+        """从 Starlette 的 UploadFile 创建"""
+        digest = getattr(upload, 'hash', None)
+        return cls(
+            upload.file,
+            filename=upload.filename,
+            name=name,
+            headers=upload.headers,
+            content_length=upload.size,
+            sha256=digest.hexdigest() if digest is not None else None,
+        )
+
+    @property
+    def content_type(self) -> Optional[str]:
+        return self.headers.get('content-type')
+
+    @property
+    def mimetype(self) -> str:
+        return (self.content_type or '').split(';', 1)[0].strip().lower()
+
+    @property
+    def size(self) -> int:
+        """文件字节数"""
+        if self.content_length is None:
+            position = self.stream.tell()
+            self.content_length = self.stream.seek(0, os.SEEK_END)
+            self.stream.seek(position)
+        return self.content_length
+
+    @property
+    def sha256(self) -> str:
+        """文件内容的 sha256 十六进制摘要"""
+        if self._sha256 is None:
+            # 不是由表单解析器创建时才需要读取文件
+            digest = hashlib.sha256()
+            position = self.stream.tell()
+            self.stream.seek(0)
+            for chunk in iter(lambda: self.stream.read(COPY_BUFFER_SIZE), b''):
+                digest.update(chunk)
+            self.stream.seek(position)
+            self._sha256 = digest.hexdigest()
+        return self._sha256
+
+    def read(self, size: int = -1) -> bytes:
+        return self.stream.read(size)
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        return self.stream.seek(offset, whence)
+
+    def save(self, dst: Union[str, os.PathLike, BinaryIO], buffer_size: int = COPY_BUFFER_SIZE) -> None:
+        """保存到路径或文件对象
+
+        内存中的文件一次写入；已转存到磁盘的文件第一次保存时优先链接到目标路径（同一文件系统），
+        权限按 umask 设置；否则用 copy_file_range / sendfile 在内核中复制，都不可用时才逐块复制。
+        """
+        self.stream.flush()
+        if not isinstance(dst, (str, os.PathLike)):
+            self.stream.seek(0)
+            shutil.copyfileobj(self.stream, dst, buffer_size)
+            return
+
+        memory = _memory_buffer(self.stream)
+        if memory is not None:
+            # 释放缓冲区，否则之后无法再写入或转存 stream
+            with memory, open(dst, 'wb') as f:
+                f.write(memory)
+            return
+
+        try:
+            fd = self.stream.fileno()
+        except (AttributeError, OSError):
+            # BytesIO 等没有文件描述符的流
+            self.stream.seek(0)
+            with open(dst, 'wb') as f:
+                shutil.copyfileobj(self.stream, f, buffer_size)
+            return
+        if not self._linked and _link_anonymous(fd, os.fspath(dst)):
+            self._linked = True
+            return
+        with open(dst, 'wb') as f:
+            _copy_fd(fd, f.fileno(), self.size, buffer_size)
+
+    def close(self) -> None:
+        self.stream.close()
+
+    def __bool__(self) -> bool:
+        return bool(self.filename)
+
+    def __repr__(self) -> str:
+        return f"<{self.__class__.__name__}: {self.filename!r} ({self.content_type!r})>"
+
+
+def _memory_buffer(stream: BinaryIO) -> Optional[memoryview]:
+    """返回仍在内存中的 SpooledTemporaryFile 的缓冲区"""
+    if getattr(stream, '_rolled', True):
+        return None
+    return stream._file.getbuffer()
+
+
+def linkable_temporary_file(dir: Optional[str] = None) -> BinaryIO:
+    """创建匿名临时文件，save() 可以把它链接到目标路径而不复制数据
+
+    tempfile.TemporaryFile 使用 O_TMPFILE | O_EXCL，这样的文件不能再被链接；
+    这里不带 O_EXCL。不支持 O_TMPFILE 的平台或文件系统使用普通临时文件。
+    """
+    flag = getattr(os, 'O_TMPFILE', None)
+    if flag is not None:
+        try:
+            fd = os.open(dir or tempfile.gettempdir(), flag | os.O_RDWR, 0o600)
+        except OSError:
+            pass
+        else:
+            return open(fd, 'w+b')
+    return tempfile.TemporaryFile(dir=dir)
+
+
+class UploadSpool(tempfile.SpooledTemporaryFile):
+    """上传文件的缓冲区，超过 max_size 后转存到 linkable_temporary_file"""
+    def __init__(self, max_size: int = 0, dir: Optional[str] = None):
+        super().__init__(max_size=max_size, dir=dir)
+        self._dir = dir
+
+    def rollover(self) -> None:
+        if self._rolled:
+            return
+        memory = self._file
+        self._file = linkable_temporary_file(self._dir)
+        self._file.write(memory.getvalue())
+        self._file.seek(memory.tell())
+        self._rolled = True
+
+
+def _link_anonymous(fd: int, dst: str) -> bool:
+    """将 O_TMPFILE 创建的匿名临时文件链接到目标路径，相当于rename，不复制数据"""
+    if os.link not in os.supports_dir_fd or os.link not in os.supports_follow_symlinks:
+        return False
+    try:
+        proc_fd = os.open('/proc/self/fd', os.O_RDONLY)
+    except OSError:
+        return False
+    tmp = f'{dst}.{os.getpid()}.{fd}.tmp'
+    try:
+        # 临时文件以 0600 创建，链接后的文件与普通新建文件一样遵循 umask
+        os.fchmod(fd, 0o666 & ~_current_umask())
+        # 指定 src_dir_fd 时才会调用 linkat(AT_SYMLINK_FOLLOW)，否则 link() 链接的是 /proc 中的符号链接本身
+        os.link(str(fd), tmp, src_dir_fd=proc_fd, follow_symlinks=True)
+    except OSError:
+        # 跨文件系统、文件以 O_EXCL 创建或平台不支持
+        return False
+    finally:
+        os.close(proc_fd)
+    try:
+        os.replace(tmp, dst)
+    except OSError:
+        os.unlink(tmp)
+        raise
+    return True
+
+
+def _current_umask() -> int:
+    """读取进程的 umask，os.umask 需要先修改再恢复，在多线程中不安全"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    return 0o022
+
+
+def _copy_fd(src: int, dst: int, count: int, buffer_size: int) -> None:
+    """在内核中复制文件内容，依次尝试 copy_file_range、sendfile 和普通读写"""
+    offset = 0
+    copy_file_range = getattr(os, 'copy_file_range', None)
+    if copy_file_range is not None:
+        try:
+            while offset < count:
+                copied = copy_file_range(src, dst, count - offset, offset)
+                if copied == 0:
+                    break
+                offset += copied
+            return
+        except OSError:
+            if offset:
+                raise
+    sendfile = getattr(os, 'sendfile', None)
+    if sendfile is not None:
+        try:
+            while offset < count:
+                sent = sendfile(dst, src, offset, count - offset)
+                if sent == 0:
+                    break
+                offset += sent
+            return
+        except OSError:
+            if offset:
+                raise
+    while offset < count:
+        chunk = os.pread(src, min(buffer_size, count - offset), offset)
+        if not chunk:
+            break
+        os.write(dst, chunk)
+        offset += len(chunk)
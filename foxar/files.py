@@ -0,0 +1,497 @@
+import inspect
+import io
+import mimetypes
+import os
+import stat
+import time
+from secrets import token_hex
+from typing import Any, Callable, Mapping, Optional, Union
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse as StarletteFileResponse, Response as StarletteResponse
+from starlette.types import Receive, Scope, Send
+from .http import (
+    file_etag, http_date, is_range_applicable, parse_range_header,
+    quote_etag, remove_entity_headers, to_timestamp,
+)
+
+
+class FileResponse(StarletteFileResponse):
+    """支持条件请求、Range 请求和零拷贝发送的文件响应"""
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        path: Union[str, os.PathLike],
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background=None,
+        filename: Optional[str] = None,
+        stat_result: Optional[os.stat_result] = None,
+        content_disposition_type: str = "attachment",
+        etag: Union[bool, str] = True,
+        last_modified: Any = None,
+    ):
+        # 需要在父类初始化（可能调用 set_stat_headers）之前设置
+        self._etag = etag
+        self._last_modified = last_modified
+        super().__init__(
+            path=path,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            background=background,
+            filename=filename,
+            stat_result=stat_result,
+            content_disposition_type=content_disposition_type,
+        )
+
+    def set_stat_headers(self, stat_result: os.stat_result) -> None:
+        """根据文件元数据设置头部，不读取文件内容"""
+        self.headers.setdefault('content-length', str(stat_result.st_size))
+
+        last_modified = to_timestamp(self._last_modified)
+        if last_modified is None:
+            last_modified = stat_result.st_mtime
+        self.headers.setdefault('last-modified', http_date(last_modified))
+
+        if self._etag:
+            if isinstance(self._etag, str):
+                etag = self._etag if self._etag.endswith('"') else quote_etag(self._etag)
+            else:
+                etag = quote_etag(file_etag(stat_result))
+            self.headers.setdefault('etag', etag)
+
+    def make_conditional(self, request_or_environ=None) -> 'FileResponse':
+        """根据请求的条件头部把响应转换为304或412"""
+        if self.stat_result is None:
+            self.stat_result = os.stat(self.path)
+            self.set_stat_headers(self.stat_result)
+        from .response import _apply_conditional
+        _apply_conditional(self, request_or_environ)
+        return self
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.status_code in (304, 412):
+            # 条件请求命中，不发送文件内容
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            if self.background is not None:
+                await self.background()
+            return
+
+        if self.stat_result is None:
+            try:
+                stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+            except FileNotFoundError:
+                raise RuntimeError(f"File at path {self.path} does not exist.")
+            if not stat.S_ISREG(stat_result.st_mode):
+                raise RuntimeError(f"File at path {self.path} is not a file.")
+            self.stat_result = stat_result
+            self.set_stat_headers(stat_result)
+        size = self.stat_result.st_size
+
+        headers = Headers(scope=scope)
+        send_header_only = scope.get("method", "GET").upper() == "HEAD"
+        extensions = scope.get("extensions") or {}
+        zerocopy = "http.response.zerocopy" in extensions
+
+        ranges = None
+        if self.status_code == 200 and "range" in headers:
+            if is_range_applicable(headers, self.headers.get("etag"), self.headers.get("last-modified")):
+                ranges = parse_range_header(headers["range"], size)
+
+        if ranges is None:
+            if not send_header_only and not zerocopy and "http.response.pathsend" in extensions:
+                await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+                await send({"type": "http.response.pathsend", "path": str(self.path)})
+            else:
+                await self._send_ranges(send, [(0, size)], None, send_header_only, zerocopy)
+        elif not ranges:
+            # 所有区间都无法满足
+            self.status_code = 416
+            remove_entity_headers(self.headers)
+            self.headers["content-range"] = f"bytes */{size}"
+            self.headers["content-length"] = "0"
+            await send({"type": "http.response.start", "status": 416, "headers": self.raw_headers})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif len(ranges) == 1:
+            start, end = ranges[0]
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end - 1}/{size}"
+            self.headers["content-length"] = str(end - start)
+            await self._send_ranges(send, ranges, None, send_header_only, zerocopy)
+        else:
+            self.status_code = 206
+            boundary = token_hex(13)
+            content_type = self.headers.get("content-type", "application/octet-stream")
+            parts = [
+                (start, end, (
+                    f"\r\n--{boundary}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Range: bytes {start}-{end - 1}/{size}\r\n\r\n"
+                ).encode("latin-1"))
+                for start, end in ranges
+            ]
+            closing = f"\r\n--{boundary}--\r\n".encode("latin-1")
+            content_length = sum(end - start + len(head) for start, end, head in parts) + len(closing)
+            self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+            self.headers["content-length"] = str(content_length)
+            await self._send_ranges(send, parts, closing, send_header_only, zerocopy)
+
+        if self.background is not None:
+            await self.background()
+
+    async def _send_ranges(
+        self,
+        send: Send,
+        ranges,
+        closing: Optional[bytes],
+        send_header_only: bool,
+        zerocopy: bool = False,
+    ) -> None:
+        """发送一个或多个文件区间
+
+        ranges 中的元素为 (start, end) 或带分段头部的 (start, end, head)。
+        服务器支持 http.response.zerocopy 扩展时直接交给服务器发送，
+        否则按块读取，内存占用只与块大小有关。
+        """
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            last = len(ranges) - 1
+            for index, item in enumerate(ranges):
+                start, end = item[0], item[1]
+                if len(item) > 2:
+                    await send({"type": "http.response.body", "body": item[2], "more_body": True})
+                more_body = index < last or closing is not None
+                if zerocopy:
+                    await send({
+                        "type": "http.response.zerocopy",
+                        "file": file.wrapped,
+                        "offset": start,
+                        "count": end - start,
+                        "more_body": more_body,
+                    })
+                    continue
+                await file.seek(start)
+                remaining = end - start
+                if remaining == 0:
+                    await send({"type": "http.response.body", "body": b"", "more_body": more_body})
+                while remaining > 0:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        # 文件在发送过程中被截断
+                        remaining = 0
+                    remaining -= len(chunk)
+                    await send({
+                        "type": "http.response.body",
+                        "body": chunk,
+                        "more_body": more_body or remaining > 0,
+                    })
+        if closing is not None:
+            await send({"type": "http.response.body", "body": closing, "more_body": False})
+
+
+def _content_disposition(filename: str, disposition_type: str) -> str:
+    """构建 Content-Disposition 头部"""
+    from urllib.parse import quote
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"{disposition_type}; filename*=utf-8''{quoted}"
+    return f'{disposition_type}; filename="{filename}"'
+
+
+def _remaining_size(fileobj) -> Optional[int]:
+    """尽量确定文件对象从当前位置到结尾的字节数，无法确定时返回None"""
+    # anyio 等异步文件对象会包装一个同步文件对象
+    wrapped = getattr(fileobj, 'wrapped', None)
+    if wrapped is not None:
+        fileobj = wrapped
+    elif inspect.iscoroutinefunction(getattr(fileobj, 'read', None)):
+        return None
+
+    try:
+        fileno = fileobj.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        fileno = None
+
+    try:
+        if fileno is not None:
+            st = os.fstat(fileno)
+            if not stat.S_ISREG(st.st_mode):
+                return None
+            return max(st.st_size - fileobj.tell(), 0)
+        if isinstance(fileobj, io.BytesIO):
+            return max(fileobj.getbuffer().nbytes - fileobj.tell(), 0)
+        seekable = getattr(fileobj, 'seekable', None)
+        if seekable is not None and seekable():
+            position = fileobj.tell()
+            end = fileobj.seek(0, os.SEEK_END)
+            fileobj.seek(position)
+            return max(end - position, 0)
+    except (AttributeError, OSError, ValueError, io.UnsupportedOperation):
+        pass
+    return None
+
+
+class _ConditionalMixin:
+    """为头部已确定的响应提供 make_conditional"""
+    def make_conditional(self, request_or_environ=None):
+        """根据请求的条件头部把响应转换为304或412"""
+        from .response import _apply_conditional
+        _apply_conditional(self, request_or_environ)
+        return self
+
+
+class XSendfileResponse(_ConditionalMixin, StarletteResponse):
+    """把文件交给前端服务器（nginx、Apache等）发送的空响应体响应"""
+    def __init__(
+        self,
+        location: str,
+        header: str = "X-Sendfile",
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+    ):
+        super().__init__(b"", headers=headers, media_type=media_type)
+        self.header = header
+        self.headers[header] = location
+
+    def make_conditional(self, request_or_environ=None) -> 'XSendfileResponse':
+        """根据请求的条件头部把响应转换为304或412"""
+        super().make_conditional(request_or_environ)
+        if self.status_code != 200:
+            # 条件请求命中时不能让前端服务器再发送文件
+            del self.headers[self.header]
+        return self
+
+
+def _x_sendfile_location(path: str, header: str) -> str:
+    """根据 X_SENDFILE_PATH_MAP 把文件路径映射为前端服务器的内部路径"""
+    path = os.path.abspath(path)
+    mapping = _get_config('X_SENDFILE_PATH_MAP') or {}
+    # 最长前缀优先
+    for prefix in sorted(mapping, key=len, reverse=True):
+        root = os.path.abspath(prefix)
+        if path != root and not path.startswith(root.rstrip(os.sep) + os.sep):
+            continue
+        location = mapping[prefix].rstrip('/')
+        relative = os.path.relpath(path, root)
+        if relative != os.curdir:
+            location += '/' + relative.replace(os.sep, '/')
+        break
+    else:
+        location = path.replace(os.sep, '/')
+
+    if header.lower() == 'x-accel-redirect':
+        # nginx 需要URI形式
+        from urllib.parse import quote
+        location = quote(location, safe='/')
+    return location
+
+
+class FileObjectResponse(_ConditionalMixin, StarletteResponse):
+    """分块发送文件对象的响应
+    
+    支持同步和异步文件对象，内存占用只与块大小有关，
+    发送结束（包括出错和条件请求命中）后关闭文件。
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(
+        self,
+        fileobj,
+        status_code: int = 200,
+        headers: Optional[Mapping[str, str]] = None,
+        media_type: Optional[str] = None,
+        background=None,
+        chunk_size: Optional[int] = None,
+        content_length: Optional[int] = None,
+    ):
+        if isinstance(fileobj, io.TextIOBase):
+            raise ValueError("Files must be opened in binary mode or use BytesIO.")
+        self.fileobj = fileobj
+        self.status_code = status_code
+        if media_type is not None:
+            self.media_type = media_type
+        self.background = background
+        if chunk_size:
+            self.chunk_size = chunk_size
+        self.init_headers(headers)
+        if content_length is not None:
+            self.headers.setdefault('content-length', str(content_length))
+
+    async def _read(self) -> bytes:
+        read = self.fileobj.read
+        if inspect.iscoroutinefunction(read):
+            return await read(self.chunk_size)
+        if isinstance(self.fileobj, io.BytesIO):
+            # 内存中的数据无需切换线程
+            return read(self.chunk_size)
+        return await anyio.to_thread.run_sync(read, self.chunk_size)
+
+    async def close(self) -> None:
+        """关闭文件对象"""
+        close = getattr(self.fileobj, 'close', None)
+        if close is None:
+            aclose = getattr(self.fileobj, 'aclose', None)
+            if aclose is not None:
+                await aclose()
+            return
+        result = close()
+        if inspect.isawaitable(result):
+            await result
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            send_header_only = (
+                scope.get("method", "GET").upper() == "HEAD"
+                or self.status_code in (304, 412)
+            )
+            if send_header_only:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+            else:
+                while True:
+                    chunk = await self._read()
+                    if not chunk:
+                        break
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await self.close()
+
+        if self.background is not None:
+            await self.background()
+
+
+def _get_send_file_max_age(path: Optional[str]) -> Optional[int]:
+    """从当前应用配置中获取文件缓存时间"""
+    from .app import current_app
+    try:
+        return current_app.get_send_file_max_age(path)
+    except RuntimeError:
+        # 在应用上下文之外使用默认配置
+        from .utils import Config
+        return Config().get('SEND_FILE_MAX_AGE_DEFAULT')
+
+
+def _get_config(key: str) -> Any:
+    """从当前应用配置中读取配置项，在应用上下文之外使用默认配置"""
+    from .app import current_app
+    try:
+        return current_app.config.get(key)
+    except RuntimeError:
+        from .utils import Config
+        return Config().get(key)
+
+
+def _send_file(
+    path_or_fileobj,
+    mimetype: Optional[str] = None,
+    as_attachment: bool = False,
+    download_name: Optional[str] = None,
+    conditional: bool = True,
+    etag: Union[bool, str] = True,
+    last_modified: Any = None,
+    max_age: Union[int, Callable[[Optional[str]], Optional[int]], None] = None,
+    add_etags: bool = True,
+    etag_func: Optional[Callable[[str], str]] = None,
+):
+    """send_file 的实现"""
+    chunk_size = _get_config('SEND_FILE_CHUNK_SIZE')
+    disposition_type = "attachment" if as_attachment else "inline"
+
+    # 兼容旧参数：add_etags=False 等同于 etag=False
+    if not add_etags:
+        etag = False
+
+    if isinstance(path_or_fileobj, (str, os.PathLike)):
+        path = os.fspath(path_or_fileobj)
+
+        # 检查文件是否存在
+        try:
+            stat_result = os.stat(path)
+        except OSError:
+            stat_result = None
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            from .response import abort
+            abort(404)
+
+        if download_name is None:
+            download_name = os.path.basename(path)
+
+        if etag is True and etag_func is not None:
+            etag = etag_func(path)
+
+        if _get_config('USE_X_SENDFILE'):
+            # 由前端服务器发送文件，Python进程不读取文件内容
+            header = _get_config('X_SENDFILE_HEADER') or 'X-Sendfile'
+            response = XSendfileResponse(
+                _x_sendfile_location(path, header),
+                header=header,
+                media_type=mimetype or mimetypes.guess_type(download_name)[0] or "application/octet-stream",
+            )
+            response.headers['content-disposition'] = _content_disposition(download_name, disposition_type)
+            last_modified = to_timestamp(last_modified)
+            if last_modified is None:
+                last_modified = stat_result.st_mtime
+            response.headers['last-modified'] = http_date(last_modified)
+            if isinstance(etag, str):
+                response.headers['etag'] = etag if etag.endswith('"') else quote_etag(etag)
+            elif etag:
+                response.headers['etag'] = quote_etag(file_etag(stat_result))
+        else:
+            response = FileResponse(
+                path=path,
+                media_type=mimetype,
+                filename=download_name,
+                stat_result=stat_result,
+                content_disposition_type=disposition_type,
+                etag=etag,
+                last_modified=last_modified,
+            )
+            if chunk_size:
+                response.chunk_size = chunk_size
+    else:
+        # 文件对象：分块流式发送，不一次性读入内存
+        path = None
+        if mimetype is None:
+            if download_name is not None:
+                mimetype = mimetypes.guess_type(download_name)[0]
+            mimetype = mimetype or "application/octet-stream"
+
+        response = FileObjectResponse(
+            path_or_fileobj,
+            media_type=mimetype,
+            chunk_size=chunk_size,
+            content_length=_remaining_size(path_or_fileobj),
+        )
+        if download_name is not None:
+            response.headers['content-disposition'] = _content_disposition(download_name, disposition_type)
+        # 文件对象无法廉价地计算ETag，只使用显式给出的值
+        if isinstance(etag, str):
+            response.headers['etag'] = etag if etag.endswith('"') else quote_etag(etag)
+        if last_modified is not None:
+            response.headers['last-modified'] = http_date(to_timestamp(last_modified))
+
+    # 缓存控制
+    if callable(max_age):
+        max_age = max_age(path)
+    elif max_age is None:
+        max_age = _get_send_file_max_age(path)
+    if max_age is not None:
+        if max_age > 0:
+            response.headers['cache-control'] = f"public, max-age={int(max_age)}"
+            response.headers['expires'] = http_date(time.time() + max_age)
+        else:
+            response.headers['cache-control'] = "no-cache"
+
+    if conditional:
+        response.make_conditional()
+
+    return response
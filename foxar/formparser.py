@@ -0,0 +1,121 @@
+import hashlib
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl
+from starlette.datastructures import FormData, Headers, ImmutableMultiDict, UploadFile
+from starlette.exceptions import HTTPException
+from starlette.formparsers import MultiPartException, MultiPartParser
+from .datastructures import FileStorage, MultiDictView, UploadSpool
+
+
+class FormLimitExceeded(MultiPartException):
+    """表单超过 MAX_FORM_MEMORY_SIZE 或 MAX_FORM_PARTS"""
+
+
+class HashingUploadFile(UploadFile):
+    """接收时同时计算 sha256 的上传文件"""
+    def __init__(self, file, **kwargs):
+        super().__init__(file, **kwargs)
+        self.hash = hashlib.sha256()
+
+    async def write(self, data: bytes) -> None:
+        self.hash.update(data)
+        await super().write(data)
+
+
+class FoxarMultiPartParser(MultiPartParser):
+    """multipart 解析器
+
+    上传文件写入指定目录的临时文件并在接收时计算哈希；max_part_size 限制单个
+    非文件字段在内存中的大小，max_parts 限制字段和文件的总数。
+    """
+    def __init__(
+        self,
+        headers: Headers,
+        stream,
+        *,
+        spool_max_size: int,
+        temp_dir: Optional[str] = None,
+        max_part_size: Optional[int] = None,
+        max_parts: Optional[int] = None,
+    ):
+        super().__init__(
+            headers,
+            stream,
+            max_files=float('inf'),
+            max_fields=float('inf'),
+            max_part_size=max_part_size if max_part_size is not None else float('inf'),
+        )
+        self.spool_max_size = spool_max_size
+        self.temp_dir = temp_dir
+        self.max_parts = max_parts
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        part = self._current_part
+        if part.file is None and len(part.data) + end - start > self.max_part_size:
+            raise FormLimitExceeded(f'表单字段超过 {self.max_part_size} 字节上限')
+        super().on_part_data(data, start, end)
+
+    def on_headers_finished(self) -> None:
+        super().on_headers_finished()
+        if self.max_parts is not None and self._current_files + self._current_fields > self.max_parts:
+            raise FormLimitExceeded(f'表单部分超过 {self.max_parts} 个上限')
+        part = self._current_part
+        if part.file is None:
+            return
+        # 替换为可配置目录的临时文件，save() 时同一文件系统内可直接链接到目标路径
+        self._files_to_close_on_error.pop().close()
+        file = UploadSpool(max_size=self.spool_max_size, dir=self.temp_dir)
+        self._files_to_close_on_error.append(file)
+        part.file = HashingUploadFile(file, size=0, filename=part.file.filename, headers=part.file.headers)
+
+
+async def _parse_urlencoded(stream, max_size: Optional[int], max_parts: Optional[int]) -> FormData:
+    body = bytearray()
+    async for chunk in stream:
+        body += chunk
+        if max_size is not None and len(body) > max_size:
+            raise HTTPException(413, f'表单数据超过 {max_size} 字节上限')
+    try:
+        items = parse_qsl(body.decode('utf-8', 'replace'), keep_blank_values=True, max_num_fields=max_parts)
+    except ValueError:
+        raise HTTPException(413, f'表单字段超过 {max_parts} 个上限')
+    return FormData(items)
+
+
+async def parse_form(headers: Headers, stream, config: Dict[str, Any]) -> Tuple[MultiDictView, MultiDictView]:
+    """解析表单请求体，返回 (表单字段, 上传文件) 两个多值视图
+
+    MAX_FORM_MEMORY_SIZE 限制 urlencoded 请求体和 multipart 中单个非文件字段的大小，
+    MAX_FORM_PARTS 限制字段数量，超出时返回413，格式错误返回400。
+    """
+    max_size = config.get('MAX_FORM_MEMORY_SIZE')
+    max_parts = config.get('MAX_FORM_PARTS')
+    content_type = headers.get('content-type', '')
+    if content_type.startswith('multipart/form-data'):
+        parser = FoxarMultiPartParser(
+            headers,
+            stream,
+            spool_max_size=config.get('UPLOAD_SPOOL_MAX_MEMORY') or 0,
+            temp_dir=config.get('UPLOAD_TEMP_DIR'),
+            max_part_size=max_size,
+            max_parts=max_parts,
+        )
+        try:
+            form_data = await parser.parse()
+        except FormLimitExceeded as exc:
+            raise HTTPException(413, exc.message)
+        except MultiPartException as exc:
+            raise HTTPException(400, exc.message)
+    elif content_type.startswith('application/x-www-form-urlencoded'):
+        form_data = await _parse_urlencoded(stream, max_size, max_parts)
+    else:
+        form_data = FormData()
+
+    form = []
+    files = []
+    for key, value in form_data.multi_items():
+        if isinstance(value, UploadFile):
+            files.append((key, FileStorage.from_upload(key, value)))
+        else:
+            form.append((key, value))
+    return MultiDictView(ImmutableMultiDict(form)), MultiDictView(ImmutableMultiDict(files))
@@ -0,0 +1,295 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, List, Mapping, Optional, Tuple, Union
+
+# 304 响应中需要移除的实体头部（参考 RFC 7232 第 4.1 节）
+_entity_headers = frozenset([
+    'allow',
+    'content-encoding',
+    'content-language',
+    'content-length',
+    'content-md5',
+    'content-range',
+    'content-type',
+])
+
+
+def http_date(timestamp: Union[int, float, datetime, None] = None) -> str:
+    """格式化为HTTP日期"""
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        timestamp = timestamp.timestamp()
+    return formatdate(timestamp, usegmt=True)
+
+
+def parse_date(value: Optional[str]) -> Optional[float]:
+    """解析HTTP日期，返回时间戳"""
+    if not value:
+        return None
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+def to_timestamp(value: Union[int, float, str, datetime, None]) -> Optional[float]:
+    """将 datetime、时间戳或HTTP日期统一转换为时间戳"""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    if isinstance(value, str):
+        return parse_date(value)
+    return float(value)
+
+
+def quote_etag(etag: str, weak: bool = False) -> str:
+    """给ETag加上引号"""
+    if '"' in etag:
+        raise ValueError('invalid etag')
+    etag = f'"{etag}"'
+    if weak:
+        etag = 'W/' + etag
+    return etag
+
+
+def unquote_etag(value: Optional[str]) -> Tuple[Optional[str], bool]:
+    """去掉ETag的引号，返回 (etag, 是否为弱ETag)"""
+    if not value:
+        return None, False
+    value = value.strip()
+    weak = False
+    if value.startswith(('W/', 'w/')):
+        weak = True
+        value = value[2:]
+    if value[:1] == value[-1:] == '"':
+        value = value[1:-1]
+    return value, weak
+
+
+class ETags:
+    """If-None-Match / If-Match 中的ETag集合"""
+    __slots__ = ('_strong', '_weak', 'star_tag')
+
+    def __init__(self, strong_etags=(), weak_etags=(), star_tag: bool = False):
+        self._strong = frozenset(strong_etags)
+        self._weak = frozenset(weak_etags)
+        self.star_tag = star_tag
+
+    def contains(self, etag: str) -> bool:
+        """强比较"""
+        if self.star_tag:
+            return True
+        return etag in self._strong
+
+    def contains_weak(self, etag: str) -> bool:
+        """弱比较"""
+        if self.star_tag:
+            return True
+        return etag in self._strong or etag in self._weak
+
+    def __bool__(self) -> bool:
+        return bool(self.star_tag or self._strong or self._weak)
+
+    def __repr__(self) -> str:
+        return f"<ETags strong={set(self._strong)} weak={set(self._weak)} star={self.star_tag}>"
+
+
+def parse_etags(value: Optional[str]) -> ETags:
+    """解析ETag列表头部"""
+    if not value:
+        return ETags()
+    if value.strip() == '*':
+        return ETags(star_tag=True)
+    strong = []
+    weak = []
+    for part in value.split(','):
+        etag, is_weak = unquote_etag(part)
+        if not etag:
+            continue
+        if is_weak:
+            weak.append(etag)
+        else:
+            strong.append(etag)
+    return ETags(strong, weak)
+
+
+def generate_etag(data: bytes) -> str:
+    """根据内容生成ETag（不带引号）"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_etag(stat_result) -> str:
+    """根据文件元数据生成ETag，不读取文件内容"""
+    return f"{stat_result.st_ino:x}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"
+
+
+def is_resource_modified(
+    headers: Mapping[str, str],
+    etag: Optional[str] = None,
+    last_modified: Union[int, float, str, datetime, None] = None,
+) -> bool:
+    """根据 If-None-Match / If-Modified-Since 判断资源是否已修改
+
+    etag 为带引号的完整形式（可带 W/ 前缀）。
+    """
+    if_none_match = headers.get('if-none-match')
+    if if_none_match:
+        # If-None-Match 优先于 If-Modified-Since，使用弱比较
+        if etag is None:
+            return True
+        tag, _ = unquote_etag(etag)
+        return not parse_etags(if_none_match).contains_weak(tag)
+
+    modified_since = parse_date(headers.get('if-modified-since'))
+    last_modified = to_timestamp(last_modified)
+    if modified_since is not None and last_modified is not None:
+        # HTTP日期精度为秒
+        return int(last_modified) > int(modified_since)
+    return True
+
+
+def is_precondition_failed(
+    headers: Mapping[str, str],
+    etag: Optional[str] = None,
+    last_modified: Union[int, float, str, datetime, None] = None,
+) -> bool:
+    """根据 If-Match / If-Unmodified-Since 判断前置条件是否失败"""
+    if_match = headers.get('if-match')
+    if if_match:
+        if etag is None:
+            return True
+        tag, weak = unquote_etag(etag)
+        # If-Match 使用强比较，弱ETag永远不匹配
+        return weak or not parse_etags(if_match).contains(tag)
+
+    unmodified_since = parse_date(headers.get('if-unmodified-since'))
+    last_modified = to_timestamp(last_modified)
+    if unmodified_since is not None and last_modified is not None:
+        return int(last_modified) > int(unmodified_since)
+    return False
+
+
+def remove_entity_headers(headers: Any) -> None:
+    """移除304响应不应携带的实体头部"""
+    for key in [k for k in headers.keys() if k.lower() in _entity_headers]:
+        del headers[key]
+
+
+# 单个请求允许的最大区间数，超过则忽略 Range 头部
+MAX_RANGES = 64
+
+
+def parse_range_header(value: Optional[str], size: int) -> Optional[List[Tuple[int, int]]]:
+    """解析 Range 头部
+
+    返回按起点排序并合并后的 (start, end) 列表（end 不包含）。
+    头部格式错误或不受支持时返回 None（按 RFC 7233 应忽略该头部），
+    所有区间都无法满足时返回空列表（应返回416）。
+    """
+    if not value or '=' not in value:
+        return None
+    units, _, specs = value.partition('=')
+    if units.strip().lower() != 'bytes':
+        return None
+
+    ranges = []
+    for spec in specs.split(','):
+        spec = spec.strip()
+        if not spec:
+            continue
+        if '-' not in spec:
+            return None
+        first, _, last = spec.partition('-')
+        first = first.strip()
+        last = last.strip()
+        try:
+            if not first:
+                # 后缀区间：最后 N 个字节
+                length = int(last)
+                if length < 0:
+                    return None
+                if length == 0 or size == 0:
+                    continue
+                ranges.append((max(size - length, 0), size))
+                continue
+            start = int(first)
+            end = int(last) + 1 if last else None
+        except ValueError:
+            return None
+        if start < 0 or (end is not None and end <= start):
+            return None
+        if end is None:
+            end = size
+        if start >= size:
+            continue
+        ranges.append((start, min(end, size)))
+
+    if len(ranges) > MAX_RANGES:
+        return None
+
+    # 合并重叠或相邻的区间
+    ranges.sort()
+    merged: List[Tuple[int, int]] = []
+    for start, end in ranges:
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def is_range_applicable(
+    headers: Mapping[str, str],
+    etag: Optional[str] = None,
+    last_modified: Optional[str] = None,
+) -> bool:
+    """根据 If-Range 判断是否应该按区间响应"""
+    if_range = headers.get('if-range')
+    if not if_range:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith(('"', 'W/', 'w/')):
+        # If-Range 中的ETag使用强比较
+        tag, weak = unquote_etag(if_range)
+        if weak or etag is None:
+            return False
+        current, current_weak = unquote_etag(etag)
+        return not current_weak and tag == current
+    return last_modified is not None and if_range == last_modified
+
+
+def accepted_encodings(value: Optional[str]) -> frozenset:
+    """解析 Accept-Encoding，返回可接受（q>0）的编码集合
+
+    通配符 * 展开为 br 和 gzip。
+    """
+    if not value:
+        return frozenset()
+    accepted = set()
+    for part in value.split(','):
+        name, _, params = part.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if q > 0:
+            accepted.add(name)
+    if '*' in accepted:
+        accepted.update(('br', 'gzip'))
+    return frozenset(accepted)
@@ -0,0 +1,226 @@
+import codecs
+import json
+import re
+from typing import Any, List, Optional
+
+_WHITESPACE = ' \t\n\r'
+_DELIMITERS = _WHITESPACE + ',]'
+# 未完成元素的增量扫描：数字等标量遇到分隔符结束，字符串和嵌套结构按引号和括号配对
+_SCALAR_END = re.compile(r'[ \t\n\r,\]]')
+_STRING_SPECIAL = re.compile(r'["\\]')
+_STRUCTURE = re.compile(r'[\[\]{}"]')
+
+
+class JSONStreamError(ValueError):
+    """增量解析JSON失败"""
+
+
+class JSONItemTooLarge(JSONStreamError):
+    """单个元素超过长度上限"""
+
+
+class JSONItemParser:
+    """增量解析JSON请求体
+
+    顶层为数组时逐个返回数组元素，ndjson 为 True 时逐行返回，其他JSON值作为单个元素返回。
+    每个元素用 json 的C扫描器解码，只在内存中保留未完成的元素。
+    未完成的元素按块保存，每块新数据只扫描一次（查找换行符或元素的结束位置），
+    元素完整后才拼接解码，大元素分成很多小块到达时解析耗时仍是线性的。
+    max_item_size 限制单个元素（或单行）的字符数。
+    """
+    __slots__ = (
+        'ndjson', 'max_item_size', '_decoder', '_text', '_parts', '_size',
+        '_kind', '_depth', '_in_string', '_escape', '_state',
+    )
+
+    def __init__(self, ndjson: bool = False, max_item_size: Optional[int] = None):
+        self.ndjson = ndjson
+        self.max_item_size = max_item_size
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        # 尚未处理的文本块及其总长度
+        self._parts: List[str] = []
+        self._size = 0
+        # 未完成的数组元素：kind 为 scalar（数字等，遇到分隔符结束）或 nested（字符串、对象、数组）
+        self._kind: Optional[str] = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # start: 等待第一个字符；first: [ 之后；value: 逗号之后；comma: 元素之后；single: 非数组；done: 数组已结束
+        self._state = 'start'
+
+    def feed(self, chunk: bytes) -> List[Any]:
+        """写入一块数据，返回其中已完整的元素"""
+        text = self._text.decode(chunk)
+        if self.ndjson:
+            return self._lines(text, final=False)
+        return self._items(text, final=False)
+
+    def close(self) -> List[Any]:
+        """请求体结束，返回剩余元素，数据不完整时抛出 JSONStreamError"""
+        text = self._text.decode(b'', final=True)
+        if self.ndjson:
+            return self._lines(text, final=True)
+        items = self._items(text, final=True)
+        if self._state == 'single':
+            items.append(self._loads(''.join(self._parts)))
+            self._parts = []
+            self._size = 0
+        elif self._state in ('first', 'value', 'comma'):
+            raise JSONStreamError('JSON数组未结束')
+        return items
+
+    def _loads(self, text: str) -> Any:
+        try:
+            return json.loads(text)
+        except ValueError as e:
+            raise JSONStreamError(str(e))
+
+    def _check_size(self, size: int) -> None:
+        if self.max_item_size is not None and size > self.max_item_size:
+            raise JSONItemTooLarge(f'JSON元素超过 {self.max_item_size} 字符上限')
+
+    def _pending(self, text: str) -> None:
+        """保存未处理的文本"""
+        if text:
+            self._parts.append(text)
+            self._size += len(text)
+
+    def _lines(self, text: str, final: bool) -> List[Any]:
+        if not final and '\n' not in text:
+            # 只在新数据中查找换行符，未结束的行按块保存
+            self._pending(text)
+            self._check_size(self._size)
+            return []
+        self._parts.append(text)
+        lines = ''.join(self._parts).split('\n')
+        rest = '' if final else lines.pop()
+        self._parts = [rest] if rest else []
+        self._size = len(rest)
+        self._check_size(self._size)
+        items = []
+        for line in lines:
+            self._check_size(len(line))
+            if line.strip():
+                items.append(self._loads(line))
+        return items
+
+    def _scan(self, text: str) -> bool:
+        """扫描未完成元素的新数据，返回元素是否可能已经结束"""
+        if self._kind == 'scalar':
+            return _SCALAR_END.search(text) is not None
+        pos = 0
+        size = len(text)
+        while pos < size:
+            if self._escape:
+                self._escape = False
+                pos += 1
+                continue
+            if self._in_string:
+                match = _STRING_SPECIAL.search(text, pos)
+                if match is None:
+                    return False
+                pos = match.end()
+                if match.group() == '\\':
+                    self._escape = True
+                    continue
+                self._in_string = False
+                if self._depth == 0:
+                    return True
+                continue
+            match = _STRUCTURE.search(text, pos)
+            if match is None:
+                return False
+            pos = match.end()
+            char = match.group()
+            if char == '"':
+                self._in_string = True
+            elif char in '[{':
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth <= 0:
+                    return True
+        return False
+
+    def _wait(self, rest: str, decoded: bool) -> None:
+        """保存未完成的元素，decoded 为 False 表示解码失败"""
+        self._parts = [rest]
+        self._size = len(rest)
+        self._check_size(self._size)
+        self._kind = 'nested' if rest[0] in '"[{' else 'scalar'
+        self._depth = 0
+        self._in_string = self._escape = False
+        if not decoded and self._scan(rest):
+            # 元素已经结束仍然无法解码，后续数据不会改变结果
+            raise JSONStreamError('无法解析JSON数组元素')
+
+    def _items(self, text: str, final: bool) -> List[Any]:
+        if self._parts:
+            self._pending(text)
+            if not final and (self._state == 'single' or (self._kind is not None and not self._scan(text))):
+                # 元素仍未结束，只扫描了新数据
+                self._check_size(self._size)
+                return []
+            text = ''.join(self._parts)
+            self._parts = []
+            self._size = 0
+            self._kind = None
+        buffer = text
+        size = len(buffer)
+        pos = 0
+        items = []
+        while True:
+            while pos < size and buffer[pos] in _WHITESPACE:
+                pos += 1
+            if pos == size:
+                break
+            state = self._state
+            char = buffer[pos]
+            if state == 'start':
+                if char == '[':
+                    self._state = 'first'
+                    pos += 1
+                    continue
+                # 顶层不是数组，整个请求体作为一个值
+                self._state = 'single'
+                self._check_size(size - pos)
+                self._pending(buffer[pos:])
+                break
+            if state == 'single':
+                self._check_size(size - pos)
+                self._pending(buffer[pos:])
+                break
+            if state == 'done':
+                raise JSONStreamError('JSON数组之后有多余数据')
+            if char == ']' and state in ('first', 'comma'):
+                self._state = 'done'
+                pos += 1
+                continue
+            if state == 'comma':
+                if char != ',':
+                    raise JSONStreamError(f'JSON数组元素之间缺少逗号: {char!r}')
+                self._state = 'value'
+                pos += 1
+                continue
+            try:
+                item, end = self._decoder.raw_decode(buffer, pos)
+            except ValueError:
+                # 元素可能尚未接收完整
+                if final:
+                    raise JSONStreamError('无法解析JSON数组元素')
+                self._wait(buffer[pos:], decoded=False)
+                break
+            if (
+                not final and isinstance(item, (int, float))
+                and (end == size or buffer[end] not in _DELIMITERS)
+                and _SCALAR_END.search(buffer, end) is None
+            ):
+                # 数字可能在块边界被截断，例如 "2." 之后还有 "5"
+                self._wait(buffer[pos:], decoded=True)
+                break
+            self._check_size(end - pos)
+            items.append(item)
+            self._state = 'comma'
+            pos = end
+        return items
@@ -0,0 +1,112 @@
+import hashlib
+import inspect
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict, Iterator, Optional
+
+# 缓存文件名前缀，后接路由表哈希
+CACHE_PREFIX = 'openapi-'
+
+
+def _module_stat(module_name: Optional[str]) -> str:
+    """模块源文件的修改时间和大小，模型字段等不在路由表中的改动也会改变哈希"""
+    module = sys.modules.get(module_name or '')
+    path = getattr(module, '__file__', None)
+    if not path:
+        return ''
+    try:
+        st = os.stat(path)
+    except OSError:
+        return path
+    return f'{path}:{st.st_mtime_ns}:{st.st_size}'
+
+
+def _annotation_modules(endpoint: Any) -> Iterator[str]:
+    try:
+        signature = inspect.signature(endpoint)
+    except (TypeError, ValueError):
+        return
+    for annotation in [signature.return_annotation, *(p.annotation for p in signature.parameters.values())]:
+        module = getattr(annotation, '__module__', None)
+        if module and module != 'builtins':
+            yield module
+
+
+def _route_entries(routes: Any) -> Iterator[str]:
+    from .routing import iter_routes
+    for info in iter_routes(routes):
+        route = info.original_route
+        endpoint = getattr(route, 'endpoint', None)
+        view = inspect.unwrap(endpoint) if endpoint is not None else None
+        fields = [
+            type(route).__name__,
+            info.path_format,
+            ','.join(sorted(info.methods or ())),
+            info.name or '',
+            str(info.include_in_schema),
+        ]
+        if view is not None:
+            fields.append(f'{getattr(view, "__module__", "")}.{getattr(view, "__qualname__", "")}')
+            try:
+                fields.append(str(inspect.signature(endpoint)))
+            except (TypeError, ValueError):
+                pass
+            fields.append(inspect.getdoc(view) or '')
+            modules = {getattr(view, '__module__', None), *_annotation_modules(endpoint)}
+            response_model = getattr(route, 'response_model', None)
+            if response_model is not None:
+                modules.add(getattr(response_model, '__module__', None))
+            fields.extend(sorted(_module_stat(name) for name in modules if name))
+        for attr in ('tags', 'summary', 'description', 'status_code', 'deprecated', 'operation_id', 'responses'):
+            value = getattr(route, attr, None)
+            if value:
+                fields.append(f'{attr}={value!r}')
+        yield '\x1f'.join(fields)
+
+
+def route_table_key(app: Any) -> str:
+    """路由表的哈希，用作 OpenAPI 缓存文件的键"""
+    import fastapi
+    from . import __version__
+    digest = hashlib.sha256()
+    meta = [
+        fastapi.__version__, __version__, app.title, app.version, app.openapi_version,
+        app.summary, app.description, app.openapi_tags, app.servers,
+    ]
+    digest.update(repr(meta).encode())
+    for entry in _route_entries(app.routes):
+        digest.update(entry.encode())
+        digest.update(b'\x1e')
+    return digest.hexdigest()[:32]
+
+
+def cache_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f'{CACHE_PREFIX}{key}.json')
+
+
+def load_schema(path: str) -> Optional[Dict[str, Any]]:
+    """读取缓存的文档，不存在或已损坏时返回None"""
+    try:
+        with open(path, 'rb') as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def write_schema(path: str, schema: Dict[str, Any]) -> None:
+    """原子地写入文档，多个worker同时写入时不会读到不完整的文件"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.openapi-', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(schema, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
@@ -1,235 +1,449 @@
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
 from starlette.requests import Request as StarletteRequest
-from typing import Dict, Any, Optional, List, Union, AsyncGenerator
+from typing import Dict, Any, Optional, List, Union, AsyncGenerator, AsyncIterator, Awaitable, BinaryIO, Callable, Iterator
+import asyncio
+import functools
+import io
+import json as _json
+import tempfile
 from contextvars import ContextVar
+from .datastructures import MultiDictView
 
-# 创建上下文变量来存储当前请求
-_request_ctx_var: ContextVar[Optional[StarletteRequest]] = ContextVar('request', default=None)
-# 创建上下文变量来缓存请求数据
-_form_data_cache: ContextVar[Optional[Dict[str, Any]]] = ContextVar('form_data', default=None)
-_json_data_cache: ContextVar[Optional[Dict[str, Any]]] = ContextVar('json_data', default=None)
-# 创建上下文变量来存储g对象
-_g_ctx_var: ContextVar[Optional[Dict[str, Any]]] = ContextVar('g', default=None)
-# 创建上下文变量来缓存文件数据
-_files_cache: ContextVar[Optional[Dict[str, Any]]] = ContextVar('files', default=None)
+class _AppCtxGlobals:
+    """一个请求的g对象数据，属性直接存放在实例字典中"""
+    def get(self, name: str, default: Any = None) -> Any:
+        """获取属性，不存在则返回默认值"""
+        return self.__dict__.get(name, default)
+    
+    def pop(self, name: str, default: Any = None) -> Any:
+        """移除并返回属性值"""
+        return self.__dict__.pop(name, default)
+    
+    def setdefault(self, name: str, default: Any = None) -> Any:
+        """属性不存在时设置为默认值，返回属性值"""
+        return self.__dict__.setdefault(name, default)
+    
+    def clear(self) -> None:
+        """清空所有属性"""
+        self.__dict__.clear()
+    
+    def __contains__(self, name: str) -> bool:
+        return name in self.__dict__
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__dict__)
+    
+    def __repr__(self) -> str:
+        return f"<g {self.__dict__!r}>"
+
+class _RequestContext:
+    """一个请求的全部状态
+
+    request、g、session 代理每次访问只需一次 ContextVar 查找，表单、JSON 等缓存
+    直接写在这个对象上，工作线程中的同步视图写入的缓存在请求内其他地方也可见。
+    """
+    __slots__ = ('request', 'form', 'files', 'json', 'g', 'views', 'session', 'session_id', 'timings')
+    
+    def __init__(self, req: Optional[StarletteRequest]):
+        self.request = req
+        self.form: Optional[MultiDictView] = None
+        self.files: Optional[MultiDictView] = None
+        self.json: Any = None
+        self.g = _AppCtxGlobals()
+        self.views: Dict[str, MultiDictView] = {}
+        self.session: Any = None
+        self.session_id: Optional[str] = None
+        # 启用 SERVER_TIMING 时为 RequestTimings
+        self.timings: Any = None
+
+# 创建上下文变量来存储当前请求上下文
+_request_ctx_var: ContextVar[Optional[_RequestContext]] = ContextVar('request_context', default=None)
+# 请求之外读取 request 时使用的空上下文
+_NO_CONTEXT = _RequestContext(None)
+
+def _current_context() -> _RequestContext:
+    """返回当前请求上下文，请求之外（例如脚本或测试中）在当前上下文中创建一个"""
+    ctx = _request_ctx_var.get()
+    if ctx is None:
+        ctx = _RequestContext(None)
+        _request_ctx_var.set(ctx)
+    return ctx
 
 class G:
     """Flask风格的g对象"""
-    @property
-    def _data(self) -> Dict[str, Any]:
-        data = _g_ctx_var.get()
-        if data is None:
-            data = {}
-            _g_ctx_var.set(data)
-        return data
+    __slots__ = ()
+    
+    def _get_current_object(self) -> _AppCtxGlobals:
+        """返回当前请求的g对象，循环中重复访问时省去上下文查找"""
+        return _current_context().g
     
-    def __getattr__(self, name: str) -> Any:
-        if name in self._data:
-            return self._data[name]
-        raise AttributeError(f'g对象没有属性: {name}')
+    def __getattribute__(self, name: str) -> Any:
+        # 先查当前请求的属性，避免 __getattr__ 先抛出一次 AttributeError 的开销
+        data = _current_context().g.__dict__
+        if name in data:
+            return data[name]
+        try:
+            return object.__getattribute__(self, name)
+        except AttributeError:
+            raise AttributeError(f'g对象没有属性: {name}') from None
     
     def __setattr__(self, name: str, value: Any) -> None:
-        self._data[name] = value
+        _current_context().g.__dict__[name] = value
     
     def __delattr__(self, name: str) -> None:
-        if name in self._data:
-            del self._data[name]
-        else:
-            raise AttributeError(f'g对象没有属性: {name}')
+        try:
+            del _current_context().g.__dict__[name]
+        except KeyError:
+            raise AttributeError(f'g对象没有属性: {name}') from None
     
     def get(self, name: str, default: Any = None) -> Any:
         """获取属性，不存在则返回默认值"""
-        return self._data.get(name, default)
+        return _current_context().g.__dict__.get(name, default)
     
     def pop(self, name: str, default: Any = None) -> Any:
         """移除并返回属性值"""
-        return self._data.pop(name, default)
+        return _current_context().g.__dict__.pop(name, default)
+    
+    def setdefault(self, name: str, default: Any = None) -> Any:
+        """属性不存在时设置为默认值，返回属性值"""
+        return _current_context().g.__dict__.setdefault(name, default)
     
     def clear(self) -> None:
         """清空所有属性"""
-        self._data.clear()
+        _current_context().g.__dict__.clear()
     
     def __contains__(self, name: str) -> bool:
-        return name in self._data
+        return name in _current_context().g.__dict__
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(_current_context().g.__dict__)
+    
+    def __repr__(self) -> str:
+        return repr(_current_context().g)
 
 # 创建全局g对象实例
 g = G()
 
+_UNSET = object()
+
+
+class _BodyNotLoaded(RuntimeError):
+    """在事件循环线程中同步读取未缓存的请求体"""
+
+
+def _on_event_loop() -> bool:
+    """当前线程是否在运行事件循环（异步视图），同步视图在工作线程中运行"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _is_form(req: StarletteRequest) -> bool:
+    return req.headers.get('content-type', '').startswith(('application/x-www-form-urlencoded', 'multipart/form-data'))
+
+
+async def _resolved(value: Any) -> Any:
+    return value
+
+
+async def _parse_form(req: StarletteRequest, config: Dict[str, Any]) -> Any:
+    from .formparser import parse_form
+    try:
+        return await parse_form(req.headers, _form_stream(req), config)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(400, f'无法解析表单数据: {e}')
+
+
+async def _form_stream(req: StarletteRequest) -> AsyncIterator[bytes]:
+    async for chunk in RequestStream(req):
+        yield chunk
+    # 与 Starlette 的 stream() 一致，以空块表示结束
+    yield b''
+
+
+def _app_config() -> Dict[str, Any]:
+    from .app import current_app
+    try:
+        return current_app.config
+    except RuntimeError:
+        return {}
+
+
+# 请求体临时文件在 ASGI scope 中的键，请求结束时关闭
+INPUT_STREAM_KEY = 'foxar.input_stream'
+
+
+def _new_spooled_file() -> BinaryIO:
+    max_size = _app_config().get('REQUEST_SPOOL_MAX_MEMORY') or 0
+    return tempfile.SpooledTemporaryFile(max_size=max_size)
+
+
+def close_input_stream(scope: Dict[str, Any]) -> None:
+    """关闭请求的临时文件，磁盘上的数据随之删除"""
+    spooled = scope.pop(INPUT_STREAM_KEY, None)
+    if spooled is not None:
+        spooled.close()
+
+
+async def _next_chunk(iterator: AsyncIterator[bytes]) -> bytes:
+    return await iterator.__anext__()
+
+
+class RequestStream:
+    """请求体块迭代器
+
+    请求体已缓存或已写入 input_stream 时直接从缓存读取；否则异步迭代逐块读取
+    receive，同步迭代在工作线程中每次等待事件循环读取一块，内存占用与块大小相当。
+    """
+    __slots__ = ('_req',)
+
+    def __init__(self, req: Optional[StarletteRequest]):
+        self._req = req
+
+    def _cached(self) -> Optional[Iterator[bytes]]:
+        req = self._req
+        if req is None:
+            return iter(())
+        body = getattr(req, '_body', None)
+        if body is not None:
+            return iter((body,) if body else ())
+        spooled = req.scope.get(INPUT_STREAM_KEY)
+        if spooled is not None:
+            spooled.seek(0)
+            return iter(functools.partial(spooled.read, 64 * 1024), b'')
+        return None
+
+    def __iter__(self) -> Iterator[bytes]:
+        cached = self._cached()
+        if cached is not None:
+            yield from cached
+            return
+        iterator = self._req.stream().__aiter__()
+        while True:
+            try:
+                chunk = request._run_async(_next_chunk, iterator)
+            except StopAsyncIteration:
+                return
+            if chunk:
+                yield chunk
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        cached = self._cached()
+        if cached is not None:
+            for chunk in cached:
+                yield chunk
+            return
+        async for chunk in self._req.stream():
+            if chunk:
+                yield chunk
+
+
+class JSONItems:
+    """请求体中JSON元素的迭代器，支持 for 和 async for
+
+    解析错误返回400，单个元素超过上限返回413。
+    """
+    __slots__ = ('_stream', '_parser')
+
+    def __init__(self, stream: RequestStream, parser: Any):
+        self._stream = stream
+        self._parser = parser
+
+    def _call(self, method: Callable[..., List[Any]], *args: Any) -> List[Any]:
+        from .jsonstream import JSONItemTooLarge, JSONStreamError
+        try:
+            return method(*args)
+        except JSONItemTooLarge as e:
+            raise HTTPException(413, str(e))
+        except JSONStreamError as e:
+            raise HTTPException(400, str(e))
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self._stream:
+            yield from self._call(self._parser.feed, chunk)
+        yield from self._call(self._parser.close)
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+        async for chunk in self._stream:
+            for item in self._call(self._parser.feed, chunk):
+                yield item
+        for item in self._call(self._parser.close):
+            yield item
+
+
 class RequestProxy:
+    """Flask风格的request对象
+
+    每个属性只查找一次当前请求上下文。循环中重复访问时可先调用
+    _get_current_object() 取得绑定到当前请求的对象。
+    """
+    __slots__ = ()
+    
+    def _context(self) -> _RequestContext:
+        ctx = _request_ctx_var.get()
+        return _NO_CONTEXT if ctx is None else ctx
+    
+    def _get_current_object(self) -> 'BoundRequest':
+        """返回绑定到当前请求的request对象，访问属性时不再查找上下文"""
+        return BoundRequest(self._context())
+    
     @property
     def request(self) -> Optional[StarletteRequest]:
-        return _request_ctx_var.get()
+        ctx = _request_ctx_var.get()
+        return None if ctx is None else ctx.request
     
     @property
     def method(self) -> str:
-        if self.request:
-            return self.request.method
-        return ''
+        req = self.request
+        return req.method if req is not None else ''
     
     @property
     def url(self) -> Any:
-        if self.request:
-            return self.request.url
-        return None
+        req = self.request
+        return req.url if req is not None else None
     
     @property
     def path(self) -> str:
-        if self.request:
-            return self.request.url.path
-        return ''
+        req = self.request
+        return req.url.path if req is not None else ''
+    
+    def _view(self, name: str) -> MultiDictView:
+        """返回当前请求的多值视图，每个请求只创建一次"""
+        ctx = self._context()
+        view = ctx.views.get(name)
+        if view is None:
+            if ctx.request is None:
+                return MultiDictView()
+            view = ctx.views[name] = MultiDictView(getattr(ctx.request, name))
+        return view
     
     @property
-    def args(self) -> Dict[str, List[str]]:
-        if self.request:
-            return dict(self.request.query_params.multi_items())
-        return {}
+    def args(self) -> MultiDictView:
+        """查询参数"""
+        return self._view('query_params')
     
-    async def form(self) -> Dict[str, Any]:
-        """获取表单数据"""
-        if not self.request:
-            return {}
-        
-        # 检查缓存
-        cached = _form_data_cache.get()
-        if cached is not None:
-            return cached
-        
-        # 解析表单数据
-        try:
-            form_data = await self.request.form()
-            result = dict(form_data)
-            # 缓存结果
-            _form_data_cache.set(result)
-            return result
-        except Exception:
-            return {}
-    
-    async def json(self) -> Dict[str, Any]:
-        """获取JSON数据"""
-        if not self.request:
-            return {}
+    def form(self) -> MultiDictView:
+        """获取表单数据，第一次访问时才解析
         
+        与 get_data、get_json、files 等读取请求体的方法一样，在异步视图中返回可等待对象：
+        await request.form()。
+        """
+        ctx = self._context()
+        if _on_event_loop():
+            return self._form_async(ctx, 0)
+        return self._load_form(ctx)[0]
+    
+    @property
+    def files(self) -> MultiDictView:
+        """获取上传的文件，与表单数据一起解析，异步视图中使用 await request.files"""
+        ctx = self._context()
+        if _on_event_loop():
+            return self._form_async(ctx, 1)
+        return self._load_form(ctx)[1]
+    
+    def _load_form(self, ctx: _RequestContext) -> Any:
+        """解析表单，表单字段和上传文件只解析一次，解析失败返回400"""
         # 检查缓存
-        cached = _json_data_cache.get()
-        if cached is not None:
-            return cached
+        if ctx.form is not None:
+            return ctx.form, ctx.files
+        if ctx.request is None or not _is_form(ctx.request):
+            ctx.form, ctx.files = MultiDictView(), MultiDictView()
+            return ctx.form, ctx.files
         
-        # 解析JSON数据
-        try:
-            json_data = await self.request.json()
-            # 缓存结果
-            _json_data_cache.set(json_data)
-            return json_data
-        except Exception:
-            return {}
+        # 同步视图在工作线程中读取并解析表单
+        ctx.form, ctx.files = self._run_async(_parse_form, ctx.request, _app_config())
+        return ctx.form, ctx.files
+    
+    async def _form_async(self, ctx: _RequestContext, index: int) -> MultiDictView:
+        """在事件循环中边接收边解析表单，请求体较大或分块传输时也不必先读入内存"""
+        if ctx.form is None:
+            if ctx.request is None or not _is_form(ctx.request):
+                ctx.form, ctx.files = MultiDictView(), MultiDictView()
+            else:
+                # 不超过 REQUEST_PREFETCH_MAX_SIZE 的请求体先缓存，之后 get_data 仍可读取
+                config = _app_config()
+                await self.load_body(config.get('REQUEST_PREFETCH_MAX_SIZE'), parse=False)
+                ctx.form, ctx.files = await _parse_form(ctx.request, config)
+        return (ctx.form, ctx.files)[index]
     
     @property
-    def cookies(self) -> Dict[str, str]:
-        if self.request:
-            return dict(self.request.cookies)
-        return {}
+    def max_content_length(self) -> Optional[int]:
+        """当前请求适用的请求体大小上限"""
+        req = self.request
+        if req is None:
+            return None
+        return max_content_length(req.scope, _app_config().get('MAX_CONTENT_LENGTH'))
     
     @property
-    def headers(self) -> Dict[str, str]:
-        if self.request:
-            return dict(self.request.headers)
-        return {}
+    def cookies(self) -> MultiDictView:
+        """请求cookies"""
+        return self._view('cookies')
     
     @property
-    def environ(self) -> Dict[str, Any]:
-        if self.request:
-            return self.request.scope
-        return {}
+    def headers(self) -> MultiDictView:
+        """请求头，键不区分大小写"""
+        return self._view('headers')
     
     @property
-    async def files(self) -> Dict[str, Any]:
-        """获取上传的文件"""
-        if not self.request:
-            return {}
-        
-        # 检查缓存
-        from .request import _files_cache
-        cached = _files_cache.get()
-        if cached is not None:
-            return cached
-        
-        # 解析表单数据，获取文件
-        files = {}
-        try:
-            form_data = await self.request.form()
-            for key, value in form_data.items():
-                if hasattr(value, 'file') and hasattr(value, 'filename'):
-                    # 创建Flask风格的文件对象
-                    class FlaskFile:
-                        def __init__(self, file_obj, filename):
-                            self.file = file_obj
-                            self.filename = filename
-                            self.name = filename
-                    
-                    files[key] = FlaskFile(value.file, value.filename)
-            
-            # 缓存结果
-            _files_cache.set(files)
-        except Exception:
-            pass
-        
-        return files
+    def environ(self) -> Dict[str, Any]:
+        req = self.request
+        return req.scope if req is not None else {}
     
     @property
     def remote_addr(self) -> str:
         """获取客户端IP地址"""
-        if self.request:
-            return self.request.client.host if self.request.client else ''
+        req = self.request
+        if req is not None and req.client:
+            return req.client.host
         return ''
     
     @property
     def user_agent(self) -> str:
         """获取用户代理"""
-        if self.request:
-            return self.request.headers.get('user-agent', '')
-        return ''
+        req = self.request
+        return req.headers.get('user-agent', '') if req is not None else ''
     
     @property
     def is_secure(self) -> bool:
         """检查是否为HTTPS请求"""
-        if self.request:
-            return self.request.url.scheme == 'https'
-        return False
+        req = self.request
+        return req is not None and req.url.scheme == 'https'
     
     @property
     def host(self) -> str:
         """获取主机名"""
-        if self.request:
-            return self.request.headers.get('host', '')
-        return ''
+        req = self.request
+        return req.headers.get('host', '') if req is not None else ''
     
     @property
     def base_url(self) -> str:
         """获取基础URL"""
-        if self.request:
-            return f"{self.request.url.scheme}://{self.request.headers.get('host', '')}"
+        req = self.request
+        if req is not None:
+            return f"{req.url.scheme}://{req.headers.get('host', '')}"
         return ''
     
     @property
     def is_json(self) -> bool:
         """检查请求是否为JSON格式"""
-        if self.request:
-            content_type = self.request.headers.get('content-type', '')
-            return 'application/json' in content_type
-        return False
+        req = self.request
+        return req is not None and 'application/json' in req.headers.get('content-type', '')
     
     @property
     def endpoint(self) -> str:
         """获取当前端点名称"""
-        if self.request:
-            return getattr(self.request, 'endpoint', None)
-        return None
+        return getattr(self.request, 'endpoint', None)
     
     @property
     def view_args(self) -> Dict[str, Any]:
         """获取视图参数"""
-        if self.request:
-            return getattr(self.request, 'path_params', {})
-        return {}
+        req = self.request
+        return getattr(req, 'path_params', {}) if req is not None else {}
     
     @property
     def blueprints(self) -> List[str]:
@@ -238,70 +452,217 @@ class RequestProxy:
         return []
     
     @property
-    def json(self) -> Dict[str, Any]:
-        """获取JSON数据"""
-        import asyncio
-        loop = asyncio.get_event_loop()
-        return loop.run_until_complete(self.get_json())
+    def json(self) -> Any:
+        """获取JSON数据，异步视图中使用 await request.json"""
+        return self.get_json()
     
-    def get_json(self, force: bool = False, silent: bool = False, cache: bool = True) -> Dict[str, Any]:
-        """获取JSON数据"""
-        import asyncio
-        loop = asyncio.get_event_loop()
-        return loop.run_until_complete(self._get_json_async(force, silent, cache))
-    
-    async def _get_json_async(self, force: bool = False, silent: bool = False, cache: bool = True) -> Dict[str, Any]:
-        """异步获取JSON数据"""
-        if self.request:
-            try:
-                return await self.request.json()
-            except Exception as e:
-                if silent:
-                    return {}
-                raise
-        return {}
-    
-    def get(self, key: str, default: Any = None) -> Any:
-        """获取查询参数或表单数据"""
-        if key in self.args:
-            return self.args[key][0] if len(self.args[key]) > 0 else default
-        return default
+    def get_json(self, force: bool = False, silent: bool = False, cache: bool = True) -> Any:
+        """解析JSON请求体，异步视图中返回可等待对象
+        
+        非JSON请求且未指定 force 时返回None；解析失败时 silent 为True则返回None，否则返回400。
+        """
+        ctx = self._context()
+        if _on_event_loop():
+            return self._get_json_async(ctx, force, silent, cache)
+        if ctx.json is not None:
+            return ctx.json
+        if ctx.request is None or not (force or self.is_json):
+            return None
+        return self._decode_json(ctx, self._get_data(ctx.request), silent, cache)
+    
+    async def _get_json_async(self, ctx: _RequestContext, force: bool, silent: bool, cache: bool) -> Any:
+        if ctx.json is not None:
+            return ctx.json
+        if ctx.request is None or not (force or self.is_json):
+            return None
+        return self._decode_json(ctx, await self._get_data_async(ctx.request), silent, cache)
+    
+    def _decode_json(self, ctx: _RequestContext, data: bytes, silent: bool, cache: bool) -> Any:
+        try:
+            rv = _json.loads(data) if data else None
+        except ValueError:
+            if silent:
+                return None
+            raise HTTPException(400, '无法解析JSON请求体')
+        if cache:
+            ctx.json = rv
+        return rv
+    
+    def get(self, key: str, default: Any = None, type: Optional[Any] = None) -> Any:
+        """获取查询参数"""
+        return self.args.get(key, default, type=type)
     
     def args_get(self, key: str, default: Any = None) -> Any:
         """获取查询参数"""
-        if self.request:
-            return self.request.query_params.get(key, default)
-        return default
-    
-    async def form_get(self, key: str, default: Any = None) -> Any:
-        """获取表单数据"""
-        form_data = await self.form()
-        return form_data.get(key, default)
-    
-    async def get_json(self, force: bool = False, silent: bool = False, cache: bool = True) -> Dict[str, Any]:
-        """获取JSON数据"""
-        if self.request:
+        req = self.request
+        return req.query_params.get(key, default) if req is not None else default
+    
+    def form_get(self, key: str, default: Any = None) -> Any:
+        """获取表单数据，异步视图中返回可等待对象"""
+        ctx = self._context()
+        if _on_event_loop():
+            return self._form_get_async(ctx, 0, key, default)
+        return self._load_form(ctx)[0].get(key, default)
+    
+    async def _form_get_async(self, ctx: _RequestContext, index: int, key: str, default: Any) -> Any:
+        return (await self._form_async(ctx, index)).get(key, default)
+    
+    def get_data(self, cache: bool = True, as_text: bool = False, parse_form_data: bool = False) -> Union[bytes, str, Dict[str, Any]]:
+        """获取原始请求数据，异步视图中返回可等待对象"""
+        req = self.request
+        if _on_event_loop():
+            if req is None:
+                return _resolved(b'' if not as_text else '')
+            return self._get_data_async(req, as_text)
+        if req is None:
+            return b'' if not as_text else ''
+        data = self._get_data(req)
+        if as_text:
+            return data.decode('utf-8')
+        return data
+    
+    def _cached_data(self, req: StarletteRequest) -> Optional[bytes]:
+        data = getattr(req, '_body', None)
+        if data is None:
+            spooled = req.scope.get(INPUT_STREAM_KEY)
+            if spooled is not None:
+                # 请求体已通过 input_stream 读取
+                position = spooled.tell()
+                spooled.seek(0)
+                data = spooled.read()
+                spooled.seek(position)
+        return data
+    
+    def _get_data(self, req: StarletteRequest) -> bytes:
+        data = self._cached_data(req)
+        if data is None:
+            data = self._run_async(req.body)
+        return data
+    
+    async def _get_data_async(self, req: StarletteRequest, as_text: bool = False) -> Union[bytes, str]:
+        data = self._cached_data(req)
+        if data is None:
+            data = await req.body()
+        if as_text:
+            return data.decode('utf-8')
+        return data
+    
+    @property
+    def stream(self) -> 'RequestStream':
+        """请求体块迭代器，异步视图使用 async for，同步视图使用 for"""
+        return RequestStream(self.request)
+    
+    def iter_json(self, max_item_size: Optional[int] = None) -> JSONItems:
+        """逐个返回JSON数组元素或NDJSON行，内存中只保留当前元素
+        
+        Content-Type 为 application/x-ndjson 或 application/jsonl 时按行解析。
+        max_item_size 默认为 JSON_STREAM_MAX_ITEM_SIZE。
+        """
+        from .jsonstream import JSONItemParser
+        if max_item_size is None:
+            max_item_size = _app_config().get('JSON_STREAM_MAX_ITEM_SIZE')
+        content_type = self.headers.get('content-type', '').split(';', 1)[0].strip().lower()
+        ndjson = content_type in ('application/x-ndjson', 'application/jsonl')
+        return JSONItems(self.stream, JSONItemParser(ndjson=ndjson, max_item_size=max_item_size))
+    
+    @property
+    def input_stream(self) -> BinaryIO:
+        """类文件形式的请求体
+        
+        请求体逐块写入 SpooledTemporaryFile，超过 REQUEST_SPOOL_MAX_MEMORY 后转存到磁盘。
+        异步视图中请先调用 await request.load_input_stream()。
+        """
+        req = self.request
+        if req is None:
+            return io.BytesIO()
+        spooled = req.scope.get(INPUT_STREAM_KEY)
+        if spooled is None:
+            spooled = _new_spooled_file()
+            for chunk in self.stream:
+                spooled.write(chunk)
+            spooled.seek(0)
+            req.scope[INPUT_STREAM_KEY] = spooled
+        return spooled
+    
+    async def load_input_stream(self) -> BinaryIO:
+        """在事件循环中将请求体写入临时文件并返回 input_stream"""
+        req = self.request
+        if req is None:
+            return io.BytesIO()
+        spooled = req.scope.get(INPUT_STREAM_KEY)
+        if spooled is None:
+            spooled = _new_spooled_file()
+            async for chunk in self.stream:
+                spooled.write(chunk)
+            spooled.seek(0)
+            req.scope[INPUT_STREAM_KEY] = spooled
+        return spooled
+    
+    async def load_body(self, max_size: Optional[int] = None, parse: bool = True) -> bool:
+        """在事件循环中读取并缓存请求体，之后同步视图中 json、get_json、form、get_data
+        可直接读取，不必在工作线程中等待事件循环
+        
+        请求体长度未知或超过 max_size 时不预读，返回是否已缓存。parse 为 False 时
+        只读取请求体，表单和JSON留到第一次访问时再解析。
+        """
+        ctx = self._context()
+        req = ctx.request
+        if req is None:
+            return False
+        if getattr(req, '_body', None) is None:
+            content_length = req.headers.get('content-length')
+            if content_length is None:
+                # 分块传输的请求体长度未知，留给视图按需读取
+                if 'transfer-encoding' in req.headers:
+                    return False
+            elif max_size is not None and int(content_length) > max_size:
+                return False
+            await req.body()
+        if not parse:
+            return True
+        
+        content_type = req.headers.get('content-type', '')
+        if content_type.startswith(('application/x-www-form-urlencoded', 'multipart/form-data')):
+            if ctx.form is None:
+                ctx.form, ctx.files = await _parse_form(req, _app_config())
+        elif self.is_json and ctx.json is None:
             try:
-                return await self.json()
-            except Exception as e:
-                if silent:
-                    return {}
-                raise
-        return {}
+                ctx.json = _json.loads(req._body)
+            except ValueError:
+                # 解析错误在视图调用 get_json 时处理
+                pass
+        return True
+    
+    def _run_async(self, func: Callable[..., Awaitable[Any]], *args: Any) -> Any:
+        """在同步视图的工作线程中等待事件循环完成 func"""
+        import asyncio
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            import anyio.from_thread
+            return anyio.from_thread.run(func, *args)
+        raise _BodyNotLoaded('请求体尚未读取，异步视图中请使用 await 读取')
+    
+    def files_get(self, key: str, default: Any = None) -> Any:
+        """获取上传的文件，异步视图中返回可等待对象"""
+        ctx = self._context()
+        if _on_event_loop():
+            return self._form_get_async(ctx, 1, key, default)
+        return self._load_form(ctx)[1].get(key, default)
+
+class BoundRequest(RequestProxy):
+    """绑定到某个请求上下文的request对象，由 request._get_current_object() 返回"""
+    __slots__ = ('_ctx', 'request')
     
-    async def get_data(self, cache: bool = True, as_text: bool = False, parse_form_data: bool = False) -> Union[bytes, str, Dict[str, Any]]:
-        """获取原始请求数据"""
-        if self.request:
-            data = await self.request.body()
-            if as_text:
-                return data.decode('utf-8')
-            return data
-        return b'' if not as_text else ''
+    def __init__(self, ctx: _RequestContext):
+        self._ctx = ctx
+        self.request = ctx.request
     
-    async def files_get(self, key: str, default: Any = None) -> Any:
-        """获取上传的文件"""
-        files = await self.files
-        return files.get(key, default)
+    def _context(self) -> _RequestContext:
+        return self._ctx
+    
+    def _get_current_object(self) -> 'BoundRequest':
+        return self
 
 # 创建全局请求代理实例
 request = RequestProxy()
@@ -310,43 +671,94 @@ request = RequestProxy()
 class request_context:
     def __init__(self, req: StarletteRequest):
         self.req = req
-        self.request_token = None
-        self.form_token = None
-        self.json_token = None
-        self.g_token = None
-        self.files_token = None
-        self.session_token = None
-        self.session_id_token = None
+        self.context: Optional[_RequestContext] = None
+        self.token = None
+        self.outer_request = None
     
     async def __aenter__(self):
-        self.request_token = _request_ctx_var.set(self.req)
-        self.form_token = _form_data_cache.set(None)
-        self.json_token = _json_data_cache.set(None)
-        self.g_token = _g_ctx_var.set({})
-        self.files_token = _files_cache.set(None)
-        # 导入会话相关的上下文变量
-        from .utils import _session_ctx_var, _session_id_ctx_var
-        self.session_token = _session_ctx_var.set({})
-        self.session_id_token = _session_id_ctx_var.set(None)
+        outer = _request_ctx_var.get()
+        if outer is not None and outer.request is not None and outer.request.scope is self.req.scope:
+            # 同一请求再次进入（钩子中间件之后的视图），沿用外层上下文，钩子中设置的 g 和会话在视图中可见
+            self.context = outer
+            self.outer_request = outer.request
+            outer.request = self.req
+            return self.req
+        self.context = _RequestContext(self.req)
+        self.token = _request_ctx_var.set(self.context)
         return self.req
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.request_token:
-            _request_ctx_var.reset(self.request_token)
-        if self.form_token:
-            _form_data_cache.reset(self.form_token)
-        if self.json_token:
-            _json_data_cache.reset(self.json_token)
-        if self.g_token:
-            _g_ctx_var.reset(self.g_token)
-        if self.files_token:
-            _files_cache.reset(self.files_token)
-        # 重置会话相关的上下文变量
-        from .utils import _session_ctx_var, _session_id_ctx_var
-        if self.session_token:
-            _session_ctx_var.reset(self.session_token)
-        if self.session_id_token:
-            _session_id_ctx_var.reset(self.session_id_token)
+        if self.outer_request is not None:
+            self.context.request = self.outer_request
+            self.outer_request = None
+        if self.token:
+            # 请求结束时关闭上传文件，删除转存到磁盘的临时文件
+            if self.context.files:
+                for _, storage in self.context.files.multi_items():
+                    storage.close()
+            _request_ctx_var.reset(self.token)
+            self.token = None
 
 # 请求代理，用于兼容Flask的request对象使用方式
 request_proxy = request
+
+
+class RequestEntityTooLarge(HTTPException):
+    """请求体超过 MAX_CONTENT_LENGTH"""
+    def __init__(self, limit: int):
+        super().__init__(413, f'请求体超过 {limit} 字节上限')
+
+
+def max_content_length(scope: Dict[str, Any], default: Optional[int]) -> Optional[int]:
+    """返回请求适用的请求体大小上限，路由或蓝图设置的值优先于应用配置
+
+    蓝图路由的上限记录在路由对象上，应用路由和 FlaskRoute 的上限记录在各自的处理函数上。
+    """
+    limit = getattr(scope.get('route'), 'max_content_length', None)
+    if limit is None:
+        limit = getattr(scope.get('endpoint'), 'max_content_length', None)
+    return default if limit is None else limit
+
+
+def end_body_reads(request: Any) -> None:
+    """结束请求体读取阶段，此后 MAX_CONTENT_LENGTH 不再检查"""
+    receive = getattr(request, 'receive', None)
+    if isinstance(receive, LimitedReceive):
+        receive.started = True
+
+
+class LimitedReceive:
+    """限制请求体大小的 receive 包装
+
+    第一次读取时路由已经匹配，此时确定上限：Content-Length 超过上限时直接拒绝，
+    不调用下层 receive，因此服务器也不会回复 100 Continue；分块传输的请求体
+    在累计长度超过上限时立即停止读取。两种情况都抛出 RequestEntityTooLarge（413）。
+    只检查视图返回或响应开始之前读取的 http.request 消息，之后 Starlette 等待断开连接时的
+    receive 调用原样传递，不会在流式响应中途抛出 413；http.disconnect 消息不计入上限。
+    """
+    __slots__ = ('receive', 'scope', 'default', 'limit', 'received', 'started')
+
+    def __init__(self, receive: Callable[[], Awaitable[Dict[str, Any]]], scope: Dict[str, Any], default: Optional[int]):
+        self.receive = receive
+        self.scope = scope
+        self.default = default
+        self.limit: Any = _UNSET
+        self.received = 0
+        self.started = False
+
+    async def __call__(self) -> Dict[str, Any]:
+        if self.started:
+            return await self.receive()
+        limit = self.limit
+        if limit is _UNSET:
+            limit = self.limit = max_content_length(self.scope, self.default)
+            if limit is not None:
+                content_length = Headers(scope=self.scope).get('content-length')
+                if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+                    raise RequestEntityTooLarge(limit)
+        message = await self.receive()
+        if limit is not None and message['type'] == 'http.request':
+            self.received += len(message.get('body', b''))
+            if self.received > limit:
+                raise RequestEntityTooLarge(limit)
+        return message
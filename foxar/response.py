@@ -1,6 +1,6 @@
 from starlette.responses import Response as StarletteResponse
 from starlette.responses import HTMLResponse, JSONResponse, PlainTextResponse, RedirectResponse
-from typing import Optional, Dict, Any, Union
+from typing import Optional, Dict, Any, Union, Tuple
 
 class Response(StarletteResponse):
     def __init__(
@@ -97,6 +97,86 @@ class Response(StarletteResponse):
             path=path,
             domain=domain
         )
+    
+    def get_etag(self) -> Tuple[Optional[str], bool]:
+        """获取ETag，返回 (etag, 是否为弱ETag)"""
+        from .http import unquote_etag
+        return unquote_etag(self.headers.get('etag'))
+    
+    def set_etag(self, etag: str, weak: bool = False) -> None:
+        """设置ETag"""
+        from .http import quote_etag
+        self.headers['etag'] = quote_etag(etag, weak)
+    
+    def add_etag(self, overwrite: bool = False, weak: bool = False) -> None:
+        """根据响应内容添加ETag，内容哈希会被缓存"""
+        if overwrite or 'etag' not in self.headers:
+            self.set_etag(self._body_etag(), weak)
+    
+    def _body_etag(self) -> str:
+        # 只要响应体对象没有被替换，就复用已经计算过的哈希
+        cached = getattr(self, '_etag_cache', None)
+        if cached is not None and cached[0] is self.body:
+            return cached[1]
+        from .http import generate_etag
+        etag = generate_etag(bytes(self.body))
+        self._etag_cache = (self.body, etag)
+        return etag
+    
+    def make_conditional(self, request_or_environ=None) -> 'Response':
+        """根据请求的条件头部把响应转换为304或412
+        
+        request_or_environ 可以是Starlette请求、ASGI scope，默认使用当前请求。
+        """
+        if self.status_code == 200 and 'etag' not in self.headers:
+            self.add_etag()
+        if _apply_conditional(self, request_or_environ) is not None:
+            self.body = b''
+        return self
+
+
+def _conditional_source(request_or_environ=None):
+    """获取条件请求判断所需的请求头和请求方法"""
+    from starlette.datastructures import Headers
+    from .request import RequestProxy, request
+    if request_or_environ is None:
+        request_or_environ = request
+    if isinstance(request_or_environ, RequestProxy):
+        request_or_environ = request_or_environ.request
+        if request_or_environ is None:
+            return None, None
+    
+    if isinstance(request_or_environ, dict):
+        scope = request_or_environ
+    else:
+        scope = request_or_environ.scope
+    return Headers(scope=scope), scope.get('method', 'GET').upper()
+
+
+def _apply_conditional(response, request_or_environ=None) -> Optional[int]:
+    """对响应应用条件请求判断，返回新的状态码（未改变则返回None）"""
+    if not 200 <= response.status_code < 300:
+        return None
+    headers, method = _conditional_source(request_or_environ)
+    if headers is None:
+        return None
+    
+    from .http import is_resource_modified, is_precondition_failed, remove_entity_headers
+    etag = response.headers.get('etag')
+    last_modified = response.headers.get('last-modified')
+    
+    if is_precondition_failed(headers, etag, last_modified):
+        status = 412
+    elif method in ('GET', 'HEAD') and not is_resource_modified(headers, etag, last_modified):
+        status = 304
+    else:
+        return None
+    
+    response.status_code = status
+    remove_entity_headers(response.headers)
+    if status == 412:
+        response.headers['content-length'] = '0'
+    return status
 
 class JSONResponse(Response):
     def __init__(
@@ -0,0 +1,198 @@
+import inspect
+import re
+import uuid
+from typing import Any, Callable, Collection, Dict, Iterator, List, NamedTuple, Optional
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response as StarletteResponse
+from starlette.routing import Route
+from .request import request_context
+
+# 路径参数没有指定转换器时，按视图参数的类型注解选择
+_ANNOTATION_CONVERTORS = {
+    int: 'int',
+    float: 'float',
+    uuid.UUID: 'uuid',
+    'int': 'int',
+    'float': 'float',
+}
+_PARAM_RE = re.compile(r'{([a-zA-Z_][a-zA-Z0-9_]*)}')
+# OpenAPI 中路径参数的类型
+_CONVERTOR_SCHEMAS = {
+    'int': {'type': 'integer'},
+    'float': {'type': 'number'},
+    'uuid': {'type': 'string', 'format': 'uuid'},
+}
+
+
+def _typed_path(path: str, view: Callable) -> str:
+    """为没有转换器的路径参数补上类型注解对应的转换器，例如 {id} -> {id:int}"""
+    try:
+        parameters = inspect.signature(view).parameters
+    except (TypeError, ValueError):
+        return path
+
+    def replace(match: 're.Match[str]') -> str:
+        name = match.group(1)
+        param = parameters.get(name)
+        convertor = _ANNOTATION_CONVERTORS.get(param.annotation) if param is not None else None
+        return f'{{{name}:{convertor}}}' if convertor else match.group(0)
+
+    return _PARAM_RE.sub(replace, path)
+
+
+def _to_response(rv: Any) -> StarletteResponse:
+    """把视图返回值转换为响应，与 FastAPI 路由的默认序列化结果一致"""
+    if isinstance(rv, StarletteResponse):
+        return rv
+    try:
+        return JSONResponse(rv)
+    except TypeError:
+        # datetime、Pydantic 模型等类型交给 FastAPI 的编码器
+        from fastapi.encoders import jsonable_encoder
+        return JSONResponse(jsonable_encoder(rv))
+
+
+class FlaskRoute(Route):
+    """轻量的Flask风格路由
+
+    直接匹配路径并以路径参数调用视图，不创建 FastAPI 的 Dependant、Pydantic
+    模型，也不做响应校验。视图只接收路径参数（与 Flask 相同），查询参数和请求体
+    通过 request 读取；返回值按 FastAPI 路由的默认方式序列化为JSON。
+    include_in_schema 为 True 时以简化的形式出现在 OpenAPI 中。
+    """
+    def __init__(
+        self,
+        path: str,
+        view: Callable,
+        *,
+        methods: Optional[Collection[str]] = None,
+        name: Optional[str] = None,
+        include_in_schema: bool = False,
+        max_content_length: Optional[int] = None,
+        tags: Optional[List[str]] = None,
+        summary: Optional[str] = None,
+    ):
+        self.view = view
+        self.tags = list(tags or [])
+        self.summary = summary
+        super().__init__(
+            _typed_path(path, view),
+            endpoint=self._make_handler(view, max_content_length),
+            methods=list(methods) if methods is not None else None,
+            name=name or getattr(view, '__name__', None),
+            include_in_schema=include_in_schema,
+        )
+        # 较早的 FastAPI 在 include_router 时用处理函数重建普通 Route，通过它找回 FlaskRoute
+        self.endpoint.flask_route = self
+
+    @staticmethod
+    def _make_handler(view: Callable, max_content_length: Optional[int]) -> Callable:
+        # 处理函数只依赖请求对象，蓝图被 include_router 重建为普通 Route 后行为不变
+        async def handler(req: Request) -> StarletteResponse:
+            from .app import current_app
+            app = current_app._get_current_object()
+            async with request_context(req):
+                rv = await app._run_endpoint(view, **req.path_params)
+            return _to_response(rv)
+
+        handler.__name__ = getattr(view, '__name__', handler.__name__)
+        handler.__doc__ = view.__doc__
+        handler.__wrapped__ = view
+        handler.max_content_length = max_content_length
+        return handler
+
+    def openapi_operations(self, methods: Collection[str]) -> Dict[str, Dict[str, Any]]:
+        """返回路由在 OpenAPI 中的操作，键为小写的HTTP方法"""
+        parameters = [
+            {
+                'name': name,
+                'in': 'path',
+                'required': True,
+                'schema': dict(_CONVERTOR_SCHEMAS.get(_convertor_name(convertor), {'type': 'string'})),
+            }
+            for name, convertor in self.param_convertors.items()
+        ]
+        doc = inspect.getdoc(self.view) or ''
+        operations = {}
+        for method in sorted(methods):
+            if method == 'HEAD':
+                continue
+            operation: Dict[str, Any] = {
+                'summary': self.summary or self.name.replace('_', ' ').title(),
+                'operationId': f'{self.name}_{method.lower()}',
+                'responses': {'200': {'description': 'Successful Response'}},
+            }
+            if doc:
+                operation['description'] = doc
+            if self.tags:
+                operation['tags'] = list(self.tags)
+            if parameters:
+                operation['parameters'] = parameters
+            operations[method.lower()] = operation
+        return operations
+
+
+class RouteInfo(NamedTuple):
+    """路由表中的一个路由，path_format 等为 include_router 展开后的值"""
+    original_route: Any
+    path_format: str
+    methods: Optional[Collection[str]]
+    name: Optional[str]
+    include_in_schema: bool
+
+
+def iter_routes(routes: List[Any]) -> Iterator[RouteInfo]:
+    """遍历路由表，展开 include_router 包含的路由
+
+    新版 FastAPI 把包含的路由器保留在路由表中，由 iter_route_contexts 展开；
+    较早的版本没有这个函数，include_router 直接把路由复制到路由表中。
+    """
+    try:
+        from fastapi.routing import iter_route_contexts
+    except ImportError:
+        for route in routes:
+            original = getattr(getattr(route, 'endpoint', None), 'flask_route', route)
+            yield RouteInfo(
+                original,
+                getattr(route, 'path_format', None) or getattr(route, 'path', ''),
+                getattr(route, 'methods', None),
+                getattr(route, 'name', None),
+                getattr(route, 'include_in_schema', False),
+            )
+        return
+    for route_context in iter_route_contexts(routes):
+        yield RouteInfo(
+            route_context.original_route,
+            route_context.path_format or '',
+            route_context.methods,
+            route_context.name,
+            getattr(route_context, 'include_in_schema', False),
+        )
+
+
+def _convertor_name(convertor: Any) -> str:
+    from starlette.convertors import CONVERTOR_TYPES
+    for name, value in CONVERTOR_TYPES.items():
+        if value is convertor:
+            return name
+    return 'str'
+
+
+def add_flask_route(router: Any, route: FlaskRoute) -> None:
+    """把 FlaskRoute 加入路由器"""
+    router.routes.append(route)
+    # FastAPI 按版本号缓存 include_router 展开的路由和 OpenAPI
+    mark_changed = getattr(router, '_mark_routes_changed', None)
+    if mark_changed is not None:
+        mark_changed()
+
+
+def add_openapi_operations(schema: Dict[str, Any], routes: List[Any]) -> Dict[str, Any]:
+    """把 include_in_schema 为 True 的 FlaskRoute 加入 FastAPI 生成的 OpenAPI"""
+    for info in iter_routes(routes):
+        route = info.original_route
+        if not isinstance(route, FlaskRoute) or not info.include_in_schema:
+            continue
+        path_item = schema.setdefault('paths', {}).setdefault(info.path_format, {})
+        path_item.update(route.openapi_operations(info.methods or ()))
+    return schema
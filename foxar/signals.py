@@ -1,9 +1,12 @@
-from typing import List, Callable, Any
+import inspect
+from typing import List, Callable, Any, Dict
 
 class Signal:
     """信号类"""
     def __init__(self):
         self.receivers: List[Callable] = []
+        # 接收器 -> 是否接受任意关键字参数及其参数名，用于 send_optional
+        self._signatures: Dict[Callable, Any] = {}
     
     def connect(self, receiver: Callable) -> Callable:
         """连接信号接收器"""
@@ -15,6 +18,7 @@ class Signal:
         """断开信号接收器"""
         if receiver in self.receivers:
             self.receivers.remove(receiver)
+        self._signatures.pop(receiver, None)
     
     def send(self, *args, **kwargs) -> List[Any]:
         """发送信号"""
@@ -27,6 +31,43 @@ class Signal:
                 # 忽略接收器中的异常
                 pass
         return results
+    
+    def _accepted(self, receiver: Callable) -> Any:
+        """接收器接受的关键字参数名，接受 **kwargs 时返回 None"""
+        try:
+            return self._signatures[receiver]
+        except KeyError:
+            pass
+        try:
+            parameters = inspect.signature(receiver).parameters.values()
+        except (TypeError, ValueError):
+            accepted = None
+        else:
+            if any(p.kind is p.VAR_KEYWORD for p in parameters):
+                accepted = None
+            else:
+                accepted = frozenset(p.name for p in parameters if p.kind in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY))
+        self._signatures[receiver] = accepted
+        return accepted
+    
+    def send_optional(self, *args, optional: Dict[str, Any], **kwargs) -> List[Any]:
+        """发送信号，optional 中的参数只传给声明了该参数或 **kwargs 的接收器
+        
+        用于给已有信号增加参数而不破坏旧签名的接收器。
+        """
+        results = []
+        for receiver in self.receivers:
+            accepted = self._accepted(receiver)
+            if accepted is None:
+                extra = optional
+            else:
+                extra = {name: value for name, value in optional.items() if name in accepted}
+            try:
+                results.append(receiver(*args, **kwargs, **extra))
+            except Exception:
+                # 忽略接收器中的异常
+                pass
+        return results
 
 # 定义常用信号
 # 请求开始信号
@@ -38,7 +79,7 @@ request_finished = Signal()
 # 请求异常信号
 request_exception = Signal()
 
-# 模板渲染开始信号
+# 模板渲染完成信号，duration 只传给接受该参数或 **kwargs 的接收器
 template_rendered = Signal()
 
 # 应用上下文推送信号
@@ -59,6 +100,9 @@ teardown_request = Signal()
 # 应用上下文拆卸信号
 teardown_appcontext = Signal()
 
+# 请求各阶段耗时信号，发送 timings（阶段 -> 秒），有接收器时才计时
+request_timed = Signal()
+
 # 提供与 Flask 命名空间兼容的信号
 class _Namespace:
     """命名空间类"""
@@ -95,6 +139,7 @@ __all__ = [
     'before_render_template',
     'teardown_request',
     'teardown_appcontext',
+    'request_timed',
     'flask',
     'signals_available'
 ]
\ No newline at end of file
@@ -0,0 +1,452 @@
+import hashlib
+import json
+import mimetypes
+import os
+import stat
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import PlainTextResponse
+from starlette.types import Receive, Scope, Send
+from .cache import LRUCache
+from .http import accepted_encodings, file_etag, http_date, is_resource_modified, quote_etag
+
+# 预压缩文件的后缀，按优先级排列
+PRECOMPRESSED_SUFFIXES = (('br', '.br'), ('gzip', '.gz'))
+
+# 带内容哈希的URL永远不会变化，可以长期缓存
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# 默认的静态文件清单文件名
+MANIFEST_FILENAME = 'foxar-manifest.json'
+
+# 本身已经压缩、不值得再压缩的文件类型
+_INCOMPRESSIBLE_EXTENSIONS = frozenset([
+    '.br', '.gz', '.zip', '.7z', '.rar', '.bz2', '.xz', '.zst',
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.avif', '.ico',
+    '.woff', '.woff2', '.mp3', '.mp4', '.webm', '.ogg', '.pdf',
+])
+
+
+def _route_path(scope: Scope) -> str:
+    """获取相对于挂载点的路径"""
+    path = scope["path"]
+    root_path = scope.get("root_path", "")
+    if not root_path or not path.startswith(root_path):
+        return path
+    if path == root_path:
+        return ""
+    if path[len(root_path)] == "/":
+        return path[len(root_path):]
+    return path
+
+
+class _Asset:
+    """解析后的静态文件及其可用的预压缩版本，variants 为 (编码, 路径, stat) 元组"""
+    __slots__ = ('path', 'media_type', 'stat', 'variants', 'checked')
+
+    def __init__(
+        self,
+        path: str,
+        media_type: str,
+        stat_result: os.stat_result,
+        variants: Tuple[Tuple[str, str, os.stat_result], ...],
+        checked: float,
+    ):
+        self.path = path
+        self.media_type = media_type
+        self.stat = stat_result
+        self.variants = variants
+        self.checked = checked
+
+
+class _CacheEntry:
+    """内存中的热文件"""
+    __slots__ = ('key', 'body', 'etag', 'last_modified')
+
+    def __init__(self, key, body: bytes, etag: str, last_modified: str):
+        self.key = key
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class StaticFiles:
+    """Foxar静态文件服务
+
+    - 客户端接受时优先发送 .br / .gz 预压缩文件，并设置 Vary: Accept-Encoding
+    - 小的热文件按字节预算缓存在内存中，通过 mtime 重新验证
+    - 支持 ETag / Last-Modified 条件请求，大文件支持 Range 和零拷贝
+    """
+    def __init__(self, directory: str, check_dir: bool = True, app: Any = None, follow_symlink: bool = False):
+        self.directory = os.path.abspath(directory)
+        self.app = app
+        # 与 Starlette 一致，默认不发送通过符号链接指向静态目录之外的文件
+        self.follow_symlink = follow_symlink
+        self._real_directory = os.path.realpath(self.directory)
+        if check_dir and not os.path.isdir(self.directory):
+            raise RuntimeError(f"Directory '{directory}' does not exist")
+        self._assets: Dict[str, _Asset] = {}
+        self._cache: Optional[LRUCache] = None
+        self._manifest: Optional[Dict[str, str]] = None
+        self._hashed: Dict[str, str] = {}
+
+    @property
+    def config(self):
+        if self.app is not None:
+            return self.app.config
+        from .utils import Config
+        return Config()
+
+    @property
+    def cache(self) -> LRUCache:
+        """热文件缓存，预算由 STATIC_CACHE_MAX_BYTES 配置"""
+        if self._cache is None:
+            self._cache = LRUCache(self.config.get('STATIC_CACHE_MAX_BYTES') or 0)
+        return self._cache
+
+    def clear_cache(self) -> None:
+        """清空路径解析结果、热文件缓存和静态文件清单"""
+        self._assets.clear()
+        if self._cache is not None:
+            self._cache.clear()
+        self._manifest = None
+        self._hashed = {}
+
+    @property
+    def hashed_urls(self) -> bool:
+        return bool(self.config.get('STATIC_HASHED_URLS'))
+
+    @property
+    def manifest(self) -> Dict[str, str]:
+        """文件名到带哈希文件名的映射
+
+        配置了 STATIC_MANIFEST 时从清单文件加载，否则在首次使用时计算一次。
+        """
+        if self._manifest is None:
+            self._load_manifest()
+        return self._manifest
+
+    def _load_manifest(self) -> None:
+        manifest_path = self.config.get('STATIC_MANIFEST')
+        if manifest_path:
+            if not os.path.isabs(manifest_path):
+                manifest_path = os.path.join(self.directory, manifest_path)
+            manifest = load_manifest(manifest_path)
+        else:
+            manifest = build_manifest(self.directory)
+        self._hashed = {hashed: name for name, hashed in manifest.items()}
+        self._manifest = manifest
+
+    def startup(self) -> None:
+        """应用启动时预先加载静态文件清单"""
+        if self.hashed_urls and self._manifest is None:
+            self._load_manifest()
+
+    def url_path(self, filename: str) -> str:
+        """返回文件在静态目录下的URL路径，启用 STATIC_HASHED_URLS 时带内容哈希"""
+        filename = filename.lstrip('/')
+        if not self.hashed_urls:
+            return filename
+        return self.manifest.get(filename, filename)
+
+    def lookup_path(self, path: str) -> Optional[str]:
+        """把请求路径解析为静态目录内的文件路径，越界时返回None"""
+        path = os.path.normpath(path.lstrip('/'))
+        if path == os.curdir or os.path.isabs(path) or path == os.pardir or path.startswith(os.pardir + os.sep):
+            return None
+        full_path = os.path.join(self.directory, path)
+        if not self._contains(full_path):
+            return None
+        return full_path
+
+    def _contains(self, full_path: str) -> bool:
+        """符号链接解析后是否仍在静态目录内"""
+        if self.follow_symlink:
+            return True
+        real_path = os.path.realpath(full_path)
+        return os.path.commonpath([real_path, self._real_directory]) == self._real_directory
+
+    def _resolve(self, route_path: str) -> Optional[_Asset]:
+        """解析静态文件并 stat 源文件和预压缩文件，会阻塞，在线程中调用"""
+        full_path = self.lookup_path(route_path)
+        if full_path is None:
+            return None
+        try:
+            st = os.stat(full_path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(st.st_mode):
+            return None
+
+        # 每次解析都检查预压缩文件本身，之后新生成的 .br / .gz 也能被发现
+        variants = []
+        if self.config.get('STATIC_PRECOMPRESSED', True):
+            for encoding, suffix in PRECOMPRESSED_SUFFIXES:
+                variant_path = full_path + suffix
+                try:
+                    variant_stat = os.stat(variant_path)
+                except OSError:
+                    continue
+                # 比源文件旧的预压缩文件已经过期
+                if (stat.S_ISREG(variant_stat.st_mode) and variant_stat.st_mtime_ns >= st.st_mtime_ns
+                        and self._contains(variant_path)):
+                    variants.append((encoding, variant_path, variant_stat))
+
+        media_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+        return _Asset(full_path, media_type, st, tuple(variants), time.monotonic())
+
+    def _max_age(self, path: str) -> Optional[int]:
+        if self.app is not None:
+            return self.app.get_send_file_max_age(path)
+        return self.config.get('SEND_FILE_MAX_AGE_DEFAULT')
+
+    def _base_headers(self, asset: _Asset, encoding: Optional[str], immutable: bool) -> list:
+        headers = []
+        media_type = asset.media_type
+        if media_type.startswith('text/') and 'charset' not in media_type:
+            media_type += '; charset=utf-8'
+        headers.append((b'content-type', media_type.encode('latin-1')))
+        if encoding is not None:
+            headers.append((b'content-encoding', encoding.encode('latin-1')))
+        if asset.variants:
+            headers.append((b'vary', b'Accept-Encoding'))
+        cache_control = IMMUTABLE_CACHE_CONTROL if immutable else self.cache_control(asset.path)
+        if cache_control:
+            headers.append((b'cache-control', cache_control.encode('latin-1')))
+        return headers
+
+    def cache_control(self, path: str) -> Optional[str]:
+        """返回 Cache-Control 头部的值"""
+        max_age = self._max_age(path)
+        if max_age is None:
+            return None
+        if max_age > 0:
+            return f"public, max-age={int(max_age)}"
+        return "no-cache"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        assert scope["type"] == "http"
+        method = scope.get("method", "GET").upper()
+        if method not in ("GET", "HEAD"):
+            response = PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+            await response(scope, receive, send)
+            return
+
+        route_path = _route_path(scope)
+        immutable = False
+        if self.hashed_urls:
+            # 带内容哈希的URL映射回原始文件
+            if self._manifest is None:
+                # 启动时未加载清单时在线程中计算，避免在事件循环中哈希整个静态目录
+                await anyio.to_thread.run_sync(self._load_manifest)
+            name = self._hashed.get(route_path.lstrip('/'))
+            if name is not None:
+                route_path = '/' + name
+                immutable = True
+        # 解析结果按请求路径缓存，超过 STATIC_CACHE_REVALIDATE_INTERVAL 后在线程中重新解析；
+        # 间隔内的命中只在事件循环中 stat 一次要发送的文件，文件变化或消失时才进入线程
+        config = self.config
+        interval = config.get('STATIC_CACHE_REVALIDATE_INTERVAL') or 0
+        request_headers = Headers(scope=scope)
+        asset = self._assets.get(route_path)
+        if asset is not None:
+            if interval and time.monotonic() - asset.checked < interval:
+                encoding, path, st = _select_variant(asset, request_headers)
+                try:
+                    current = os.stat(path)
+                except OSError:
+                    current = None
+                if current is None or _stat_key(current) != _stat_key(st):
+                    asset = None
+            else:
+                asset = None
+        if asset is None:
+            asset = await anyio.to_thread.run_sync(self._resolve, route_path)
+            if asset is None:
+                self._assets.pop(route_path, None)
+                await PlainTextResponse("Not Found", status_code=404)(scope, receive, send)
+                return
+            if len(self._assets) >= 10000:
+                self._assets.clear()
+            self._assets[route_path] = asset
+            encoding, path, st = _select_variant(asset, request_headers)
+
+        # 内存中的热文件通过 mtime/size/inode 重新验证
+        cache = self.cache
+        entry = cache.get(path)
+        if entry is not None and entry.key != _stat_key(st):
+            cache.pop(path)
+            entry = None
+
+        headers = self._base_headers(asset, encoding, immutable)
+
+        if entry is None:
+            etag = quote_etag(file_etag(st) + (f"-{encoding}" if encoding else ""))
+            last_modified = http_date(st.st_mtime)
+
+            max_file_size = config.get('STATIC_CACHE_MAX_FILE_SIZE') or 0
+            if st.st_size > max_file_size or 'range' in request_headers:
+                # 大文件或区间请求：直接从磁盘发送
+                from .files import FileResponse
+                response = FileResponse(path, stat_result=st, etag=etag)
+                response.raw_headers = [
+                    (k, v) for k, v in response.raw_headers if k != b'content-type'
+                ] + headers
+                response.make_conditional(scope)
+                await response(scope, receive, send)
+                return
+
+            try:
+                body = await anyio.to_thread.run_sync(_read_file, path)
+            except OSError:
+                self._assets.pop(route_path, None)
+                await PlainTextResponse("Not Found", status_code=404)(scope, receive, send)
+                return
+            entry = _CacheEntry(_stat_key(st), body, etag, last_modified)
+            cache.set(path, entry, len(body))
+
+        headers.append((b'etag', entry.etag.encode('latin-1')))
+        headers.append((b'last-modified', entry.last_modified.encode('latin-1')))
+        headers.append((b'accept-ranges', b'bytes'))
+
+        if not is_resource_modified(request_headers, entry.etag, entry.last_modified):
+            headers = [(k, v) for k, v in headers if k not in (b'content-type', b'content-encoding')]
+            await send({"type": "http.response.start", "status": 304, "headers": headers})
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        headers.append((b'content-length', str(len(entry.body)).encode('latin-1')))
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        body = b"" if method == "HEAD" else entry.body
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+
+
+def _select_variant(asset: _Asset, request_headers: Headers) -> Tuple[Optional[str], str, os.stat_result]:
+    """选择客户端可接受的预压缩版本，区间请求始终针对原始文件，返回 (编码, 路径, stat)"""
+    if asset.variants and 'range' not in request_headers:
+        accepted = accepted_encodings(request_headers.get('accept-encoding'))
+        for encoding, path, st in asset.variants:
+            if encoding in accepted:
+                return encoding, path, st
+    return None, asset.path, asset.stat
+
+
+def _stat_key(st: os.stat_result) -> Tuple[int, int, int]:
+    """判断文件是否变化的 (mtime, size, inode)"""
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _iter_files(directory: str) -> Iterable[str]:
+    for root, _, files in os.walk(directory):
+        for name in files:
+            yield os.path.join(root, name)
+
+
+def fingerprint(filename: str, digest: str) -> str:
+    """把内容哈希插入到扩展名之前：css/app.css -> css/app.<digest>.css"""
+    base, ext = os.path.splitext(filename)
+    return f"{base}.{digest}{ext}"
+
+
+def _file_digest(path: str) -> str:
+    h = hashlib.blake2b(digest_size=6)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def build_manifest(directory: str) -> Dict[str, str]:
+    """计算静态目录中每个文件的内容哈希，返回 文件名 -> 带哈希文件名 的映射"""
+    manifest = {}
+    for path in _iter_files(directory):
+        name = os.path.relpath(path, directory).replace(os.sep, '/')
+        if os.path.basename(name) == MANIFEST_FILENAME:
+            continue
+        # 预压缩文件通过原始文件的URL协商，不单独生成URL
+        base, ext = os.path.splitext(path)
+        if ext in ('.br', '.gz') and os.path.exists(base):
+            continue
+        manifest[name] = fingerprint(name, _file_digest(path))
+    return manifest
+
+
+def load_manifest(path: str) -> Dict[str, str]:
+    """加载静态文件清单"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def write_manifest(directory: str, output: Optional[str] = None) -> str:
+    """生成静态文件清单并写入文件，返回清单路径"""
+    output = output or os.path.join(directory, MANIFEST_FILENAME)
+    manifest = build_manifest(directory)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return output
+
+
+def compress_static(
+    directory: str,
+    algorithms: Iterable[str] = ('gzip', 'br'),
+    level: int = 9,
+    min_size: int = 256,
+) -> Dict[str, int]:
+    """预压缩静态目录，为每个文件生成 .gz / .br 文件
+
+    只保留比原文件小的压缩结果，已是最新的压缩文件会被跳过。
+    未安装 brotli 时跳过 br。返回各类处理结果的计数。
+    """
+    import gzip
+    import shutil
+
+    compressors = {}
+    if 'gzip' in algorithms:
+        compressors['.gz'] = lambda data: gzip.compress(data, compresslevel=level, mtime=0)
+    if 'br' in algorithms:
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+        if brotli is not None:
+            compressors['.br'] = lambda data: brotli.compress(data, quality=min(level + 2, 11))
+
+    stats = {'compressed': 0, 'skipped': 0, 'up_to_date': 0}
+    for path in _iter_files(directory):
+        ext = os.path.splitext(path)[1].lower()
+        if ext in _INCOMPRESSIBLE_EXTENSIONS:
+            continue
+        st = os.stat(path)
+        if st.st_size < min_size:
+            stats['skipped'] += 1
+            continue
+        data = None
+        for suffix, compress in compressors.items():
+            target = path + suffix
+            try:
+                if os.stat(target).st_mtime_ns >= st.st_mtime_ns:
+                    stats['up_to_date'] += 1
+                    continue
+            except OSError:
+                pass
+            if data is None:
+                data = _read_file(path)
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                stats['skipped'] += 1
+                continue
+            tmp = target + '.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(compressed)
+            # 与源文件保持相同的修改时间，便于判断是否过期
+            shutil.copystat(path, tmp)
+            os.replace(tmp, target)
+            stats['compressed'] += 1
+    return stats
@@ -0,0 +1,308 @@
+import contextvars
+import inspect
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+import jinja2
+from jinja2 import nodes
+from jinja2.ext import Extension
+from jinja2.runtime import Context
+from jinja2.utils import missing
+from markupsafe import Markup
+from .cache import LRUCache
+
+# 字节码缓存文件名格式，避免与其他应用共用目录时冲突
+BYTECODE_CACHE_PATTERN = '__foxar_jinja2_%s.cache'
+
+
+def create_jinja_environment(app: Any) -> jinja2.Environment:
+    """根据应用配置创建Jinja环境
+
+    - TEMPLATE_CACHE_DIR：编译后的字节码缓存目录，可由多个worker共享
+    - TEMPLATES_AUTO_RELOAD：是否检查模板修改时间，None 时跟随 DEBUG
+    """
+    config = app.config
+    auto_reload = config.get('TEMPLATES_AUTO_RELOAD')
+    if auto_reload is None:
+        auto_reload = bool(config.get('DEBUG'))
+
+    options: Dict[str, Any] = {
+        'loader': FoxarLoader(app),
+        'autoescape': True,
+        'auto_reload': auto_reload,
+        'cache_size': config.get('TEMPLATE_CACHE_SIZE', 400),
+        'extensions': [FragmentCacheExtension],
+    }
+    cache_dir = config.get('TEMPLATE_CACHE_DIR')
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        options['bytecode_cache'] = jinja2.FileSystemBytecodeCache(cache_dir, BYTECODE_CACHE_PATTERN)
+    env = jinja2.Environment(**options)
+    env.context_class = FoxarContext
+    env.lazy_context_processors = app.lazy_context_processors
+    env.fragment_cache = FragmentCache(
+        max_bytes=config.get('TEMPLATE_FRAGMENT_CACHE_MAX_BYTES') or 0,
+        backend=config.get('TEMPLATE_FRAGMENT_CACHE_BACKEND'),
+        default_ttl=config.get('TEMPLATE_FRAGMENT_CACHE_DEFAULT_TTL'),
+    )
+    return env
+
+
+class FoxarContext(Context):
+    """模板上下文，变量不存在时调用对应的延迟上下文处理器"""
+    def resolve_or_missing(self, key: str) -> Any:
+        rv = super().resolve_or_missing(key)
+        if rv is missing:
+            processor = self.environment.lazy_context_processors.get(key)
+            if processor is not None:
+                rv = self.vars[key] = processor()
+        return rv
+
+
+class FragmentCache:
+    """模板片段缓存
+
+    本地使用按字节预算淘汰的LRU；配置了共享后端时作为二级缓存。
+    后端需要提供 get(key)、set(key, value, ttl) 和 delete_prefix(prefix) 方法。
+    其他进程中的本地缓存不会收到失效通知，最长在 ttl 后过期。
+    """
+    def __init__(self, max_bytes: int, backend: Any = None, default_ttl: Optional[float] = None):
+        self.local = LRUCache(max_bytes)
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        """获取片段，不存在或已过期时返回None"""
+        item = self.local.get(key)
+        if item is not None:
+            expires, value = item
+            if expires is None or expires > time.monotonic():
+                self.hits += 1
+                return value
+            self.local.pop(key)
+        if self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                self.hits += 1
+                self._set_local(key, value, self.default_ttl)
+                return value
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None) -> None:
+        """缓存片段，ttl 为 None 时使用默认值，0 表示不过期"""
+        if ttl is None:
+            ttl = self.default_ttl
+        self._set_local(key, value, ttl)
+        if self.backend is not None:
+            self.backend.set(key, value, ttl)
+
+    def _set_local(self, key: str, value: str, ttl: Optional[float]) -> None:
+        expires = time.monotonic() + ttl if ttl else None
+        self.local.set(key, (expires, value), len(value.encode('utf-8')))
+
+    def invalidate(self, prefix: str = '') -> int:
+        """按键前缀删除片段，返回删除的本地条目数"""
+        keys = [key for key in self.local.keys() if key.startswith(prefix)]
+        for key in keys:
+            self.local.pop(key)
+        if self.backend is not None:
+            self.backend.delete_prefix(prefix)
+        return len(keys)
+
+    def clear(self) -> None:
+        """清空所有片段"""
+        self.invalidate('')
+
+    def stats(self) -> Dict[str, Any]:
+        """返回命中率等统计信息"""
+        total = self.hits + self.misses
+        stats = self.local.stats()
+        stats.update({
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        })
+        return stats
+
+
+def _fragment_key(key: Any) -> str:
+    if isinstance(key, (list, tuple)):
+        return ':'.join(str(part) for part in key)
+    return str(key)
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache key, ttl %}...{% endcache %} 片段缓存标签
+
+    key 可以是字符串或元组（以冒号连接），ttl 为秒数，省略时使用
+    TEMPLATE_FRAGMENT_CACHE_DEFAULT_TTL。
+    """
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_cache_support', args), [], [], body).set_lineno(lineno)
+
+    def _cache_support(self, key, ttl, caller):
+        cache = getattr(self.environment, 'fragment_cache', None)
+        if cache is None:
+            return caller()
+        key = _fragment_key(key)
+        value = cache.get(key)
+        if value is not None:
+            return Markup(value)
+        rv = caller()
+        if inspect.isawaitable(rv):
+            return self._store_async(cache, key, ttl, rv)
+        cache.set(key, str(rv), ttl)
+        return rv
+
+    async def _store_async(self, cache, key, ttl, rv):
+        rv = await rv
+        cache.set(key, str(rv), ttl)
+        return rv
+
+
+def _iter_blueprints(blueprints):
+    for blueprint in blueprints:
+        yield blueprint
+        yield from _iter_blueprints(blueprint.blueprints)
+
+
+class FoxarLoader(jinja2.BaseLoader):
+    """按顺序从应用和所有已注册蓝图的模板目录中查找模板
+
+    应用目录优先，其次按蓝图注册顺序。模板名解析到的目录会被记住，
+    之后的查找不再遍历所有目录。
+    """
+    def __init__(self, app: Any):
+        self.app = app
+        self._loaders: Dict[str, jinja2.FileSystemLoader] = {}
+        self._resolved: Dict[str, jinja2.FileSystemLoader] = {}
+
+    def template_folders(self) -> List[str]:
+        """返回所有模板目录"""
+        folders = []
+        if self.app.template_folder is not None:
+            folders.append(self.app.template_folder)
+        for blueprint in _iter_blueprints(self.app.blueprints):
+            if blueprint.template_folder is None:
+                continue
+            folder = os.path.join(blueprint.root_path, blueprint.template_folder)
+            if folder not in folders:
+                folders.append(folder)
+        return folders
+
+    def _iter_loaders(self):
+        for folder in self.template_folders():
+            loader = self._loaders.get(folder)
+            if loader is None:
+                loader = self._loaders[folder] = jinja2.FileSystemLoader(folder)
+            yield loader
+
+    def get_source(self, environment: jinja2.Environment, template: str):
+        loader = self._resolved.get(template)
+        if loader is not None:
+            try:
+                return loader.get_source(environment, template)
+            except jinja2.TemplateNotFound:
+                # 模板被删除，重新查找
+                del self._resolved[template]
+        for loader in self._iter_loaders():
+            try:
+                source = loader.get_source(environment, template)
+            except jinja2.TemplateNotFound:
+                continue
+            self._resolved[template] = loader
+            return source
+        raise jinja2.TemplateNotFound(template)
+
+    def list_templates(self) -> List[str]:
+        names = set()
+        for loader in self._iter_loaders():
+            names.update(loader.list_templates())
+        return sorted(names)
+
+
+def compile_templates(env: jinja2.Environment) -> Tuple[int, List[Tuple[str, str]]]:
+    """编译所有模板以预热字节码缓存，返回 (编译数量, [(模板名, 错误)])"""
+    compiled = 0
+    errors = []
+    for name in env.list_templates():
+        try:
+            env.get_template(name)
+        except (jinja2.TemplateSyntaxError, UnicodeDecodeError) as e:
+            errors.append((name, str(e)))
+            continue
+        compiled += 1
+    return compiled, errors
+
+
+def _next_batch(iterator, buffer_size: int):
+    """从模板生成器中取出至少 buffer_size 个字符，生成结束时返回None"""
+    buffer = []
+    size = 0
+    for chunk in iterator:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= buffer_size:
+            break
+    if not buffer:
+        return None
+    return ''.join(buffer)
+
+
+def generate_template(
+    template: jinja2.Template,
+    context: Dict[str, Any],
+    buffer_size: int,
+    on_finish: Optional[Callable[[float], None]] = None,
+) -> AsyncIterator[str]:
+    """流式渲染模板，按 buffer_size 缓冲后输出
+
+    在调用时捕获请求上下文，模板在生成过程中仍可访问 request、g 等对象。
+    同步环境在线程池中逐批生成，避免阻塞事件循环。
+    生成结束后以耗时（秒）调用 on_finish。
+    """
+    if template.environment.is_async:
+        from .utils import stream_with_context
+        return _buffer_async(stream_with_context(template.generate_async(context)), buffer_size, on_finish)
+    return _generate_sync(template.generate(context), buffer_size, contextvars.copy_context(), on_finish)
+
+
+async def _generate_sync(iterator, buffer_size: int, ctx: contextvars.Context, on_finish) -> AsyncIterator[str]:
+    from starlette.concurrency import run_in_threadpool
+    start = time.perf_counter()
+    while True:
+        chunk = await run_in_threadpool(ctx.run, _next_batch, iterator, buffer_size)
+        if chunk is None:
+            break
+        yield chunk
+    if on_finish is not None:
+        on_finish(time.perf_counter() - start)
+
+
+async def _buffer_async(aiterator, buffer_size: int, on_finish) -> AsyncIterator[str]:
+    start = time.perf_counter()
+    buffer = []
+    size = 0
+    async for chunk in aiterator:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= buffer_size:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+    if on_finish is not None:
+        on_finish(time.perf_counter() - start)
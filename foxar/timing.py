@@ -0,0 +1,37 @@
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+class RequestTimings:
+    """一个请求各阶段的耗时（秒），使用单调时钟 time.perf_counter 计时
+
+    阶段按发生顺序为 before_request、body（同步视图预读请求体）、wait（线程池等待）、
+    view、serialize、after_request、session 和 total（到响应头发送为止）。
+    只有启用 SERVER_TIMING 或 request_timed 信号有接收器时才会创建，
+    未启用时请求上下文中的 timings 为None，各处只做一次判断。
+    """
+    __slots__ = ('start', 'stages', 'view_end')
+
+    def __init__(self) -> None:
+        self.start = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        # 视图返回的时间，到响应头发送之间为序列化耗时
+        self.view_end: Optional[float] = None
+
+    def record(self, name: str, since: float) -> float:
+        """把 since 到现在的耗时累加到阶段 name，返回当前时间"""
+        now = time.perf_counter()
+        self.stages[name] = self.stages.get(name, 0.0) + now - since
+        return now
+
+    def run_view(self, submitted: float, view: Callable, *args: Any, **kwargs: Any) -> Any:
+        """在工作线程中调用同步视图，分别记录线程池等待和视图耗时"""
+        start = self.record('wait', submitted)
+        try:
+            return view(*args, **kwargs)
+        finally:
+            self.view_end = self.record('view', start)
+
+    def header_value(self) -> str:
+        """Server-Timing 头的值，耗时单位为毫秒"""
+        return ', '.join(f'{name};dur={seconds * 1000:.3f}' for name, seconds in self.stages.items())
@@ -1,5 +1,5 @@
 from typing import Any, Dict, List, Optional, Callable
-from urllib.parse import urlencode
+from urllib.parse import quote, urlencode
 
 class Config(dict):
     """兼容Flask的配置类"""
@@ -16,18 +16,55 @@ class Config(dict):
         self.setdefault('TESTING', False)
         self.setdefault('SECRET_KEY', None)
         self.setdefault('PERMANENT_SESSION_LIFETIME', 31536000)  # 1年
+        self.setdefault('SESSION_COOKIE_NAME', 'session')  # 保存签名会话数据的cookie
         self.setdefault('USE_X_SENDFILE', False)
+        self.setdefault('X_SENDFILE_HEADER', 'X-Sendfile')  # nginx 使用 'X-Accel-Redirect'
+        self.setdefault('X_SENDFILE_PATH_MAP', {})  # 文件系统路径前缀 -> 内部路径前缀
         self.setdefault('SERVER_NAME', None)
         self.setdefault('APPLICATION_ROOT', '/')
         self.setdefault('PREFERRED_URL_SCHEME', 'http')
         self.setdefault('MAX_CONTENT_LENGTH', None)
+        self.setdefault('MAX_FORM_MEMORY_SIZE', 500 * 1000)  # urlencoded 表单或单个 multipart 字段的大小上限
+        self.setdefault('MAX_FORM_PARTS', 1000)  # 表单字段和文件的数量上限
+        self.setdefault('REQUEST_PREFETCH_MAX_SIZE', 1024 * 1024)  # 同步视图调用前预读的请求体大小上限，None 表示不限
+        self.setdefault('REQUEST_SPOOL_MAX_MEMORY', 512 * 1024)  # input_stream 超过该字节数后转存到磁盘
+        self.setdefault('UPLOAD_SPOOL_MAX_MEMORY', 1024 * 1024)  # 上传文件超过该字节数后转存到磁盘
+        self.setdefault('UPLOAD_TEMP_DIR', None)  # 上传临时文件目录，与保存目录在同一文件系统时 save() 不复制数据
+        self.setdefault('JSON_STREAM_MAX_ITEM_SIZE', 1024 * 1024)  # request.iter_json 单个元素的最大字符数
         self.setdefault('SEND_FILE_MAX_AGE_DEFAULT', 43200)  # 12小时
+        self.setdefault('SEND_FILE_CHUNK_SIZE', 64 * 1024)  # 流式发送文件的块大小
+        self.setdefault('STATIC_PRECOMPRESSED', True)  # 优先发送 .br / .gz 预压缩文件
+        self.setdefault('STATIC_CACHE_MAX_BYTES', 32 * 1024 * 1024)  # 静态文件内存缓存的字节预算
+        self.setdefault('STATIC_CACHE_MAX_FILE_SIZE', 256 * 1024)  # 超过该大小的文件不缓存
+        self.setdefault('STATIC_CACHE_REVALIDATE_INTERVAL', 1)  # 重新解析静态文件和预压缩版本的间隔（秒），期间只 stat 发送的文件；0 表示每次
+        self.setdefault('STATIC_HASHED_URLS', False)  # url_for('static') 生成带内容哈希的URL
+        self.setdefault('STATIC_MANIFEST', None)  # 预先生成的静态文件清单，相对路径基于静态目录
+        self.setdefault('COMPRESS_ENABLED', False)  # 压缩动态响应
+        self.setdefault('COMPRESS_ALGORITHM', ['br', 'gzip'])  # 按优先级排列，br 需要安装 brotli
+        self.setdefault('COMPRESS_LEVEL', 6)  # gzip 压缩级别
+        self.setdefault('COMPRESS_BR_LEVEL', 4)  # brotli 压缩级别
+        self.setdefault('COMPRESS_MIN_SIZE', 500)  # 小于该字节数的响应不压缩
+        self.setdefault('COMPRESS_MIMETYPES', [
+            'text/html', 'text/css', 'text/plain', 'text/xml', 'text/javascript',
+            'application/json', 'application/javascript', 'application/xml',
+            'application/x-ndjson', 'text/event-stream', 'image/svg+xml',
+        ])
+        self.setdefault('COMPRESS_CACHE_MAX_BYTES', 0)  # 按ETag缓存压缩结果的字节预算，0 表示不缓存
         self.setdefault('TRAP_BAD_REQUEST_ERRORS', None)
         self.setdefault('TRAP_HTTP_EXCEPTIONS', False)
         self.setdefault('EXPLAIN_TEMPLATE_LOADING', False)
         self.setdefault('PRESERVE_CONTEXT_ON_EXCEPTION', None)
-        self.setdefault('TEMPLATES_AUTO_RELOAD', None)
+        self.setdefault('TEMPLATES_AUTO_RELOAD', None)  # None 时跟随 DEBUG
+        self.setdefault('TEMPLATE_CACHE_DIR', None)  # Jinja字节码缓存目录，多个worker可共享
+        self.setdefault('TEMPLATE_CACHE_SIZE', 400)  # 内存中编译后模板的数量上限
+        self.setdefault('TEMPLATE_STREAM_BUFFER_SIZE', 8192)  # 流式渲染模板时每次发送的最少字符数
+        self.setdefault('TEMPLATE_FRAGMENT_CACHE_MAX_BYTES', 16 * 1024 * 1024)  # {% cache %} 片段缓存的字节预算
+        self.setdefault('TEMPLATE_FRAGMENT_CACHE_DEFAULT_TTL', None)  # 片段默认过期时间（秒），None 表示不过期
+        self.setdefault('TEMPLATE_FRAGMENT_CACHE_BACKEND', None)  # 多进程共享的二级缓存后端
+        self.setdefault('OPENAPI_CACHE_DIR', None)  # OpenAPI 文档缓存目录，按路由表哈希命名，多个worker可共享
+        self.setdefault('OPENAPI_INCLUDE_FLASK_ROUTES', True)  # route()/add_url_rule() 和蓝图的路由默认出现在 OpenAPI 中
         self.setdefault('MAX_COOKIE_SIZE', 4093)
+        self.setdefault('SERVER_TIMING', False)  # 记录各阶段耗时并添加 Server-Timing 响应头
     
     def from_object(self, obj: Any) -> None:
         """从对象加载配置"""
@@ -164,6 +201,19 @@ def register_route(endpoint: str, path: str) -> None:
     """注册路由到全局映射"""
     _route_map[endpoint] = path
 
+# Flask url_for 的控制参数，不作为查询参数
+_URL_CONTROL_KEYS = ('_external', '_scheme', '_anchor', '_method')
+
+def _static_query(path: str, values: Dict[str, Any]) -> str:
+    """给静态文件路径加上查询参数，去掉 _external 等控制参数，_anchor 作为片段"""
+    anchor = values.get('_anchor')
+    query = {key: value for key, value in values.items() if key not in _URL_CONTROL_KEYS}
+    if query:
+        path += "?" + urlencode(query)
+    if anchor:
+        path += "#" + quote(str(anchor))
+    return path
+
 def url_for(
     endpoint: str,
     **values: Any
@@ -173,6 +223,12 @@ def url_for(
     if endpoint == 'static':
         filename = values.get('filename')
         if filename:
+            # 在应用上下文中由应用生成（支持自定义路径和内容哈希）
+            from .app import _current_app
+            app = _current_app.get()
+            if app is not None:
+                del values['filename']
+                return app.static_url_path_for(filename, **values)
             static_url = "/static"
             # 构建静态文件路径
             if not filename.startswith("/"):
@@ -181,10 +237,7 @@ def url_for(
             
             # 添加查询参数
             del values['filename']
-            if values:
-                path += "?" + urlencode(values)
-            
-            return path
+            return _static_query(path, values)
     
     # 从路由映射中获取路径
     if endpoint in _route_map:
@@ -239,27 +292,25 @@ def get_flashed_messages(with_categories: bool = False, category_filter: Optiona
     return [msg["message"] for msg in messages]
 
 # 添加session支持
+import base64
+import hashlib
+import hmac
 import secrets
 import json
+import time
 from typing import Dict, Any, Optional
-from contextvars import ContextVar
 from starlette.requests import Request
 from starlette.responses import Response
-
-# 创建上下文变量来存储当前会话
-_session_ctx_var: ContextVar[Optional[Dict[str, Any]]] = ContextVar('session', default=None)
-# 创建上下文变量来存储会话ID
-_session_id_ctx_var: ContextVar[Optional[str]] = ContextVar('session_id', default=None)
+from .request import _current_context
 
 class Session:
-    """Flask风格的会话管理"""
-    def __init__(self):
-        self._data = _session_ctx_var.get()
-        if self._data is None:
-            self._data = {}
-            _session_ctx_var.set(self._data)
+    """Flask风格的会话管理，每个请求一个实例"""
+    __slots__ = ('_data', '_permanent', '_modified')
+    
+    def __init__(self, data: Optional[Dict[str, Any]] = None, permanent: bool = False):
+        self._data = {} if data is None else data
         # 初始化会话属性
-        self._permanent = False
+        self._permanent = permanent
         self._modified = False
     
     @property
@@ -283,7 +334,10 @@ class Session:
     
     @permanent.setter
     def permanent(self, value: bool) -> None:
-        self._permanent = value
+        # permanent 随会话数据保存在cookie中，改变时需要重新写入
+        if bool(value) != self._permanent:
+            self._modified = True
+        self._permanent = bool(value)
     
     @property
     def modified(self) -> bool:
@@ -314,10 +368,9 @@ class Session:
     
     def pop(self, key: str, default: Any = None) -> Any:
         """移除并返回会话值"""
-        value = self._data.pop(key, default)
         if key in self._data:
             self._modified = True
-        return value
+        return self._data.pop(key, default)
     
     def clear(self) -> None:
         """清空会话"""
@@ -347,29 +400,123 @@ class Session:
             self._modified = True
         return self._data.setdefault(key, default)
 
-# 创建全局会话对象实例
-_session_instance = Session()
+def _session_signature(secret_key: str, payload: str) -> str:
+    return hmac.new(secret_key.encode('utf-8'), payload.encode('ascii'), hashlib.sha256).hexdigest()
+
+def dump_session_cookie(secret_key: str, data: Dict[str, Any], permanent: bool) -> str:
+    """把会话数据序列化为带签名和时间戳的cookie值，数据需要能用JSON表示"""
+    payload = json.dumps({'d': data, 'p': permanent, 't': int(time.time())}, separators=(',', ':'))
+    payload = base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+    return f'{payload}.{_session_signature(secret_key, payload)}'
+
+def load_session_cookie(secret_key: str, value: str, max_age: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """验证签名并解析会话cookie，签名不符、已过期或格式错误时返回None"""
+    payload, _, signature = value.rpartition('.')
+    if not payload or not hmac.compare_digest(signature, _session_signature(secret_key, payload)):
+        return None
+    try:
+        content = json.loads(base64.urlsafe_b64decode(payload.encode('ascii')))
+        data, permanent, timestamp = content['d'], content['p'], content['t']
+    except (ValueError, TypeError, KeyError):
+        return None
+    if not isinstance(data, dict):
+        return None
+    if max_age is None:
+        max_age = _session_max_age(permanent)
+    if time.time() - timestamp > max_age:
+        return None
+    return {'data': data, 'permanent': bool(permanent)}
+
+def _session_config() -> Dict[str, Any]:
+    try:
+        from .app import current_app
+        return current_app.config
+    except RuntimeError:
+        return {}
+
+def _session_max_age(permanent: bool) -> int:
+    if permanent:
+        return _session_config().get('PERMANENT_SESSION_LIFETIME', 31536000)
+    # 临时会话，使用默认过期时间
+    return 3600
+
+def _load_session(request: Optional[Request]) -> Session:
+    """从签名cookie中恢复会话，没有 SECRET_KEY 时会话不在请求间保存"""
+    if request is not None:
+        config = _session_config()
+        secret_key = config.get('SECRET_KEY')
+        value = request.cookies.get(config.get('SESSION_COOKIE_NAME') or 'session')
+        if secret_key and value:
+            loaded = load_session_cookie(secret_key, value)
+            if loaded is not None:
+                return Session(loaded['data'], loaded['permanent'])
+    return Session()
 
-def session() -> Session:
-    """获取session对象"""
-    return _session_instance
+class _SessionProxy:
+    """当前请求的会话代理
+
+    session['key'] 等操作直接转发到当前请求的 Session；session() 和
+    session._get_current_object() 返回 Session 本身，循环中使用时省去上下文查找。
+    """
+    __slots__ = ()
+    
+    def _get_current_object(self) -> Session:
+        ctx = _current_context()
+        if ctx.session is None:
+            # 第一次访问时从签名cookie中恢复之前请求保存的数据
+            ctx.session = _load_session(ctx.request)
+        return ctx.session
+    
+    def __call__(self) -> Session:
+        """获取session对象"""
+        return self._get_current_object()
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._get_current_object(), name)
+    
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._get_current_object(), name, value)
+    
+    def __getitem__(self, key: str) -> Any:
+        return self._get_current_object()[key]
+    
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._get_current_object()[key] = value
+    
+    def __delitem__(self, key: str) -> None:
+        del self._get_current_object()[key]
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._get_current_object()
+    
+    def __iter__(self):
+        return iter(self._get_current_object().data)
+    
+    def __len__(self) -> int:
+        return len(self._get_current_object().data)
+    
+    def __repr__(self) -> str:
+        return f"<session {self._get_current_object().data!r}>"
+
+# 创建全局会话代理实例
+session = _SessionProxy()
 
 def get_session_id(request: Request) -> Optional[str]:
     """从请求中获取会话ID"""
     return request.cookies.get('session_id')
 
-def set_session_cookie(response: Response, session_id: str, data: Dict[str, Any]) -> None:
-    """设置会话cookie"""
+def set_session_cookie(response: Response, session_id: str, data: Optional[Dict[str, Any]]) -> None:
+    """设置会话cookie
+    
+    会话数据在本次请求中被修改时写入签名cookie（需要 SECRET_KEY），清空后删除该cookie；
+    data 为None表示本次请求没有访问会话，会话cookie保持不变。
+    """
     # 获取会话对象，检查是否为永久会话
-    session_obj = session()
+    session_obj = _current_context().session
+    permanent = session_obj is not None and session_obj.permanent
     
     # 根据会话是否永久设置过期时间
-    if session_obj.permanent:
-        # 永久会话，使用配置中的过期时间
-        max_age = session_obj.config.get('PERMANENT_SESSION_LIFETIME', 31536000)  # 默认1年
-    else:
-        # 临时会话，使用默认过期时间
-        max_age = 3600  # 1小时
+    max_age = _session_max_age(permanent)
     
     response.set_cookie(
         key='session_id',
@@ -380,6 +527,27 @@ def set_session_cookie(response: Response, session_id: str, data: Dict[str, Any]
         secure=False,  # 在生产环境中应该设置为True
         samesite='lax'
     )
+    
+    if data is None or session_obj is None or not session_obj.modified:
+        return
+    config = _session_config()
+    cookie_name = config.get('SESSION_COOKIE_NAME') or 'session'
+    if not data:
+        response.delete_cookie(cookie_name, path='/')
+        return
+    secret_key = config.get('SECRET_KEY')
+    if not secret_key:
+        # 没有密钥无法签名，会话数据不保存
+        return
+    response.set_cookie(
+        key=cookie_name,
+        value=dump_session_cookie(secret_key, data, permanent),
+        max_age=max_age,
+        path='/',
+        httponly=True,
+        secure=False,  # 在生产环境中应该设置为True
+        samesite='lax'
+    )
 
 def generate_session_id() -> str:
     """生成会话ID"""
@@ -408,39 +576,32 @@ def send_file(
     mimetype=None, 
     as_attachment=False, 
     download_name=None, 
-    conditional=False,
+    conditional=True,
     etag=True,
     last_modified=None,
     max_age=None,
     add_etags=True,
     etag_func=None
 ):
-    """发送文件"""
-    from starlette.responses import FileResponse
-    from pathlib import Path
-    
-    # 处理文件路径
-    if isinstance(path_or_fileobj, str):
-        path = Path(path_or_fileobj)
-    else:
-        # 处理文件对象（简化实现）
-        from io import BytesIO
-        content = path_or_fileobj.read()
-        from starlette.responses import Response
-        return Response(content=content, media_type=mimetype or "application/octet-stream")
-    
-    # 检查文件是否存在
-    if not path.exists() or not path.is_file():
-        from .response import abort
-        abort(404)
-    
-    # 创建文件响应
-    return FileResponse(
-        path=path,
-        media_type=mimetype,
-        filename=download_name,
-        stat_result=None,
-        method=None
+    """发送文件
+    
+    conditional 为 True 时根据 If-None-Match / If-Modified-Since 返回304；
+    max_age 为 None 时使用配置 SEND_FILE_MAX_AGE_DEFAULT。
+    文件对象按 SEND_FILE_CHUNK_SIZE 分块流式发送，发送完毕后关闭。
+    USE_X_SENDFILE 为 True 时只返回 X-Sendfile / X-Accel-Redirect 头部，由前端服务器发送文件。
+    """
+    from .files import _send_file
+    return _send_file(
+        path_or_fileobj,
+        mimetype=mimetype,
+        as_attachment=as_attachment,
+        download_name=download_name,
+        conditional=conditional,
+        etag=etag,
+        last_modified=last_modified,
+        max_age=max_age,
+        add_etags=add_etags,
+        etag_func=etag_func
     )
 
 def url_quote(s, charset='utf-8', safe='/', encoding=None):
@@ -461,3 +622,46 @@ def escape(s):
     """转义字符串"""
     from html import escape
     return escape(s)
+
+def stream_with_context(generator_or_function):
+    """在流式响应中保留请求上下文（兼容Flask）
+
+    流式响应在视图函数返回后才被迭代，此时请求上下文已经结束。
+    这里在创建时捕获上下文，并在每次生成数据时恢复。可以用作装饰器。
+    """
+    import contextvars
+    gen = generator_or_function
+    if callable(gen) and not hasattr(gen, '__iter__') and not hasattr(gen, '__aiter__'):
+        import functools
+
+        @functools.wraps(gen)
+        def decorator(*args, **kwargs):
+            return stream_with_context(gen(*args, **kwargs))
+        return decorator
+
+    ctx = contextvars.copy_context()
+    if hasattr(gen, '__aiter__'):
+        return _async_stream_with_context(gen, ctx)
+    return _sync_stream_with_context(iter(gen), ctx)
+
+def _sync_stream_with_context(iterator, ctx):
+    sentinel = object()
+    while True:
+        item = ctx.run(next, iterator, sentinel)
+        if item is sentinel:
+            return
+        yield item
+
+async def _async_stream_with_context(aiterator, ctx):
+    # 异步生成器在消费它的任务中运行，直接恢复捕获的上下文变量
+    tokens = [(var, var.set(value)) for var, value in ctx.items()]
+    try:
+        async for item in aiterator:
+            yield item
+    finally:
+        for var, token in reversed(tokens):
+            try:
+                var.reset(token)
+            except ValueError:
+                # 在其他上下文中关闭生成器时无法重置
+                pass
@@ -0,0 +1,158 @@
+from foxar.app import Foxar
+from foxar.compress import CompressMiddleware
+from foxar.files import FileResponse
+from foxar.response import Response
+from starlette.responses import StreamingResponse
+from starlette.testclient import TestClient
+import asyncio
+import gzip
+import os
+import tempfile
+import zlib
+
+PAGE = "<p>compress me</p>" * 200
+
+# 创建应用实例
+app = Foxar(__name__)
+app.config['TESTING'] = True
+app.config['COMPRESS_ENABLED'] = True
+app.config['COMPRESS_ALGORITHM'] = ['gzip']
+app.config['COMPRESS_CACHE_MAX_BYTES'] = 1024 * 1024
+
+@app.get('/page')
+def page_view():
+    return Response(PAGE, mimetype='text/html')
+
+@app.get('/small')
+def small_view():
+    return Response("tiny", mimetype='text/html')
+
+@app.get('/image')
+def image_view():
+    return Response(b"\x89PNG" * 500, mimetype='image/png')
+
+@app.get('/encoded')
+def encoded_view():
+    return Response(gzip.compress(PAGE.encode()), mimetype='text/html', headers={'Content-Encoding': 'gzip'})
+
+@app.get('/etag')
+def etag_view():
+    return Response(PAGE, mimetype='text/html').make_conditional()
+
+@app.get('/stream')
+def stream_view():
+    def generate():
+        for i in range(5):
+            yield f"<li>{i}</li>" * 50
+    return StreamingResponse(generate(), media_type='text/html')
+
+client = TestClient(app)
+
+def _run(asgi_app, path='/', extensions=None, headers=None):
+    """直接通过ASGI调用，返回发送的消息列表"""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "query_string": b"",
+        "headers": [(b"accept-encoding", b"gzip")] + list(headers or []),
+        "extensions": extensions or {},
+    }
+    messages = []
+    received = []
+
+    async def receive():
+        if received:
+            # 请求体已读完，等待直到响应结束
+            await asyncio.sleep(3600)
+        received.append(True)
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(asgi_app(scope, receive, send))
+    return messages
+
+# 测试基本压缩
+def test_compress_response():
+    response = client.get('/page', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['content-encoding'] == 'gzip'
+    assert 'accept-encoding' in response.headers['vary'].lower()
+    assert int(response.headers['content-length']) < len(PAGE)
+    assert response.text == PAGE
+    print("✓ large HTML responses are gzip-compressed")
+
+    response = client.get('/page', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in response.headers
+    assert 'accept-encoding' in response.headers['vary'].lower()
+    print("✓ identity clients get the original body with Vary")
+
+# 测试跳过的响应
+def test_compress_skip():
+    assert 'content-encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    print("✓ responses under COMPRESS_MIN_SIZE are not compressed")
+
+    response = client.get('/image', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in response.headers
+    assert 'vary' not in response.headers
+    print("✓ mimetypes outside COMPRESS_MIMETYPES are not compressed")
+
+    response = client.get('/encoded', headers={'Accept-Encoding': 'gzip'})
+    assert response.text == PAGE
+    print("✓ already encoded responses are passed through")
+
+# 测试流式压缩
+def test_compress_streaming():
+    messages = _run(app, '/stream')
+    start = messages[0]
+    headers = dict(start["headers"])
+    assert headers[b"content-encoding"] == b"gzip"
+    assert b"content-length" not in headers
+    bodies = [m["body"] for m in messages[1:]]
+    # 每个块单独刷新，不等待整个响应体
+    assert len([b for b in bodies if b]) >= 5
+    decompressor = zlib.decompressobj(31)
+    first = decompressor.decompress(bodies[0])
+    assert first == b"<li>0</li>" * 50
+    rest = b"".join(decompressor.decompress(b) for b in bodies[1:])
+    assert first + rest == "".join(f"<li>{i}</li>" * 50 for i in range(5)).encode()
+    print("✓ streaming responses are compressed chunk by chunk")
+
+# 测试压缩结果缓存
+def test_compress_cache():
+    middleware = app.middleware_stack
+    while not isinstance(middleware, CompressMiddleware):
+        middleware = middleware.app
+    first = client.get('/etag', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['etag'].startswith('W/')
+    hits = middleware.cache.hits
+    second = client.get('/etag', headers={'Accept-Encoding': 'gzip'})
+    assert second.text == PAGE
+    assert middleware.cache.hits == hits + 1
+    print("✓ compressed bodies are cached by ETag")
+
+    response = client.get('/etag', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['etag']})
+    assert response.status_code == 304
+    print("✓ weakened ETag still matches If-None-Match")
+
+# 测试零拷贝文件压缩
+def test_compress_zerocopy():
+    path = os.path.join(tempfile.mkdtemp(), "page.html")
+    with open(path, 'w') as f:
+        f.write(PAGE)
+    messages = _run(CompressMiddleware(FileResponse(path), app), extensions={"http.response.zerocopy": {}})
+    assert dict(messages[0]["headers"])[b"content-encoding"] == b"gzip"
+    assert not any(m["type"] == "http.response.zerocopy" for m in messages)
+    body = b"".join(m["body"] for m in messages[1:])
+    assert gzip.decompress(body) == PAGE.encode()
+    print("✓ zerocopy file responses are read and compressed")
+
+if __name__ == "__main__":
+    print("=== Testing response compression ===")
+    test_compress_response()
+    test_compress_skip()
+    test_compress_streaming()
+    test_compress_cache()
+    test_compress_zerocopy()
+    print("\nAll compression tests completed!")
@@ -38,8 +38,51 @@ async def test_request_context():
         assert request.path == "/test"
         print("✓ request object correctly populated inside request_context")
 
+# 测试 request、g、session 代理与 _get_current_object()
+def test_proxies():
+    import asyncio
+    from foxar.request import request, g
+    from foxar.utils import session
+    
+    def make_request(path):
+        scope = {"type": "http", "method": "GET", "path": path, "query_string": b"page=2", "headers": []}
+        return Request(scope)
+    
+    async def handle(path):
+        async with request_context(make_request(path)):
+            g.user = path
+            session['visits'] = 1
+            bound = request._get_current_object()
+            await asyncio.sleep(0)
+            assert g.user == path
+            assert g._get_current_object().user == path
+            assert 'user' in g and g.get('missing', 0) == 0
+            assert bound.path == request.path == path
+            assert bound.args.get('page', type=int) == 2
+            assert session() is session._get_current_object()
+            assert session['visits'] == 1 and session().modified
+            return bound
+    
+    async def main():
+        return await asyncio.gather(handle('/a'), handle('/b'))
+    
+    bound_a, bound_b = asyncio.run(main())
+    assert (bound_a.path, bound_b.path) == ('/a', '/b')
+    print("✓ g, session and request are isolated per request")
+    
+    with app.app_context():
+        assert current_app._get_current_object() is app
+        assert current_app.config is app.config
+    try:
+        current_app._get_current_object()
+        assert False, "current_app should raise outside the app context"
+    except RuntimeError:
+        pass
+    print("✓ current_app._get_current_object() returns the app inside the context")
+
 if __name__ == "__main__":
     test_app_context()
     import asyncio
     asyncio.run(test_request_context())
+    test_proxies()
     print("\nAll context management tests completed!")
@@ -0,0 +1,136 @@
+from foxar.datastructures import FileStorage, MultiDictView, UploadSpool
+from foxar.request import request, request_context
+from starlette.datastructures import QueryParams
+from starlette.requests import Request
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+
+def make_request(query_string=b"", headers=None):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "query_string": query_string,
+        "headers": list(headers or []),
+    }
+    return Request(scope)
+
+# 测试多值视图
+def test_multidict_view():
+    view = MultiDictView(QueryParams("id=1&id=2&id=x&name=foxar"))
+    assert view.getlist('id') == ['1', '2', 'x']
+    assert view.getlist('id', type=int) == [1, 2]
+    assert view.getlist('missing') == []
+    print("✓ getlist returns every value and skips failed conversions")
+
+    assert view.get('name') == 'foxar'
+    assert view.get('name', -1, type=int) == -1
+    assert view.get('missing', 'default') == 'default'
+    assert view.to_dict(flat=False) == {'id': ['1', '2', 'x'], 'name': ['foxar']}
+    assert ('id', '1') in view.items(multi=True)
+    print("✓ get converts types and falls back to the default")
+
+    cookies = MultiDictView({'session': 'abc'})
+    assert cookies.getlist('session') == ['abc']
+    assert dict(cookies) == {'session': 'abc'}
+    print("✓ plain dicts are wrapped as single-valued views")
+
+# 测试请求视图缓存
+def test_request_views():
+    req = make_request(b"page=2&tag=a&tag=b", [
+        (b"x-token", b"t1"),
+        (b"accept", b"text/html"),
+        (b"accept", b"application/json"),
+        (b"cookie", b"theme=dark"),
+    ])
+
+    async def view():
+        async with request_context(req):
+            assert request.args is request.args
+            assert request.headers is request.headers
+            assert request.cookies is request.cookies
+            assert request.args.getlist('tag') == ['a', 'b']
+            assert request.get('page', type=int) == 2
+            assert request.get('missing', 1, type=int) == 1
+            assert request.headers['X-Token'] == 't1'
+            assert request.headers.getlist('Accept') == ['text/html', 'application/json']
+            assert request.cookies.get('theme') == 'dark'
+        assert len(request.args) == 0
+
+    asyncio.run(view())
+    print("✓ args, headers and cookies views are built once per request")
+
+# 测试 FileStorage.save
+def test_file_storage_save():
+    data = b"foxar" * 10000
+    target = tempfile.mkdtemp()
+
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(data)
+    spooled.seek(0)
+    storage = FileStorage(spooled, filename='memory.bin', headers={'content-type': 'application/octet-stream'})
+    storage.save(os.path.join(target, 'memory.bin'))
+    with open(os.path.join(target, 'memory.bin'), 'rb') as f:
+        assert f.read() == data
+    assert storage.size == len(data)
+    assert storage.sha256 == hashlib.sha256(data).hexdigest()
+    assert storage.mimetype == 'application/octet-stream'
+    # 保存后内存缓冲区已释放，仍可继续写入
+    spooled.write(b'more')
+    print("✓ in-memory uploads are written in one call")
+
+    on_disk = UploadSpool(max_size=1024, dir=target)
+    on_disk.write(data)
+    assert on_disk._rolled
+    storage = FileStorage(on_disk, filename='disk.bin')
+    path = os.path.join(target, 'disk.bin')
+    storage.save(path)
+    with open(path, 'rb') as f:
+        assert f.read() == data
+    if hasattr(os, 'O_TMPFILE'):
+        assert os.stat(path).st_ino == os.fstat(on_disk.fileno()).st_ino
+        print("✓ on-disk uploads are linked to the target path without copying")
+
+        # 第二次保存复制数据，两个文件互不影响；权限遵循 umask
+        second = os.path.join(target, 'disk-copy.bin')
+        storage.save(second)
+        assert os.stat(second).st_ino != os.stat(path).st_ino and os.stat(path).st_nlink == 1
+        with open(second, 'r+b') as f:
+            f.write(b'XXXXX')
+        with open(path, 'rb') as f:
+            assert f.read() == data
+        umask = os.umask(0)
+        os.umask(umask)
+        assert os.stat(path).st_mode & 0o777 == 0o666 & ~umask
+        print("✓ later saves copy instead of linking and saved files follow the umask")
+    else:
+        print("✓ on-disk uploads are copied in the kernel")
+
+    storage = FileStorage(io.BytesIO(data), filename='bytes.bin')
+    storage.save(os.path.join(target, 'bytes.bin'))
+    with open(os.path.join(target, 'bytes.bin'), 'rb') as f:
+        assert f.read() == data
+    print("✓ streams without a file descriptor are copied")
+
+    # 跨文件系统时的复制路径
+    from foxar.datastructures import _copy_fd
+    copy_path = os.path.join(target, 'copy.bin')
+    with open(copy_path, 'wb') as f:
+        _copy_fd(on_disk.fileno(), f.fileno(), len(data), 4096)
+    with open(copy_path, 'rb') as f:
+        assert f.read() == data
+
+    buffer = io.BytesIO()
+    storage.save(buffer)
+    assert buffer.getvalue() == data
+    print("✓ save() also accepts file objects")
+
+if __name__ == "__main__":
+    print("=== Testing datastructures ===")
+    test_multidict_view()
+    test_request_views()
+    test_file_storage_save()
+    print("\nAll datastructures tests completed!")
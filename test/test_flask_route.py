@@ -0,0 +1,74 @@
+from foxar import Foxar, Blueprint, request, g
+from foxar.routing import FlaskRoute
+from starlette.responses import PlainTextResponse
+from starlette.testclient import TestClient
+import warnings
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+    app = Foxar(__name__)
+
+@app.before_request
+def load_user():
+    g.user = 'foxar'
+
+@app.route('/items/{item_id}', route_class=FlaskRoute, include_in_schema=True, tags=['items'])
+def get_item(item_id: int):
+    """Return one item."""
+    return {'id': item_id, 'user': g.get('user'), 'q': request.args.get('q')}
+
+@app.route('/echo', methods=['POST'], route_class=FlaskRoute, max_content_length=20)
+def echo():
+    return request.get_json()
+
+@app.route('/text/{name}', route_class=FlaskRoute)
+async def text(name):
+    return PlainTextResponse(f'hello {name}')
+
+@app.route('/api/{item_id}')
+def api_item(item_id: int):
+    return {'id': item_id, 'user': g.get('user')}
+
+bp = Blueprint('bp', __name__, route_class=FlaskRoute)
+
+@bp.route('/numbers/{n}')
+def number(n: int):
+    return [n, n * 2]
+
+app.register_blueprint(bp)
+
+client = TestClient(app)
+
+# 测试 FlaskRoute 的请求处理
+def test_flask_route():
+    assert client.get('/items/3?q=x').json() == {'id': 3, 'user': 'foxar', 'q': 'x'}
+    assert client.get('/items/abc').status_code == 404
+    print("✓ path parameters are converted using the view's annotations")
+
+    assert client.post('/echo', json={'a': 1}).json() == {'a': 1}
+    assert client.post('/echo', json={'a': 'x' * 40}).status_code == 413
+    assert client.get('/text/foxar').text == 'hello foxar'
+    print("✓ sync and async views, responses and max_content_length work")
+
+    assert client.get('/numbers/4').json() == [4, 8]
+    assert client.get('/api/5').json() == {'id': 5, 'user': 'foxar'}
+    print("✓ blueprint routes and the default route class share the request context")
+
+# 测试 url_map 和 OpenAPI
+def test_flask_route_schema():
+    assert '/items/{item_id:int}' in app.url_map
+    assert '/numbers/{n:int}' in app.url_map
+    paths = client.get('/openapi.json').json()['paths']
+    operation = paths['/items/{item_id}']['get']
+    assert operation['description'] == 'Return one item.'
+    assert operation['tags'] == ['items']
+    assert operation['parameters'][0]['schema'] == {'type': 'integer'}
+    assert '/echo' not in paths and '/numbers/{n}' not in paths
+    assert '/api/{item_id}' in paths
+    print("✓ FlaskRoute stays in url_map and only appears in OpenAPI when requested")
+
+if __name__ == "__main__":
+    print("=== Testing FlaskRoute ===")
+    test_flask_route()
+    test_flask_route_schema()
+    print("\nAll FlaskRoute tests completed!")
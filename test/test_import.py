@@ -27,3 +27,31 @@ except Exception as e:
     print(f"✗ Error: {e}")
     import traceback
     traceback.print_exc()
+
+# 测试延迟导入
+def test_lazy_imports():
+    import subprocess
+    code = (
+        "import sys, foxar\n"
+        "assert 'httpx' not in sys.modules and 'foxar.csrf' not in sys.modules\n"
+        "from foxar import TestClient, csrf\n"
+        "assert 'httpx' in sys.modules and foxar.csrf is csrf\n"
+        "assert 'TestClient' in dir(foxar)\n"
+    )
+    subprocess.run([sys.executable, '-c', code], check=True)
+    print("✓ TestClient and csrf are imported on first access")
+
+    # 先导入同一模块中的其他名称，或直接导入子模块，csrf 仍是 CSRFProtect 实例
+    for first in ('from foxar import generate_csrf', 'import foxar.csrf'):
+        code = (
+            f"{first}\n"
+            "from foxar import csrf\n"
+            "from foxar.csrf import CSRFProtect\n"
+            "import foxar\n"
+            "assert isinstance(csrf, CSRFProtect) and foxar.csrf is csrf\n"
+        )
+        subprocess.run([sys.executable, '-c', code], check=True)
+    print("✓ csrf stays the CSRFProtect instance after foxar.csrf is imported")
+
+if __name__ == "__main__":
+    test_lazy_imports()
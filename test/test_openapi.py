@@ -0,0 +1,95 @@
+from foxar import Foxar, Blueprint
+from starlette.testclient import TestClient
+import json
+import os
+import tempfile
+import warnings
+
+def make_app(cache_dir=None, include_flask_routes=True):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        app = Foxar(__name__)
+    app.config['OPENAPI_CACHE_DIR'] = cache_dir
+    app.config['OPENAPI_INCLUDE_FLASK_ROUTES'] = include_flask_routes
+
+    @app.route('/users/{user_id}')
+    def get_user(user_id: int):
+        return {'id': user_id}
+
+    @app.route('/internal', include_in_schema=False)
+    def internal():
+        return {}
+
+    @app.get('/native')
+    def native():
+        return {}
+
+    admin = Blueprint('admin', __name__, url_prefix='/admin', include_in_schema=False)
+
+    @admin.route('/stats')
+    def stats():
+        return {}
+
+    public = Blueprint('public', __name__)
+
+    @public.route('/pages')
+    def pages():
+        return []
+
+    app.register_blueprint(admin)
+    app.register_blueprint(public)
+    return app
+
+def cached_files(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith('.json'))
+
+# 测试文档延迟生成和文件缓存
+def test_openapi_cache():
+    cache_dir = tempfile.mkdtemp()
+    app = make_app(cache_dir)
+    assert app.openapi_schema is None and cached_files(cache_dir) == []
+    paths = TestClient(app).get('/openapi.json').json()['paths']
+    assert '/users/{user_id}' in paths and '/pages' in paths and '/native' in paths
+    files = cached_files(cache_dir)
+    assert len(files) == 1
+    print("✓ the schema is generated on first request and written to OPENAPI_CACHE_DIR")
+
+    # 同样的路由表直接读取缓存文件
+    path = os.path.join(cache_dir, files[0])
+    with open(path) as f:
+        schema = json.load(f)
+    schema['info']['x-cached'] = True
+    with open(path, 'w') as f:
+        json.dump(schema, f)
+    other = make_app(cache_dir)
+    assert TestClient(other).get('/openapi.json').json()['info'].get('x-cached') is True
+    print("✓ another worker with the same route table reads the cached file")
+
+    @other.route('/new')
+    def new():
+        return {}
+    assert '/new' in TestClient(other).get('/openapi.json').json()['paths']
+    assert len(cached_files(cache_dir)) == 2
+    print("✓ changing the route table changes the cache key")
+
+    prebuilt_dir = tempfile.mkdtemp()
+    path = make_app().prebuild_openapi(prebuilt_dir)
+    assert os.path.exists(path) and cached_files(prebuilt_dir) == [os.path.basename(path)]
+    print("✓ prebuild_openapi() writes the cache at deploy time")
+
+# 测试从文档中排除Flask风格的路由
+def test_openapi_exclusion():
+    paths = TestClient(make_app()).get('/openapi.json').json()['paths']
+    assert '/internal' not in paths
+    assert not any(path.startswith('/admin') for path in paths)
+    print("✓ route and blueprint include_in_schema flags are honoured")
+
+    paths = TestClient(make_app(include_flask_routes=False)).get('/openapi.json').json()['paths']
+    assert list(paths) == ['/native']
+    print("✓ OPENAPI_INCLUDE_FLASK_ROUTES=False keeps only native FastAPI routes")
+
+if __name__ == "__main__":
+    print("=== Testing OpenAPI ===")
+    test_openapi_cache()
+    test_openapi_exclusion()
+    print("\nAll OpenAPI tests completed!")
@@ -0,0 +1,430 @@
+from foxar.app import Foxar
+from foxar.blueprints import Blueprint
+from foxar.jsonstream import JSONItemParser
+from foxar.request import request
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.testclient import TestClient
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# 创建应用实例
+app = Foxar(__name__)
+app.config['TESTING'] = True
+app.config['REQUEST_PREFETCH_MAX_SIZE'] = 1024
+
+@app.route('/echo', methods=['POST'])
+def echo_view():
+    return JSONResponse({
+        'json': request.json,
+        'get_json': request.get_json(),
+        'data': request.get_data(as_text=True),
+    })
+
+@app.route('/form', methods=['POST'])
+def form_view():
+    form = request.form()
+    return JSONResponse({'form': form.to_dict(flat=False), 'name': request.form_get('name')})
+
+@app.route('/silent', methods=['POST'])
+def silent_view():
+    return JSONResponse({'json': request.get_json(silent=True), 'forced': request.get_json(force=True, silent=True)})
+
+@app.route('/async', methods=['POST'])
+async def async_view():
+    return JSONResponse({'json': await request.get_json(), 'property': await request.json})
+
+@app.route('/async-read', methods=['POST'])
+async def async_read_view():
+    return JSONResponse({
+        'json': await request.get_json(),
+        'form': (await request.form()).to_dict(),
+        'name': await request.form_get('name'),
+        'data': await request.get_data(as_text=True),
+    })
+
+@app.route('/async-form', methods=['POST'])
+async def async_form_view():
+    return JSONResponse((await request.form()).to_dict())
+
+@app.route('/async-upload', methods=['POST'])
+async def async_upload_view():
+    upload = await request.files_get('doc')
+    files = await request.files
+    return JSONResponse({
+        'title': await request.form_get('title'),
+        'size': upload.size,
+        'sha256': upload.sha256,
+        'same': files['doc'] is upload,
+    })
+
+@app.route('/items/{item_id}')
+def item_view(item_id: int):
+    return JSONResponse({'item_id': item_id, 'q': request.args.get('q')})
+
+@app.route('/stream', methods=['POST'])
+def stream_view():
+    chunks = list(request.stream)
+    return JSONResponse({'total': sum(len(chunk) for chunk in chunks), 'data': chunks[0][:3].decode()})
+
+@app.route('/async-stream', methods=['POST'])
+async def async_stream_view():
+    total = 0
+    async for chunk in request.stream:
+        total += len(chunk)
+    return JSONResponse({'total': total})
+
+@app.route('/spool', methods=['POST'])
+def spool_view():
+    stream = request.input_stream
+    head = stream.read(5)
+    return JSONResponse({'head': head.decode(), 'rolled': stream._rolled, 'size': len(request.get_data())})
+
+UPLOAD_DIR = tempfile.mkdtemp()
+UPLOADS = []
+
+@app.route('/upload-file', methods=['POST'])
+def upload_file_view():
+    upload = request.files['doc']
+    UPLOADS.append(upload)
+    upload.save(os.path.join(UPLOAD_DIR, upload.filename))
+    return JSONResponse({
+        'form': request.form().to_dict(),
+        'filename': upload.filename,
+        'content_type': upload.content_type,
+        'size': upload.size,
+        'sha256': upload.sha256,
+    })
+
+@app.route('/import', methods=['POST'])
+def import_view():
+    return JSONResponse({'items': [item for item in request.iter_json(max_item_size=100)]})
+
+@app.route('/import-async', methods=['POST'])
+async def import_async_view():
+    count = 0
+    async for item in request.iter_json():
+        count += item['n']
+    return JSONResponse({'total': count})
+
+client = TestClient(app)
+
+# 限制请求体大小的应用
+limited = Foxar(__name__)
+limited.config['TESTING'] = True
+limited.config['MAX_CONTENT_LENGTH'] = 100
+
+@limited.route('/upload', methods=['POST'])
+def upload_view():
+    return JSONResponse({'size': len(request.get_data())})
+
+@limited.route('/big', methods=['POST'], max_content_length=1000)
+def big_upload_view():
+    return JSONResponse({'size': len(request.get_data())})
+
+uploads = Blueprint('uploads', __name__, max_content_length=500)
+
+@uploads.route('/bp', methods=['POST'])
+async def blueprint_upload_view(req: Request):
+    return JSONResponse({'size': len(await req.body())})
+
+limited.register_blueprint(uploads)
+
+@limited.route('/stream', methods=['POST'])
+def stream_view():
+    return StreamingResponse(iter([b'a', b'b']))
+
+# 同一个视图函数注册到没有上限的应用，不受蓝图上限影响
+def shared_upload_view():
+    return JSONResponse({'size': len(request.get_data())})
+
+limited_bp = Blueprint('limited_bp', __name__, max_content_length=10)
+limited_bp.add_url_rule('/limited-shared', view_func=shared_upload_view, methods=['POST'])
+limited.register_blueprint(limited_bp)
+unlimited = Foxar(__name__)
+unlimited.add_url_rule('/shared', view_func=shared_upload_view, methods=['POST'])
+open_bp = Blueprint('open_bp', __name__)
+open_bp.add_url_rule('/open-shared', view_func=shared_upload_view, methods=['POST'])
+limited.register_blueprint(open_bp)
+
+# CSRF 中间件在钩子中间件外层读取表单，同样受请求体上限约束
+from foxar.csrf import CSRFProtect, generate_csrf
+
+protected = Foxar(__name__)
+protected.config['TESTING'] = True
+protected.config['SECRET_KEY'] = 'test-secret'
+protected.config['MAX_CONTENT_LENGTH'] = 100
+CSRFProtect().init_app(protected)
+
+@protected.route('/upload', methods=['POST'])
+def protected_upload_view():
+    return JSONResponse({})
+
+protected_bp = Blueprint('protected_bp', __name__, max_content_length=500)
+
+@protected_bp.route('/bp', methods=['POST'])
+def protected_blueprint_view():
+    return JSONResponse({})
+
+protected.register_blueprint(protected_bp)
+
+# 测试同步视图读取请求体
+def test_sync_view_body():
+    response = client.post('/echo', json={'name': 'foxar'})
+    assert response.status_code == 200
+    assert response.json() == {'json': {'name': 'foxar'}, 'get_json': {'name': 'foxar'}, 'data': '{"name":"foxar"}'}
+    print("✓ sync views read request.json, get_json() and get_data() directly")
+
+    response = client.post('/form', data={'name': 'foxar', 'tag': ['a', 'b']})
+    assert response.json() == {'form': {'name': ['foxar'], 'tag': ['a', 'b']}, 'name': 'foxar'}
+    print("✓ sync views read request.form() as a multi-value view")
+
+    # 超过预读上限的请求体在工作线程中按需读取
+    payload = {'data': 'x' * 4096}
+    response = client.post('/echo', json=payload)
+    assert response.json()['json'] == payload
+    print("✓ bodies above REQUEST_PREFETCH_MAX_SIZE are read on demand")
+
+# 测试JSON错误处理
+def test_json_errors():
+    response = client.post('/silent', content=b'{broken', headers={'Content-Type': 'application/json'})
+    assert response.json() == {'json': None, 'forced': None}
+    response = client.post('/silent', content=b'[1, 2]', headers={'Content-Type': 'text/plain'})
+    assert response.json() == {'json': None, 'forced': [1, 2]}
+    print("✓ get_json honours silent and force")
+
+    response = client.post('/echo', content=b'{broken', headers={'Content-Type': 'application/json'})
+    assert response.status_code == 400
+    print("✓ invalid JSON returns 400")
+
+# 测试异步视图和路径参数
+def test_async_view_and_params():
+    response = client.post('/async', json=[1, 2, 3])
+    assert response.json() == {'json': [1, 2, 3], 'property': [1, 2, 3]}
+    print("✓ async views await request.get_json() and request.json")
+
+    assert client.post('/async-read', json={'a': 1}).json() == {'json': {'a': 1}, 'form': {}, 'name': None, 'data': '{"a":1}'}
+    response = client.post('/async-read', data={'name': 'foxar'})
+    assert response.json() == {'json': None, 'form': {'name': 'foxar'}, 'name': 'foxar', 'data': 'name=foxar'}
+    print("✓ async views await form(), form_get() and get_data()")
+
+    # 超过 REQUEST_PREFETCH_MAX_SIZE 的上传和分块传输的表单在事件循环中边接收边解析
+    data = os.urandom(2 * 1024 * 1024)
+    response = client.post('/async-upload', data={'title': 'big'}, files={'doc': ('big.bin', data, 'application/octet-stream')})
+    assert response.json() == {'title': 'big', 'size': len(data), 'sha256': hashlib.sha256(data).hexdigest(), 'same': True}
+    body = b'title=chunked&name=foxar'
+    response = client.post('/async-form', content=iter([body[:10], body[10:]]),
+                           headers={'Content-Type': 'application/x-www-form-urlencoded'})
+    assert response.json() == {'title': 'chunked', 'name': 'foxar'}
+    print("✓ async views stream-parse large and chunked forms")
+
+    response = client.get('/items/42?q=search')
+    assert response.status_code == 200
+    assert response.json() == {'item_id': 42, 'q': 'search'}
+    print("✓ route views receive path parameters")
+
+# 测试流式读取请求体
+def test_request_stream():
+    body = b'abc' + b'x' * 5000
+    assert client.post('/stream', content=body).json() == {'total': len(body), 'data': 'abc'}
+    assert client.post('/stream', content=b'abc').json() == {'total': 3, 'data': 'abc'}
+    assert client.post('/async-stream', content=body).json() == {'total': len(body)}
+    print("✓ request.stream iterates body chunks in sync and async views")
+
+    app.config['REQUEST_SPOOL_MAX_MEMORY'] = 1024
+    try:
+        response = client.post('/spool', content=b'hello' + b'x' * 4096)
+        assert response.json() == {'head': 'hello', 'rolled': True, 'size': 4101}
+        response = client.post('/spool', content=b'hello')
+        assert response.json() == {'head': 'hello', 'rolled': False, 'size': 5}
+    finally:
+        app.config['REQUEST_SPOOL_MAX_MEMORY'] = 512 * 1024
+    print("✓ input_stream spools large bodies to disk")
+
+# 测试文件上传
+def test_file_upload():
+    data = b'0123456789' * 1000
+    app.config['UPLOAD_SPOOL_MAX_MEMORY'] = 1024
+    app.config['UPLOAD_TEMP_DIR'] = UPLOAD_DIR
+    try:
+        response = client.post('/upload-file', data={'title': 'report'},
+                               files={'doc': ('report.txt', data, 'text/plain')})
+    finally:
+        app.config['UPLOAD_SPOOL_MAX_MEMORY'] = 1024 * 1024
+        app.config['UPLOAD_TEMP_DIR'] = None
+    assert response.status_code == 200
+    assert response.json() == {
+        'form': {'title': 'report'},
+        'filename': 'report.txt',
+        'content_type': 'text/plain',
+        'size': len(data),
+        'sha256': hashlib.sha256(data).hexdigest(),
+    }
+    with open(os.path.join(UPLOAD_DIR, 'report.txt'), 'rb') as f:
+        assert f.read() == data
+    assert UPLOADS[-1].stream.closed
+    print("✓ request.files returns FileStorage with size, sha256 and save()")
+    print("✓ uploads are closed when the request ends")
+
+    response = client.post('/upload-file', content=b'--x\r\nbroken', headers={'Content-Type': 'multipart/form-data'})
+    assert response.status_code == 400
+    print("✓ malformed multipart bodies return 400")
+
+# 测试增量JSON解析
+def test_iter_json():
+    items = [{'n': i, 'tag': f'item-{i}'} for i in range(500)]
+    response = client.post('/import', json=items)
+    assert response.json() == {'items': items}
+    response = client.post('/import-async', json=items)
+    assert response.json() == {'total': sum(range(500))}
+    print("✓ iter_json yields JSON array items in sync and async views")
+
+    # 元素在任意位置被分块截断
+    data = json.dumps([1, 2.5, -1e5, True, None, 'a,]"', {'k': [1, 2]}, []]).encode()
+    parser = JSONItemParser()
+    parsed = []
+    for i in range(0, len(data), 3):
+        parsed += parser.feed(data[i:i + 3])
+    parsed += parser.close()
+    assert parsed == json.loads(data)
+    print("✓ items split across chunk boundaries are decoded correctly")
+
+    # 大元素分成很多小块到达时每块只扫描一次
+    big = {'text': 'x\\"]}' * 50000, 'nested': [[{'n': i}] for i in range(5000)]}
+    for ndjson, data in ((False, json.dumps([big, 1]).encode()), (True, json.dumps(big).encode() + b'\n1\n')):
+        parser = JSONItemParser(ndjson=ndjson)
+        parsed = []
+        start = time.perf_counter()
+        for i in range(0, len(data), 64):
+            parsed += parser.feed(data[i:i + 64])
+        parsed += parser.close()
+        assert parsed == [big, 1] and time.perf_counter() - start < 5
+    print("✓ large items arriving in many small chunks are parsed in linear time")
+
+    ndjson = b'{"n": 1}\n{"n": 2}\n\n{"n": 3}\n'
+    response = client.post('/import', content=ndjson, headers={'Content-Type': 'application/x-ndjson'})
+    assert response.json() == {'items': [{'n': 1}, {'n': 2}, {'n': 3}]}
+    print("✓ NDJSON bodies are parsed line by line")
+
+    response = client.post('/import', json=[{'tag': 'x' * 200}])
+    assert response.status_code == 413
+    response = client.post('/import', content=b'[1, 2', headers={'Content-Type': 'application/json'})
+    assert response.status_code == 400
+    print("✓ oversize items return 413 and truncated arrays return 400")
+
+# 测试表单解析限制
+def test_form_limits():
+    app.config['MAX_FORM_MEMORY_SIZE'] = 100
+    app.config['MAX_FORM_PARTS'] = 3
+    try:
+        assert client.post('/form', data={'name': 'x' * 200}).status_code == 413
+        assert client.post('/form', data={'a': '1', 'b': '2', 'c': '3', 'd': '4'}).status_code == 413
+        response = client.post('/form', files={'name': (None, 'x' * 200)})
+        assert response.status_code == 413
+        response = client.post('/upload-file', files={'doc': ('big.txt', b'x' * 1000, 'text/plain')})
+        assert response.status_code == 200
+    finally:
+        app.config['MAX_FORM_MEMORY_SIZE'] = 500 * 1000
+        app.config['MAX_FORM_PARTS'] = 1000
+    print("✓ MAX_FORM_MEMORY_SIZE and MAX_FORM_PARTS return 413, files are not limited")
+
+    calls = []
+
+    @app.route('/lazy-form', methods=['POST'])
+    def lazy_form_view():
+        calls.append(request.get_data())
+        return JSONResponse({'ok': True})
+
+    response = client.post('/lazy-form', content=b'--x\r\nbroken', headers={'Content-Type': 'multipart/form-data; boundary=x'})
+    assert response.status_code == 200
+    print("✓ forms are parsed only when accessed")
+
+def _post_chunks(asgi_app, path, chunks, headers=()):
+    """直接通过ASGI发送分块请求体，返回 (状态码, 读取的块数)"""
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": path,
+        "query_string": b"",
+        "headers": list(headers),
+    }
+    pending = list(chunks)
+    reads = []
+    status = []
+
+    async def receive():
+        reads.append(True)
+        if not pending:
+            await asyncio.sleep(3600)
+        body = pending.pop(0)
+        return {"type": "http.request", "body": body, "more_body": bool(pending)}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    asyncio.run(asgi_app(scope, receive, send))
+    return status[0], len(reads)
+
+# 测试 MAX_CONTENT_LENGTH
+def test_max_content_length():
+    limited_client = TestClient(limited)
+    assert limited_client.post('/upload', content=b'x' * 100).json() == {'size': 100}
+    assert limited_client.post('/upload', content=b'x' * 101).status_code == 413
+    print("✓ bodies over MAX_CONTENT_LENGTH are rejected with 413")
+
+    assert limited_client.post('/big', content=b'x' * 1000).json() == {'size': 1000}
+    assert limited_client.post('/big', content=b'x' * 1001).status_code == 413
+    assert limited_client.post('/bp', content=b'x' * 500).json() == {'size': 500}
+    assert limited_client.post('/bp', content=b'x' * 501).status_code == 413
+    print("✓ routes and blueprints override the limit")
+
+    # Content-Length 超限时不读取请求体，服务器也就不会发送 100 Continue
+    status, reads = _post_chunks(limited, '/upload', [b'x' * 200], [
+        (b"content-length", b"200"),
+        (b"expect", b"100-continue"),
+    ])
+    assert (status, reads) == (413, 0)
+    print("✓ oversize Content-Length is rejected before reading the body")
+
+    # 分块请求体超限后立即停止读取
+    status, reads = _post_chunks(limited, '/upload', [b'x' * 60] * 10, [(b"transfer-encoding", b"chunked")])
+    assert (status, reads) == (413, 2)
+    print("✓ chunked bodies stop reading once the limit is crossed")
+
+    # 流式响应等待断开连接时读取的请求体不计入上限
+    status, reads = _post_chunks(limited, '/stream', [b'x' * 60] * 10, [(b"transfer-encoding", b"chunked")])
+    assert status == 200
+    print("✓ streaming responses are not aborted by the limit while listening for disconnects")
+
+    assert limited_client.post('/limited-shared', content=b'x' * 11).status_code == 413
+    assert limited_client.post('/open-shared', content=b'x' * 11).json() == {'size': 11}
+    assert TestClient(unlimited).post('/shared', content=b'x' * 11).json() == {'size': 11}
+    print("✓ blueprint limits stay on the route and do not leak through a shared view function")
+
+    # CSRF 中间件读取表单之前检查上限，超限时返回 413 而不是读完整个请求体
+    form_headers = [(b"content-type", b"application/x-www-form-urlencoded"), (b"transfer-encoding", b"chunked")]
+    status, reads = _post_chunks(protected, '/upload', [b'x' * 60] * 10, form_headers)
+    assert (status, reads) == (413, 2)
+    token = generate_csrf(protected).encode()
+    status, reads = _post_chunks(protected, '/bp', [b'x' * 60] * 5, form_headers + [(b"x-csrftoken", token)])
+    assert status == 200
+    status, reads = _post_chunks(protected, '/bp', [b'x' * 60] * 10, form_headers + [(b"x-csrftoken", token)])
+    assert (status, reads) == (413, 9)
+    print("✓ the CSRF middleware applies the route limit before reading the form")
+
+if __name__ == "__main__":
+    print("=== Testing request body ===")
+    test_sync_view_body()
+    test_json_errors()
+    test_async_view_and_params()
+    test_request_stream()
+    test_file_upload()
+    test_iter_json()
+    test_form_limits()
+    test_max_content_length()
+    print("\nAll request body tests completed!")
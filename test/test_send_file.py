@@ -0,0 +1,342 @@
+from foxar.app import Foxar
+from foxar.files import FileResponse, FileObjectResponse
+from foxar.response import Response
+from foxar.utils import send_file
+from starlette.testclient import TestClient
+import anyio
+import asyncio
+import io
+import os
+import tempfile
+import tracemalloc
+
+# 创建测试文件
+FILE_DIR = tempfile.mkdtemp()
+FILE_PATH = os.path.join(FILE_DIR, "hello.txt")
+with open(FILE_PATH, 'wb') as f:
+    f.write(b"Hello, send_file!" * 100)
+
+# 创建应用实例
+app = Foxar(__name__)
+app.config['TESTING'] = True
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 60
+
+@app.get('/file')
+def file_view():
+    return send_file(FILE_PATH)
+
+@app.get('/file-no-cache')
+def file_no_cache_view():
+    return send_file(FILE_PATH, max_age=0, etag=False)
+
+@app.get('/download')
+def download_view():
+    return send_file(FILE_PATH, as_attachment=True, download_name="report.txt")
+
+@app.get('/dir/{name}')
+def directory_view(name: str):
+    return app.send_from_directory(FILE_DIR, name)
+
+@app.get('/fileobj')
+def fileobj_view():
+    return send_file(open(FILE_PATH, 'rb'), download_name="data.txt", as_attachment=True)
+
+@app.get('/bytesio')
+def bytesio_view():
+    return send_file(io.BytesIO(b"in memory"), mimetype="text/plain", etag="v1")
+
+@app.get('/asyncfile')
+async def async_file_view():
+    return send_file(await anyio.open_file(FILE_PATH, 'rb'))
+
+@app.get('/body')
+def body_view():
+    return Response("conditional body").make_conditional()
+
+client = TestClient(app)
+
+# 使用 X-Accel-Redirect 的应用
+offload_app = Foxar(__name__)
+offload_app.config['TESTING'] = True
+offload_app.config['USE_X_SENDFILE'] = True
+offload_app.config['X_SENDFILE_HEADER'] = 'X-Accel-Redirect'
+offload_app.config['X_SENDFILE_PATH_MAP'] = {FILE_DIR: '/protected'}
+
+@offload_app.get('/file')
+def offload_file_view():
+    return send_file(FILE_PATH, as_attachment=True)
+
+offload_client = TestClient(offload_app)
+
+# 测试 ETag / Last-Modified / Cache-Control
+def test_send_file_headers():
+    response = client.get('/file')
+    assert response.status_code == 200
+    assert response.headers['etag'].startswith('"')
+    assert 'last-modified' in response.headers
+    assert response.headers['cache-control'] == 'public, max-age=60'
+    assert response.headers['content-disposition'] == 'inline; filename="hello.txt"'
+    print("✓ send_file sets ETag, Last-Modified and Cache-Control")
+
+    response = client.get('/file-no-cache')
+    assert 'etag' not in response.headers
+    assert response.headers['cache-control'] == 'no-cache'
+    print("✓ send_file honors etag=False and max_age=0")
+
+    response = client.get('/download')
+    assert response.headers['content-disposition'] == 'attachment; filename="report.txt"'
+    print("✓ send_file honors as_attachment and download_name")
+
+# 测试 If-None-Match / If-Modified-Since
+def test_send_file_conditional():
+    first = client.get('/file')
+    etag = first.headers['etag']
+
+    response = client.get('/file', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response.headers['etag'] == etag
+    assert 'content-length' not in response.headers
+    print("✓ If-None-Match returns 304 without body")
+
+    response = client.get('/file', headers={'If-None-Match': 'W/' + etag})
+    assert response.status_code == 304
+    print("✓ If-None-Match uses weak comparison")
+
+    response = client.get('/file', headers={'If-Modified-Since': first.headers['last-modified']})
+    assert response.status_code == 304
+    print("✓ If-Modified-Since returns 304")
+
+    response = client.get('/file', headers={'If-None-Match': '"other"'})
+    assert response.status_code == 200
+    assert len(response.content) == os.path.getsize(FILE_PATH)
+    print("✓ mismatched ETag returns full body")
+
+    response = client.get('/file', headers={'If-Match': '"other"'})
+    assert response.status_code == 412
+    print("✓ If-Match mismatch returns 412")
+
+# 测试 send_from_directory
+def test_send_from_directory():
+    response = client.get('/dir/hello.txt')
+    assert response.status_code == 200
+    etag = response.headers['etag']
+    response = client.get('/dir/hello.txt', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    response = client.get('/dir/missing.txt')
+    assert response.status_code == 404
+    print("✓ send_from_directory supports conditional requests")
+
+# 测试 Response.make_conditional
+def test_response_make_conditional():
+    response = client.get('/body')
+    assert response.status_code == 200
+    etag = response.headers['etag']
+    response = client.get('/body', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.content == b''
+    print("✓ Response.make_conditional returns 304 for matching ETag")
+
+    resp = Response("cached")
+    resp.add_etag()
+    first = resp.get_etag()
+    resp.add_etag(overwrite=True)
+    assert resp.get_etag() == first
+    assert resp._etag_cache[0] is resp.body
+    print("✓ body hash is computed once and cached")
+
+# 测试 Range / If-Range
+def test_send_file_range():
+    data = open(FILE_PATH, 'rb').read()
+    response = client.get('/file', headers={'Range': 'bytes=0-4'})
+    assert response.status_code == 206
+    assert response.content == data[:5]
+    assert response.headers['content-range'] == f'bytes 0-4/{len(data)}'
+    print("✓ single range returns 206")
+
+    response = client.get('/file', headers={'Range': 'bytes=-10'})
+    assert response.content == data[-10:]
+    print("✓ suffix range returns the last bytes")
+
+    response = client.get('/file', headers={'Range': 'bytes=0-1,10-12'})
+    assert response.status_code == 206
+    content_type = response.headers['content-type']
+    assert content_type.startswith('multipart/byteranges; boundary=')
+    assert int(response.headers['content-length']) == len(response.content)
+    boundary = content_type.split('boundary=')[1]
+    assert response.content.endswith(f'--{boundary}--\r\n'.encode())
+    assert b'Content-Range: bytes 10-12/' in response.content
+    print("✓ multiple ranges return multipart/byteranges")
+
+    response = client.get('/file', headers={'Range': f'bytes={len(data)}-'})
+    assert response.status_code == 416
+    assert response.headers['content-range'] == f'bytes */{len(data)}'
+    print("✓ unsatisfiable range returns 416")
+
+    etag = client.get('/file').headers['etag']
+    response = client.get('/file', headers={'Range': 'bytes=0-4', 'If-Range': etag})
+    assert response.status_code == 206
+    response = client.get('/file', headers={'Range': 'bytes=0-4', 'If-Range': '"stale"'})
+    assert response.status_code == 200
+    assert response.content == data
+    print("✓ If-Range falls back to full response when stale")
+
+    response = client.get('/dir/hello.txt', headers={'Range': 'bytes=5-9'})
+    assert response.status_code == 206
+    assert response.content == data[5:10]
+    print("✓ send_from_directory supports ranges")
+
+def _run_file_response(path, headers=None, extensions=None):
+    """直接通过ASGI调用文件响应，返回发送的消息列表（不保存响应体）"""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+        "extensions": extensions or {},
+    }
+    messages = []
+    received = [0]
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            received[0] += len(message["body"])
+            message = dict(message, body=b"")
+        messages.append(message)
+
+    asyncio.run(FileResponse(path)(scope, receive, send))
+    return messages, received[0]
+
+# 测试零拷贝扩展
+def test_send_file_zerocopy():
+    size = os.path.getsize(FILE_PATH)
+    messages, _ = _run_file_response(
+        FILE_PATH,
+        headers={'Range': 'bytes=100-199'},
+        extensions={"http.response.zerocopy": {}},
+    )
+    zerocopy = [m for m in messages if m["type"] == "http.response.zerocopy"]
+    assert len(zerocopy) == 1
+    assert zerocopy[0]["offset"] == 100 and zerocopy[0]["count"] == 100
+    assert zerocopy[0]["more_body"] is False
+    print("✓ http.response.zerocopy is used when supported")
+
+    messages, received = _run_file_response(FILE_PATH)
+    assert received == size
+    assert not any(m["type"] == "http.response.zerocopy" for m in messages)
+    print("✓ falls back to chunked reads without zerocopy")
+
+# 测试大文件内存占用
+def test_send_file_large_memory():
+    large_path = os.path.join(FILE_DIR, "large.bin")
+    size = 64 * 1024 * 1024
+    with open(large_path, 'wb') as f:
+        f.truncate(size)
+
+    tracemalloc.start()
+    try:
+        _, received = _run_file_response(large_path)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert received == size
+    assert peak < 4 * 1024 * 1024
+    print(f"✓ 64MB file streamed with peak memory {peak // 1024}KB")
+
+    tracemalloc.start()
+    try:
+        _, received = _run_file_response(large_path, headers={'Range': 'bytes=0-999,2000-'})
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        os.remove(large_path)
+    assert received >= size - 1000
+    assert peak < 4 * 1024 * 1024
+    print(f"✓ large range request streamed with peak memory {peak // 1024}KB")
+
+class _TrackingFile(io.RawIOBase):
+    """记录读取块大小和关闭状态的不可定位文件"""
+    def __init__(self, size):
+        self.remaining = size
+        self.reads = []
+
+    def readable(self):
+        return True
+
+    def read(self, n=-1):
+        self.reads.append(n)
+        n = min(n, self.remaining)
+        self.remaining -= n
+        return b"x" * n
+
+# 测试文件对象流式发送
+def test_send_file_fileobj():
+    data = open(FILE_PATH, 'rb').read()
+    response = client.get('/fileobj')
+    assert response.status_code == 200
+    assert response.content == data
+    assert response.headers['content-length'] == str(len(data))
+    assert response.headers['content-disposition'] == 'attachment; filename="data.txt"'
+    assert response.headers['content-type'].startswith('text/plain')
+    print("✓ file objects are streamed with Content-Length and download_name")
+
+    response = client.get('/bytesio')
+    assert response.content == b"in memory"
+    assert response.headers['content-length'] == '9'
+    response = client.get('/bytesio', headers={'If-None-Match': '"v1"'})
+    assert response.status_code == 304
+    print("✓ BytesIO is streamed and supports explicit ETags")
+
+    response = client.get('/asyncfile')
+    assert response.content == data
+    assert response.headers['content-length'] == str(len(data))
+    print("✓ async file objects are streamed")
+
+    tracking = _TrackingFile(1000)
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": []}
+    asyncio.run(FileObjectResponse(tracking, chunk_size=256)(scope, receive, send))
+    assert tracking.closed
+    assert set(tracking.reads) == {256}
+    assert b"".join(m.get("body", b"") for m in messages[1:]) == b"x" * 1000
+    assert not any(k == b"content-length" for k, _ in messages[0]["headers"])
+    print("✓ unseekable file is read in configured chunks and closed")
+
+# 测试 X-Sendfile / X-Accel-Redirect
+def test_send_file_x_sendfile():
+    response = offload_client.get('/file')
+    assert response.status_code == 200
+    assert response.content == b''
+    assert response.headers['x-accel-redirect'] == '/protected/hello.txt'
+    assert response.headers['content-disposition'] == 'attachment; filename="hello.txt"'
+    assert response.headers['content-type'].startswith('text/plain')
+    assert 'etag' in response.headers
+    print("✓ USE_X_SENDFILE emits X-Accel-Redirect with mapped path")
+
+    response = offload_client.get('/file', headers={'If-None-Match': response.headers['etag']})
+    assert response.status_code == 304
+    assert 'x-accel-redirect' not in response.headers
+    print("✓ conditional requests are answered without offloading")
+
+if __name__ == "__main__":
+    print("=== Testing send_file ===")
+    test_send_file_headers()
+    test_send_file_conditional()
+    test_send_from_directory()
+    test_response_make_conditional()
+    test_send_file_range()
+    test_send_file_zerocopy()
+    test_send_file_large_memory()
+    test_send_file_fileobj()
+    test_send_file_x_sendfile()
+    print("\nAll send_file tests completed!")
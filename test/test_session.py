@@ -4,6 +4,7 @@ from starlette.testclient import TestClient
 
 # 创建应用实例
 app = Foxar(__name__)
+app.config['SECRET_KEY'] = 'test-secret'
 
 # 测试会话属性和功能
 @app.route('/session-test')
@@ -30,7 +31,60 @@ def session_permanent():
         s.permanent = True
     return f"Permanent session set for user: {s['user']}"
 
+@app.route('/session-read')
+def session_read():
+    return {'user': session.get('user'), 'count': session.get('count')}
+
+@app.route('/session-info')
+def session_info():
+    return {'user': session.get('user'), 'permanent': session().permanent}
+
+@app.route('/session-clear')
+def session_clear():
+    session.clear()
+    return {}
+
+# 测试会话数据保存在签名cookie中
+def test_session_persistence():
+    client = TestClient(app)
+    client.get('/session-test')
+    client.get('/session-test')
+    assert client.get('/session-read').json() == {'user': 'test_user', 'count': 2}
+    print("✓ session values are kept between requests in the signed session cookie")
+
+    other = TestClient(app)
+    assert other.get('/session-read').json() == {'user': None, 'count': None}
+    print("✓ another client does not see the data")
+
+    # 篡改后的cookie被忽略
+    value = client.cookies['session']
+    payload, _, signature = value.rpartition('.')
+    other.cookies.set('session', payload + '.' + '0' * len(signature))
+    assert other.get('/session-read').json() == {'user': None, 'count': None}
+    print("✓ cookies with a bad signature are ignored")
+
+    response = client.get('/session-permanent')
+    assert 'max-age=31536000' in response.headers['set-cookie'].lower()
+    assert client.get('/session-info').json() == {'user': 'permanent_user', 'permanent': True}
+    print("✓ session.permanent is kept between requests")
+
+    response = client.get('/session-read')
+    assert 'session=' not in response.headers['set-cookie']
+    client.get('/session-clear')
+    assert 'session' not in client.cookies
+    assert client.get('/session-read').json() == {'user': None, 'count': None}
+    print("✓ unmodified sessions are not rewritten and cleared sessions delete the cookie")
+
+    no_key = Foxar(__name__)
+    no_key.config['TESTING'] = True
+    no_key.add_url_rule('/session-test', view_func=session_test)
+    response = TestClient(no_key).get('/session-test')
+    assert response.status_code == 200 and 'session' not in response.cookies
+    print("✓ without SECRET_KEY the session is not saved")
+
 if __name__ == "__main__":
+    test_session_persistence()
+
     print("=== Testing Session Management ===")
     
     client = TestClient(app)
@@ -0,0 +1,260 @@
+from foxar.app import Foxar
+from foxar.cache import LRUCache
+from foxar.static import compress_static, write_manifest
+from starlette.testclient import TestClient
+import gzip
+import os
+import tempfile
+
+# 创建静态目录
+STATIC_DIR = tempfile.mkdtemp()
+CSS = b"body { color: red; }\n" * 200
+with open(os.path.join(STATIC_DIR, "app.css"), 'wb') as f:
+    f.write(CSS)
+with open(os.path.join(STATIC_DIR, "plain.txt"), 'wb') as f:
+    f.write(b"plain text")
+
+# 生成预压缩文件
+stats = compress_static(STATIC_DIR, algorithms=('gzip',))
+
+# 创建应用实例
+app = Foxar(__name__, static_folder=STATIC_DIR)
+app.config['TESTING'] = True
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 60
+
+client = TestClient(app)
+
+# 测试 LRUCache 字节预算
+def test_lru_cache():
+    cache = LRUCache(max_bytes=10)
+    assert cache.set('a', 'A', 4)
+    assert cache.set('b', 'B', 4)
+    assert cache.get('a') == 'A'
+    cache.set('c', 'C', 4)
+    assert 'b' not in cache and 'a' in cache
+    assert cache.current_bytes == 8
+    assert not cache.set('big', 'X', 11)
+    assert cache.stats()['hits'] == 1
+    print("✓ LRUCache evicts least recently used entries by byte budget")
+
+    # 多个线程同时读写时淘汰不会与 move_to_end 竞争
+    import sys
+    import threading
+    cache = LRUCache(max_bytes=64)
+    errors = []
+
+    def worker(offset):
+        try:
+            for i in range(20000):
+                key = (i + offset) % 80
+                cache.set(key, key, 1)
+                cache.get((key + 1) % 80)
+        except Exception as e:
+            errors.append(e)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert not errors and len(cache) <= 64 and cache.current_bytes == len(cache)
+    print("✓ LRUCache is safe to use from threadpool workers")
+
+# 测试预压缩
+def test_compress_static():
+    assert stats['compressed'] == 1
+    gz_path = os.path.join(STATIC_DIR, "app.css.gz")
+    assert gzip.decompress(open(gz_path, 'rb').read()) == CSS
+    assert not os.path.exists(os.path.join(STATIC_DIR, "plain.txt.gz"))
+    assert compress_static(STATIC_DIR, algorithms=('gzip',))['compressed'] == 0
+    print("✓ compress_static writes .gz siblings and skips tiny or up-to-date files")
+
+# 测试预压缩文件协商
+def test_static_precompressed():
+    response = client.get('/static/app.css', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert response.headers['content-type'].startswith('text/css')
+    assert response.headers['cache-control'] == 'public, max-age=60'
+    assert response.content == CSS
+    print("✓ .gz sibling is served when accepted")
+
+    response = client.get('/static/app.css', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in response.headers
+    assert response.headers['vary'] == 'Accept-Encoding'
+    assert response.content == CSS
+    print("✓ identity is served when compression is not accepted")
+
+    response = client.get('/static/app.css', headers={'Accept-Encoding': 'gzip;q=0'})
+    assert 'content-encoding' not in response.headers
+    print("✓ q=0 disables an encoding")
+
+    response = client.get('/static/plain.txt', headers={'Accept-Encoding': 'gzip'})
+    assert 'vary' not in response.headers
+    assert response.content == b"plain text"
+    print("✓ files without siblings have no Vary header")
+
+# 测试内存缓存和重新验证
+def test_static_hot_cache():
+    static_files = app.static_files
+    static_files.clear_cache()
+    client.get('/static/plain.txt')
+    response = client.get('/static/plain.txt')
+    assert response.content == b"plain text"
+    assert static_files.cache.stats()['hits'] >= 1
+    print("✓ small files are served from memory")
+
+    etag = response.headers['etag']
+    response = client.get('/static/plain.txt', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.content == b''
+    print("✓ cached files answer conditional requests")
+
+    path = os.path.join(STATIC_DIR, "plain.txt")
+    with open(path, 'wb') as f:
+        f.write(b"changed content")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    response = client.get('/static/plain.txt')
+    assert response.content == b"changed content"
+    assert response.headers['etag'] != etag
+    print("✓ modified files are revalidated by mtime")
+
+    # 重新验证间隔内的命中只 stat 发送的文件，不在线程中重新解析
+    resolved = []
+    resolve = static_files._resolve
+    static_files._resolve = lambda route_path: resolved.append(route_path) or resolve(route_path)
+    try:
+        for _ in range(5):
+            assert client.get('/static/plain.txt').content == b"changed content"
+        assert resolved == []
+        os.remove(path)
+        assert client.get('/static/plain.txt').status_code == 404
+        assert resolved == ['/plain.txt']
+    finally:
+        del static_files._resolve
+        with open(path, 'wb') as f:
+            f.write(b"plain text")
+    print("✓ hot hits revalidate inline and resolve in a thread only when the file changed")
+
+# 测试之后生成的预压缩文件
+def test_static_new_variants():
+    path = os.path.join(STATIC_DIR, "late.js")
+    with open(path, 'wb') as f:
+        f.write(b"console.log('late');\n" * 100)
+    response = client.get('/static/late.js', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in response.headers
+    compress_static(STATIC_DIR, algorithms=('gzip',))
+    # 预压缩文件在重新解析时被发现，间隔为 0 时每次请求都重新解析
+    app.config['STATIC_CACHE_REVALIDATE_INTERVAL'] = 0
+    try:
+        response = client.get('/static/late.js', headers={'Accept-Encoding': 'gzip'})
+    finally:
+        app.config['STATIC_CACHE_REVALIDATE_INTERVAL'] = 1
+    assert response.headers['content-encoding'] == 'gzip'
+    assert response.content == b"console.log('late');\n" * 100
+    print("✓ .gz files created after the first request are picked up")
+
+# 测试区间请求、404和方法限制
+def test_static_misc():
+    response = client.get('/static/app.css', headers={'Range': 'bytes=0-3'})
+    assert response.status_code == 206
+    assert response.content == CSS[:4]
+    print("✓ range requests are supported")
+
+    assert client.get('/static/missing.css').status_code == 404
+    assert client.get('/static/../test_static.py').status_code == 404
+    print("✓ missing files return 404")
+
+    outside = tempfile.mkdtemp()
+    with open(os.path.join(outside, 'secret.txt'), 'wb') as f:
+        f.write(b"secret")
+    os.symlink(os.path.join(outside, 'secret.txt'), os.path.join(STATIC_DIR, 'escape.txt'))
+    os.symlink(os.path.join(STATIC_DIR, 'plain.txt'), os.path.join(STATIC_DIR, 'alias.txt'))
+    assert client.get('/static/escape.txt').status_code == 404
+    assert client.get('/static/alias.txt').status_code == 200
+    print("✓ symlinks pointing outside the static folder are not served")
+
+    response = client.post('/static/app.css')
+    assert response.status_code == 405
+    assert response.headers['allow'] == 'GET, HEAD'
+    print("✓ only GET and HEAD are allowed")
+
+# 带内容哈希的静态文件URL
+HASHED_DIR = tempfile.mkdtemp()
+with open(os.path.join(HASHED_DIR, "site.js"), 'wb') as f:
+    f.write(b"console.log('hashed');")
+
+hashed_app = Foxar(__name__, static_folder=HASHED_DIR, static_url_path='/assets')
+hashed_app.config['TESTING'] = True
+hashed_app.config['STATIC_HASHED_URLS'] = True
+
+@hashed_app.get('/url')
+def hashed_url_view():
+    from foxar.utils import url_for
+    return {"url": url_for('static', filename='site.js')}
+
+hashed_client = TestClient(hashed_app)
+
+# 测试带内容哈希的URL和 immutable 缓存
+def test_static_hashed_urls():
+    url = hashed_app.url_for('static', filename='site.js')
+    assert url.startswith('/assets/site.') and url.endswith('.js') and url != '/assets/site.js'
+    assert hashed_client.get('/url').json()['url'] == url
+    print("✓ url_for('static') emits fingerprinted URLs")
+
+    response = hashed_client.get(url)
+    assert response.status_code == 200
+    assert response.content == b"console.log('hashed');"
+    assert response.headers['cache-control'] == 'public, max-age=31536000, immutable'
+    print("✓ fingerprinted URLs are served with immutable caching")
+
+    response = hashed_client.get('/assets/site.js')
+    assert response.status_code == 200
+    assert 'immutable' not in response.headers['cache-control']
+    print("✓ plain URLs keep the default caching")
+
+    # 从预先生成的清单加载
+    manifest_path = write_manifest(HASHED_DIR)
+    with open(manifest_path, 'w') as f:
+        f.write('{"site.js": "site.prebuilt.js"}')
+    hashed_app.config['STATIC_MANIFEST'] = os.path.basename(manifest_path)
+    hashed_app.static_files.clear_cache()
+    assert hashed_app.url_for('static', filename='site.js') == '/assets/site.prebuilt.js'
+    assert hashed_client.get('/assets/site.prebuilt.js').status_code == 200
+    print("✓ STATIC_MANIFEST is loaded instead of hashing at startup")
+
+    # 启动时没有加载清单时，首个请求在工作线程中加载
+    import threading
+    static_files = hashed_app.static_files
+    static_files.clear_cache()
+    threads = []
+    load_manifest = static_files._load_manifest
+    static_files._load_manifest = lambda: (threads.append(threading.current_thread().name), load_manifest())
+    try:
+        assert hashed_client.get('/assets/site.prebuilt.js').status_code == 200
+    finally:
+        del static_files._load_manifest
+    assert threads == ['AnyIO worker thread']
+    print("✓ a lazily loaded manifest is built off the event loop")
+
+    url = hashed_app.url_for('static', filename='site.js', v=2, _external=True, _scheme='https', _anchor='top')
+    assert url == '/assets/site.prebuilt.js?v=2#top'
+    print("✓ Flask control keys are not encoded into the static query string")
+
+if __name__ == "__main__":
+    print("=== Testing static files ===")
+    test_lru_cache()
+    test_compress_static()
+    test_static_precompressed()
+    test_static_hot_cache()
+    test_static_new_variants()
+    test_static_misc()
+    test_static_hashed_urls()
+    print("\nAll static tests completed!")
@@ -2,10 +2,10 @@ from foxar.app import Foxar
 from foxar.request import request
 from starlette.testclient import TestClient
 import os
+import tempfile
 
-# 创建模板目录
-TEMPLATE_DIR = "templates"
-os.makedirs(TEMPLATE_DIR, exist_ok=True)
+# 在临时目录中创建模板，不在工作目录留下文件
+TEMPLATE_DIR = tempfile.mkdtemp()
 
 # 创建测试模板
 TEST_TEMPLATE_CONTENT = '''
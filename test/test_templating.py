@@ -0,0 +1,274 @@
+from foxar.app import Foxar
+from foxar.blueprints import Blueprint
+from foxar.request import g, request_context
+from foxar.templating import FragmentCache, compile_templates
+from starlette.requests import Request
+from starlette.testclient import TestClient
+import asyncio
+import os
+import tempfile
+import time
+
+# 创建模板目录
+TEMPLATE_DIR = tempfile.mkdtemp()
+CACHE_DIR = os.path.join(tempfile.mkdtemp(), "jinja-cache")
+with open(os.path.join(TEMPLATE_DIR, "hello.html"), 'w') as f:
+    f.write("<h1>Hello, {{ name }}!</h1>")
+with open(os.path.join(TEMPLATE_DIR, "broken.html"), 'w') as f:
+    f.write("{% if %}")
+with open(os.path.join(TEMPLATE_DIR, "list.html"), 'w') as f:
+    f.write("<p>{{ request.path }} {{ g.user }}</p>{% for i in items %}<li>{{ i }}</li>{% endfor %}")
+
+def make_app(**config):
+    app = Foxar(__name__, template_folder=TEMPLATE_DIR)
+    app.config['TESTING'] = True
+    app.config.update(config)
+
+    @app.get('/hello')
+    def hello_view():
+        return app.render_template('hello.html', name='Foxar')
+
+    @app.get('/list')
+    async def list_view(req: Request):
+        async with request_context(req):
+            g.user = 'alice'
+            return app.render_template('list.html', stream=True, items=range(1000))
+
+    return app
+
+# 测试字节码缓存
+def test_template_bytecode_cache():
+    app = make_app(TEMPLATE_CACHE_DIR=CACHE_DIR)
+    response = TestClient(app).get('/hello')
+    assert response.status_code == 200
+    assert "Hello, Foxar!" in response.text
+    assert any(name.endswith('.cache') for name in os.listdir(CACHE_DIR))
+    print("✓ compiled templates are written to TEMPLATE_CACHE_DIR")
+
+    # 新的worker从缓存加载而不是重新编译
+    other = make_app(TEMPLATE_CACHE_DIR=CACHE_DIR)
+    loaded = []
+    cache = other.jinja_env.bytecode_cache
+    original = cache.load_bytecode
+
+    def load_bytecode(bucket):
+        original(bucket)
+        loaded.append(bucket.code is not None)
+
+    cache.load_bytecode = load_bytecode
+    assert "Hello, Foxar!" in TestClient(other).get('/hello').text
+    assert loaded == [True]
+    print("✓ another app reuses the shared bytecode cache")
+
+# 测试 TEMPLATES_AUTO_RELOAD
+def test_template_auto_reload():
+    assert make_app().jinja_env.auto_reload is False
+    assert make_app(DEBUG=True).jinja_env.auto_reload is True
+    assert make_app(DEBUG=True, TEMPLATES_AUTO_RELOAD=False).jinja_env.auto_reload is False
+    print("✓ TEMPLATES_AUTO_RELOAD defaults to DEBUG")
+
+# 测试预编译
+def test_compile_templates():
+    cache_dir = os.path.join(tempfile.mkdtemp(), "prewarm")
+    app = make_app(TEMPLATE_CACHE_DIR=cache_dir)
+    compiled, errors = compile_templates(app.jinja_env)
+    assert compiled == 2
+    assert [name for name, _ in errors] == ['broken.html']
+    assert len(os.listdir(cache_dir)) == 2
+    print("✓ compile_templates prewarms the cache and reports syntax errors")
+
+def _run(app, path):
+    """直接通过ASGI调用，返回响应体消息列表"""
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []}
+    messages = []
+    received = []
+
+    async def receive():
+        if received:
+            await asyncio.sleep(3600)
+        received.append(True)
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return [m for m in messages if m["type"] == "http.response.body"]
+
+# 测试流式渲染
+def test_stream_template():
+    app = make_app(TEMPLATE_STREAM_BUFFER_SIZE=1024)
+    response = TestClient(app).get('/list')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/html')
+    assert response.text.startswith("<p>/list alice</p><li>0</li>")
+    assert response.text.endswith("<li>999</li>")
+    print("✓ stream_template keeps the request context during generation")
+
+    bodies = [m["body"] for m in _run(app, '/list') if m["body"]]
+    assert len(bodies) > 5
+    assert all(len(body) >= 1024 for body in bodies[:-1])
+    print("✓ output is flushed in TEMPLATE_STREAM_BUFFER_SIZE chunks")
+
+class DictBackend:
+    """用于测试的共享缓存后端"""
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ttl):
+        self.data[key] = value
+
+    def delete_prefix(self, prefix):
+        for key in [k for k in self.data if k.startswith(prefix)]:
+            del self.data[key]
+
+# 测试 {% cache %} 片段缓存
+def test_fragment_cache():
+    app = make_app()
+    env = app.jinja_env
+    calls = []
+
+    def expensive():
+        calls.append(1)
+        return f"<b>{len(calls)}</b>"
+
+    template = env.from_string(
+        "{% cache 'nav' %}{{ expensive()|safe }}{% endcache %}"
+        "{% cache ('sidebar', user), 0.05 %}{{ expensive()|safe }}{% endcache %}"
+    )
+    assert template.render(expensive=expensive, user='a') == "<b>1</b><b>2</b>"
+    assert template.render(expensive=expensive, user='a') == "<b>1</b><b>2</b>"
+    assert len(calls) == 2
+    print("✓ cached fragments are rendered once")
+
+    time.sleep(0.06)
+    assert template.render(expensive=expensive, user='a') == "<b>1</b><b>3</b>"
+    print("✓ fragments expire after ttl")
+
+    assert app.fragment_cache.invalidate('nav') == 1
+    assert template.render(expensive=expensive, user='a') == "<b>4</b><b>3</b>"
+    stats = app.fragment_cache.stats()
+    assert stats['hits'] == 4 and stats['misses'] == 4
+    assert 0 < stats['bytes'] <= stats['max_bytes']
+    print("✓ invalidate(prefix) drops fragments and hit rate is reported")
+
+    # 共享后端
+    backend = DictBackend()
+    first = FragmentCache(max_bytes=1024, backend=backend)
+    second = FragmentCache(max_bytes=1024, backend=backend)
+    first.set('page:1', 'cached')
+    assert second.get('page:1') == 'cached'
+    first.invalidate('page:')
+    assert 'page:1' not in backend.data
+    print("✓ shared backend is used as a second-level cache")
+
+# 测试应用和蓝图共用模板环境
+def test_blueprint_template_folders():
+    bp_root = tempfile.mkdtemp()
+    os.makedirs(os.path.join(bp_root, "templates"))
+    with open(os.path.join(bp_root, "templates", "admin.html"), 'w') as f:
+        f.write("admin {{ name }}")
+    with open(os.path.join(bp_root, "templates", "hello.html"), 'w') as f:
+        f.write("shadowed")
+
+    app = make_app(TEMPLATE_CACHE_SIZE=50)
+    bp = Blueprint('admin', __name__, template_folder='templates', root_path=bp_root)
+    app.register_blueprint(bp)
+
+    env = app.jinja_env
+    assert env.get_template('admin.html').render(name='x') == "admin x"
+    assert env.get_template('hello.html').render(name='x') == "<h1>Hello, x!</h1>"
+    assert env.cache.capacity == 50
+    print("✓ blueprint folders are searched after the app folder")
+
+    loader = env.loader
+    assert loader._resolved['admin.html'] is loader._loaders[os.path.join(bp_root, 'templates')]
+    assert 'admin.html' in env.list_templates()
+    print("✓ template lookups are memoized per name")
+
+    # 只有蓝图配置了模板目录时也能渲染
+    other = Foxar(__name__)
+    other.config['TESTING'] = True
+    other.register_blueprint(Blueprint('admin', __name__, template_folder='templates', root_path=bp_root))
+    assert other.jinja_env.get_template('admin.html').render(name='y') == "admin y"
+    print("✓ apps without template_folder use blueprint templates")
+
+# 测试上下文处理器和模板信号
+def test_context_processors_and_signals():
+    from foxar.signals import before_render_template, template_rendered
+    app = make_app()
+    calls = []
+
+    @app.context_processor
+    def inject_site():
+        return {'name': 'processor', 'site': 'foxar'}
+
+    @app.context_processor(lazy=True)
+    def current_user():
+        calls.append('user')
+        return 'alice'
+
+    env = app.jinja_env
+    with open(os.path.join(TEMPLATE_DIR, "user.html"), 'w') as f:
+        f.write("{{ site }} {{ current_user }} {{ current_user }}")
+
+    response = app.render_template('hello.html')
+    assert response.body == b"<h1>Hello, processor!</h1>"
+    assert app.render_template('hello.html', name='explicit').body == b"<h1>Hello, explicit!</h1>"
+    assert calls == []
+    print("✓ lazy processors are skipped when the template does not use them")
+
+    assert app.render_template('user.html').body == b"foxar alice alice"
+    assert calls == ['user']
+    print("✓ lazy processors run once when referenced")
+
+    events = []
+
+    def on_before(sender, template, context, **extra):
+        events.append(('before', template))
+
+    def on_rendered(sender, template, context, duration, **extra):
+        events.append(('rendered', template, duration))
+
+    before_render_template.connect(on_before)
+    template_rendered.connect(on_rendered)
+    try:
+        app.render_template('hello.html')
+    finally:
+        before_render_template.disconnect(on_before)
+        template_rendered.disconnect(on_rendered)
+    assert events[0] == ('before', 'hello.html')
+    assert events[1][:2] == ('rendered', 'hello.html') and events[1][2] >= 0
+    print("✓ template_rendered fires after rendering with the duration")
+
+    # 旧签名 (sender, template, context) 的接收器不会收到 duration，仍然触发
+    old_style = []
+
+    def on_rendered_old(sender, template, context):
+        old_style.append(template)
+
+    template_rendered.connect(on_rendered_old)
+    try:
+        app.render_template('hello.html')
+        async def consume():
+            async for _ in app.stream_template('hello.html').body_iterator:
+                pass
+        asyncio.run(consume())
+    finally:
+        template_rendered.disconnect(on_rendered_old)
+    assert old_style == ['hello.html', 'hello.html']
+    print("✓ old-style template_rendered receivers still fire without duration")
+
+if __name__ == "__main__":
+    print("=== Testing templating ===")
+    test_template_bytecode_cache()
+    test_template_auto_reload()
+    test_compile_templates()
+    test_stream_template()
+    test_fragment_cache()
+    test_blueprint_template_folders()
+    test_context_processors_and_signals()
+    print("\nAll templating tests completed!")
@@ -0,0 +1,87 @@
+from foxar import Foxar, g, request_timed
+from foxar.routing import FlaskRoute
+from starlette.testclient import TestClient
+import warnings
+
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore')
+    app = Foxar(__name__)
+
+@app.before_request
+def load_user():
+    g.user = 'foxar'
+
+@app.after_request
+def add_header(response):
+    response.headers['X-Test'] = 'yes'
+    return response
+
+@app.route('/sync')
+def sync_view():
+    return {'user': g.user}
+
+@app.route('/async')
+async def async_view():
+    return {'user': g.user}
+
+@app.route('/flask', route_class=FlaskRoute)
+def flask_view():
+    return {'user': g.user}
+
+client = TestClient(app)
+
+def parse(header):
+    stages = {}
+    for item in header.split(', '):
+        name, dur = item.split(';dur=')
+        stages[name] = float(dur)
+    return stages
+
+# 测试 Server-Timing 响应头
+def test_server_timing():
+    app.config['SERVER_TIMING'] = False
+    response = client.get('/sync')
+    assert response.json() == {'user': 'foxar'}
+    assert 'server-timing' not in response.headers
+    print("✓ no Server-Timing header when disabled")
+
+    app.config['SERVER_TIMING'] = True
+    try:
+        stages = parse(client.get('/sync').headers['server-timing'])
+        assert list(stages) == ['before_request', 'body', 'wait', 'view', 'serialize', 'after_request', 'session', 'total']
+        assert all(dur >= 0 for dur in stages.values())
+        assert stages['total'] >= stages['view']
+        print("✓ sync views report hook, threadpool wait, view, serialization and session stages")
+
+        stages = parse(client.get('/async').headers['server-timing'])
+        assert 'view' in stages and 'wait' not in stages
+        stages = parse(client.get('/flask').headers['server-timing'])
+        assert 'view' in stages and 'serialize' in stages
+        response = client.get('/missing')
+        assert response.status_code == 404 and 'total' in parse(response.headers['server-timing'])
+        print("✓ async views, FlaskRoute and error responses are timed")
+    finally:
+        app.config['SERVER_TIMING'] = False
+
+# 测试 request_timed 信号
+def test_request_timed():
+    received = []
+
+    def receiver(sender, request, timings):
+        received.append((request.url.path, timings))
+
+    request_timed.connect(receiver)
+    try:
+        response = client.get('/sync')
+    finally:
+        request_timed.disconnect(receiver)
+    assert 'server-timing' not in response.headers
+    path, timings = received[0]
+    assert path == '/sync' and 'view' in timings and timings['total'] > 0
+    print("✓ request_timed receivers get the timings without the header")
+
+if __name__ == "__main__":
+    print("=== Testing Server-Timing ===")
+    test_server_timing()
+    test_request_timed()
+    print("\nAll Server-Timing tests completed!")